@@ -1,23 +1,25 @@
 """Programmatic entrypoint for CLI application.
 """
 import sys
-from rich.console import Console
 
 
 from aerie_cli.app import app
-from aerie_cli.persistent import NoActiveSessionError
 from aerie_cli.__version__ import __version__
 
 
 def main():
     try:
         app()
-    except NoActiveSessionError:
-        Console().print(
-            "There is no active session. Please start a session with aerie-cli activate"
-        )
-        sys.exit(-1)
-    except Exception:
+    except Exception as e:
+        # Imported only on failure to keep startup fast
+        from rich.console import Console
+        from aerie_cli.persistent import NoActiveSessionError
+
+        if isinstance(e, NoActiveSessionError):
+            Console().print(
+                "There is no active session. Please start a session with aerie-cli activate"
+            )
+            sys.exit(-1)
         Console().print_exception()
 
 
@@ -1,11 +1,19 @@
-import sys
 import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 from pathlib import Path
 from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import Set
+from typing import Tuple
 from copy import deepcopy
+from datetime import timedelta
 
 import arrow
+import numpy as np
 
 from .schemas.api import ApiActivityPlanRead
 from .schemas.api import ApiEffectiveActivityArguments
@@ -19,9 +27,142 @@ from .schemas.client import CommandDictionaryInfo
 from .schemas.client import ExpansionRun
 from .schemas.client import ExpansionRule
 from .schemas.client import ExpansionSet
+from .schemas.client import PlanSimulationResult
+from .schemas.client import PlanSyncResult
+from .schemas.client import ResourceTimelines
 from .schemas.client import ResourceType
+from .utils.profiles import profile_segments_to_arrays
+from .utils.profiles import arrays_to_samples
+from .utils.profiles import decimate_samples
+from .utils.serialization import hash_arguments
 from .utils.serialization import postgres_interval_to_microseconds
+from .utils.serialization import timedelta_to_postgres_interval
 from .aerie_host import AerieHost
+from .persistent import PersistentCache
+
+DEFAULT_ACTIVITY_CHUNK_SIZE = 1000
+DEFAULT_SIMULATION_RESULTS_PAGE_SIZE = 10000
+DEFAULT_SEQUENCE_LINK_CHUNK_SIZE = 5000
+DEFAULT_ID_FILTER_CHUNK_SIZE = 1000
+SEQUENCE_DOWNLOAD_MAX_WORKERS = 8
+EFFECTIVE_ARGS_BATCH_SIZE = 100
+EFFECTIVE_ARGS_MAX_WORKERS = 4
+EFFECTIVE_ARGS_CACHE_NAMESPACE = "effective_arguments"
+METADATA_CACHE_NAMESPACE = "metadata"
+PLAN_CACHE_NAMESPACE = "plans"
+SIMULATION_INITIAL_POLL_PERIOD = 0.25
+SIMULATION_POLL_BACKOFF = 1.5
+SIMULATION_NONTERMINAL_STATUSES = ["incomplete", "pending"]
+SIMULATION_MAX_WORKERS = 8
+
+# Seconds for which cached metadata query results are used, by query
+METADATA_CACHE_TTLS = {
+    "get_mission_models": 300,
+    "get_all_activity_types": 86400,
+    "get_resource_types": 86400,
+    "list_command_dictionaries": 300,
+    "list_expansion_rules": 60,
+    "get_directive_metadata": 300,
+}
+
+
+def _sort_activities_by_anchor_level(
+    activities: List[Activity], resolved_ids: Set[int] = frozenset()
+) -> List[List[Tuple[int, Activity]]]:
+    """Group activity directives into levels such that each activity's anchor is in the preceding level
+
+    Args:
+        activities (List[Activity]): Activity directives, anchored by `id`
+        resolved_ids (Set[int], optional): IDs of directives which already exist. Activities anchored to these are
+            placed in the first level.
+
+    Raises:
+        RuntimeError: If an anchor can't be resolved (missing or circular)
+
+    Returns:
+        List[List[Tuple[int, Activity]]]: Levels of (input list index, activity), starting with unanchored activities
+    """
+    anchored_by_id: Dict[int, List[Tuple[int, Activity]]] = {}
+    level = []
+    for idx, act in enumerate(activities):
+        if act.anchor_id is None or act.anchor_id in resolved_ids:
+            level.append((idx, act))
+        else:
+            anchored_by_id.setdefault(act.anchor_id, []).append((idx, act))
+
+    levels = []
+    while len(level):
+        levels.append(level)
+        level = [
+            anchored
+            for _, act in level if act.id is not None
+            for anchored in anchored_by_id.pop(act.id, [])
+        ]
+
+    if len(anchored_by_id):
+        unresolved = [act for acts in anchored_by_id.values() for _, act in acts]
+        raise RuntimeError(
+            f"Failed to anchor activities: {', '.join([act.name for act in unresolved])}"
+        )
+
+    return levels
+
+
+class SimulationFailedError(RuntimeError):
+    """Raised when Aerie reports that a simulation failed
+
+    Attributes:
+        plan_id (int): ID of the simulated plan
+        response (Dict): Final response to the `simulate` query, including the failure reason
+    """
+
+    def __init__(self, plan_id: int, response: Dict) -> None:
+        super().__init__(f"Simulation of plan {plan_id} failed. Response:\n{response}")
+        self.plan_id = plan_id
+        self.response = response
+
+
+def _chunks(items: List, chunk_size: int) -> Iterator[List]:
+    """Split a list into consecutive chunks of at most `chunk_size` items"""
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+def _activity_sync_key(activity: Activity) -> Tuple:
+    """Key used to match activities to directives when syncing a plan, if they can't be matched by ID"""
+    return (activity.type, activity.name, activity.start_offset)
+
+
+def _match_inserted_directives(inserted: List[Tuple[Activity, Dict]], returned: List[Dict]) -> List[int]:
+    """Get the IDs of the directives created by an insert, in the order of the inserted activities
+
+    Hasura doesn't guarantee that rows are returned in the order they were inserted, so rows are matched to inputs by
+    type, name, start offset and anchor. Inputs which share all of these are interchangeable and are matched in order.
+
+    Args:
+        inserted (List[Tuple[Activity, Dict]]): Activities and the API inputs created from them, with anchors mapped to
+            directive IDs
+        returned (List[Dict]): Rows returned by the insert, with `id`, `type`, `name`, `start_offset` and `anchor_id`
+
+    Returns:
+        List[int]: Directive ID of each inserted activity
+    """
+    if len(returned) != len(inserted):
+        raise RuntimeError(f"Inserted {len(inserted)} activity directives, but {len(returned)} were returned")
+
+    ids_by_key: Dict[Tuple, deque] = {}
+    for row in returned:
+        key = (row["type"], row["name"], postgres_interval_to_microseconds(row["start_offset"]), row["anchor_id"])
+        ids_by_key.setdefault(key, deque()).append(row["id"])
+
+    directive_ids = []
+    for act, api_activity in inserted:
+        key = (act.type, act.name, act.start_offset // timedelta(microseconds=1), api_activity["anchor_id"])
+        if not ids_by_key.get(key):
+            raise RuntimeError(f"Failed to find inserted activity directive: {act.name}")
+        directive_ids.append(ids_by_key[key].popleft())
+
+    return directive_ids
 
 
 class AerieClient:
@@ -30,17 +171,86 @@ class AerieClient:
     Class encapsulates logic to query and send files to a given Aerie host.
     """
 
-    def __init__(self, aerie_host: AerieHost):
+    def __init__(
+        self,
+        aerie_host: AerieHost,
+        effective_arguments_cache: PersistentCache = None,
+        metadata_cache: PersistentCache = None,
+        plan_cache: PersistentCache = None,
+    ):
         """Instantiate a client with an authenticated host session
 
         Args:
             aerie_host (AerieHost): Aerie host information, including authentication if necessary
+            effective_arguments_cache (PersistentCache, optional): Cache of effective activity arguments. Defaults to None (no caching).
+            metadata_cache (PersistentCache, optional): Cache of slowly-changing metadata query results (see `METADATA_CACHE_TTLS`). Defaults to None (no caching).
+            plan_cache (PersistentCache, optional): Cache of downloaded plans, validated against the plan revision. Defaults to None (no caching).
         """
         self.aerie_host = aerie_host
+        self.effective_arguments_cache = effective_arguments_cache
+        self.metadata_cache = metadata_cache
+        self.plan_cache = plan_cache
+
+    def _metadata_cache_key(self, name: str, variables: Dict, role: str = None) -> str:
+        if role is None:
+            role = self.aerie_host.active_role
+        # Results depend on who is asking, not just the role: profiles on the same host may authenticate as different
+        # users or with a Hasura admin secret. Keys are hashed, so credentials aren't stored in the cache.
+        username = self.aerie_host.aerie_jwt.username if self.aerie_host.aerie_jwt is not None else None
+        auth_headers = {
+            k.lower(): v
+            for k, v in self.aerie_host.session.headers.items()
+            if k.lower() == "authorization" or k.lower().startswith("x-hasura")
+        }
+        return self.metadata_cache.make_key(self.aerie_host.graphql_url, username, auth_headers, role, name, variables)
+
+    def _post_cached_metadata_query(self, name: str, query: str, **kwargs):
+        """Issue a GraphQL query, using the metadata cache if enabled
+
+        Args:
+            name (str): Name of the cached query, a key of `METADATA_CACHE_TTLS`
+            query (str): GraphQL query text
+            kwargs: keyword arguments for named variables for the query
+
+        Returns:
+            Query response data
+        """
+        if self.metadata_cache is None:
+            return self.aerie_host.post_to_graphql(query, **kwargs)
+
+        key = self._metadata_cache_key(name, kwargs)
+        resp = self.metadata_cache.get(key, max_age=METADATA_CACHE_TTLS[name])
+        if resp is None:
+            resp = self.aerie_host.post_to_graphql(query, **kwargs)
+            # Empty results aren't cached, since they may only be empty until Aerie finishes processing (e.g., while
+            # extracting activity and resource types from a new mission model)
+            if resp:
+                self.metadata_cache.set(key, resp)
+        return resp
+
+    def _invalidate_cached_metadata_query(self, name: str, **kwargs) -> None:
+        """Discard a cached metadata query result after a related change, for every role of the session"""
+        if self.metadata_cache is None:
+            return
+
+        roles = {self.aerie_host.active_role}
+        if self.aerie_host.aerie_jwt is not None:
+            roles.update(self.aerie_host.aerie_jwt.allowed_roles)
+        for role in roles:
+            self.metadata_cache.delete(self._metadata_cache_key(name, kwargs, role))
+
+    def _invalidate_cached_mission_model(self, model_id: int) -> None:
+        """Discard cached metadata query results for a mission model after it's uploaded or deleted"""
+        self._invalidate_cached_metadata_query("get_mission_models")
+        self._invalidate_cached_metadata_query("get_all_activity_types", model_id=model_id)
+        self._invalidate_cached_metadata_query("get_resource_types", missionModelId=model_id)
 
     def get_activity_plan_by_id(self, plan_id: int, full_args: str = None) -> ActivityPlanRead:
         """Download activity plan from Aerie
 
+        If a plan cache is enabled, the plan's revision is checked first and the plan is only downloaded if it has
+        changed since it was cached.
+
         Args:
             plan_id (int): ID of the plan in Aerie
             full_args (str): comma separated list of activity types for which to
@@ -75,25 +285,50 @@ class AerieClient:
             }
         }
         """
-        resp = self.aerie_host.post_to_graphql(query, plan_id=plan_id)
+        if self.plan_cache is None:
+            resp = self.aerie_host.post_to_graphql(query, plan_id=plan_id)
+        else:
+            # Read the revision before downloading, so a concurrent change is caught by the next check
+            revision = self.get_plan_revision(plan_id)
+            key = self.plan_cache.make_key(self.aerie_host.graphql_url, self.aerie_host.active_role, plan_id)
+            cached = self.plan_cache.get(key)
+            if cached is not None and cached["revision"] == revision:
+                resp = cached["plan"]
+            else:
+                resp = self.aerie_host.post_to_graphql(query, plan_id=plan_id)
+                self.plan_cache.set(key, {"revision": revision, "plan": resp})
+
         api_plan = ApiActivityPlanRead.from_dict(resp)
         plan = ActivityPlanRead.from_api_read(api_plan)
         return self.__expand_activity_arguments(plan, full_args)
 
-    def list_all_activity_plans(self) -> List[ActivityPlanRead]:
-        list_all_plans_query = """
-        query list_all_plans {
-            plan(order_by: { id: asc }) {
+    def list_all_activity_plans(self, include_latest_sim_dataset: bool = False) -> List[ActivityPlanRead]:
+        """List all activity plans, without their activities
+
+        Args:
+            include_latest_sim_dataset (bool, optional): Also get the ID of each plan's latest simulation dataset, in
+                the same request, as `latest_sim_dataset_id`. Defaults to False.
+
+        Returns:
+            List[ActivityPlanRead]: Plans in ascending order of ID
+        """
+        sim_datasets_field = (
+            "simulation_datasets(order_by: { id: desc }, limit: 1) { id }" if include_latest_sim_dataset else ""
+        )
+        list_all_plans_query = f"""
+        query list_all_plans {{
+            plan(order_by: {{ id: asc }}) {{
                 id
                 model_id
                 name
                 start_time
                 duration
-                simulations{
+                simulations{{
                     id
-                }
-            }
-        }
+                    {sim_datasets_field}
+                }}
+            }}
+        }}
         """
         resp = self.aerie_host.post_to_graphql(list_all_plans_query)
         activity_plans = []
@@ -103,7 +338,7 @@ class AerieClient:
             activity_plans.append(plan)
         return activity_plans
 
-    def get_all_activity_plans(self, full_args: str = None) -> List[ActivityPlanRead]:
+    def get_all_activity_plans(self, full_args: str = None, max_workers: int = 1) -> List[ActivityPlanRead]:
         """Get all activity plans
 
         Args:
@@ -111,14 +346,25 @@ class AerieClient:
             get full arguments, otherwise only modified arguments are returned.
             Set to "true" to get full arguments for all activity types.
             Disabled if missing, None, "false", or "".
+            max_workers (int, optional): Number of plans to download concurrently. Defaults to 1 (sequential).
 
         Returns:
-            List[ActivityPlanRead]
+            List[ActivityPlanRead]: Plans in ascending order of ID
         """
 
-        # List all plans then loop to get activities from each
+        # List all plans then get activities from each
         plans_metadata = self.list_all_activity_plans()
-        plans = [self.get_activity_plan_by_id(p.id, full_args) for p in plans_metadata]
+
+        def get_plan(plan_metadata: ActivityPlanRead) -> ActivityPlanRead:
+            return self.get_activity_plan_by_id(plan_metadata.id, full_args)
+
+        if max_workers <= 1:
+            return [get_plan(p) for p in plans_metadata]
+
+        # Executor.map yields results in the order of the inputs
+        self.aerie_host.reserve_connections(max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            plans = list(executor.map(get_plan, plans_metadata))
 
         return plans
 
@@ -149,8 +395,21 @@ class AerieClient:
         return resp['simulation']['plan']['id']
 
     def create_activity_plan(
-        self, model_id: int, plan_to_create: ActivityPlanCreate
+        self,
+        model_id: int,
+        plan_to_create: ActivityPlanCreate,
+        chunk_size: int = DEFAULT_ACTIVITY_CHUNK_SIZE,
     ) -> int:
+        """Create a plan with its activity directives, simulation bounds, and scheduling specification
+
+        Args:
+            model_id (int): ID of the mission model for the new plan
+            plan_to_create (ActivityPlanCreate): Plan and activity directives to upload
+            chunk_size (int, optional): Maximum number of activity directives inserted per request
+
+        Returns:
+            int: ID of the new plan
+        """
 
         api_plan_create = plan_to_create.to_api_create(model_id)
         create_plan_mutation = """
@@ -167,35 +426,8 @@ class AerieClient:
         )
         plan_id = plan_resp["id"]
         plan_revision = plan_resp["revision"]
-        # This loop exists to make sure all anchor IDs are updated as necessary
-
-        # Deep copy activities so we can augment and pop from the list
-        activities_to_upload = deepcopy(plan_to_create.activities)
-
-        # Map of old to new directive IDs
-        directive_id_mapping = {}
-
-        # Boolean catches errors to avoid an infinite loop
-        running = True
-        while len(activities_to_upload):
-            running = False
-
-            for act in activities_to_upload:
-                # If activity is anchored and the anchor isn't known yet, pass
-                # If activity is anchored and the anchor is known, add it
-                if act.anchor_id and act.anchor_id not in directive_id_mapping.keys():
-                    continue
-                else:
-                    if act.anchor_id:
-                        act.anchor_id = directive_id_mapping[act.anchor_id]
-                    directive_id_mapping[act.id] = self.create_activity(act, plan_id)
-                    activities_to_upload.remove(act)
-                    running = True
-
-            if not running:
-                raise RuntimeError(
-                    f"Failed to anchor activities: {', '.join([act.name for act in activities_to_upload])}"
-                )
+
+        self.create_activities(plan_to_create.activities, plan_id, chunk_size)
 
         simulation_start_time = plan_to_create.start_time.isoformat()
         simulation_end_time = plan_to_create.end_time.isoformat()
@@ -259,6 +491,35 @@ class AerieClient:
 
         return activity_id
 
+    def create_activities(
+        self,
+        activities: List[Activity],
+        plan_id: int,
+        chunk_size: int = DEFAULT_ACTIVITY_CHUNK_SIZE,
+    ) -> List[int]:
+        """Bulk upload activity directives to a plan
+
+        Activities are grouped into levels by anchor: unanchored activities first, then activities anchored to the
+        previous level. Each level is inserted with as few `insert_activity_directive` mutations as `chunk_size` allows,
+        and anchor IDs are re-mapped to the newly-created directive IDs before the next level is uploaded.
+
+        Args:
+            activities (List[Activity]): Activity directives to upload. Anchors reference the `id` of other activities in this list.
+            plan_id (int): ID of the plan to which activities are added
+            chunk_size (int, optional): Maximum number of activity directives inserted per request
+
+        Raises:
+            RuntimeError: If any activity is anchored to an activity which isn't being uploaded
+
+        Returns:
+            List[int]: IDs of the created activity directives, in the same order as `activities`
+        """
+        created_ids = self.__insert_activity_levels(
+            _sort_activities_by_anchor_level(activities), plan_id, chunk_size, {}
+        )
+
+        return [created_ids[idx] for idx in range(len(activities))]
+
     def update_activity(
         self,
         activity_id: int,
@@ -283,6 +544,203 @@ class AerieClient:
         )
         return resp["id"]
 
+    def sync_activity_plan(
+        self,
+        plan_id: int,
+        activities: List[Activity],
+        chunk_size: int = DEFAULT_ACTIVITY_CHUNK_SIZE,
+    ) -> PlanSyncResult:
+        """Make a plan's activity directives match a list of activities, changing only the directives which differ
+
+        Activities are matched to the plan's directives by `id`. Activities without an ID, or whose ID isn't a directive
+        of the same type in the plan, are matched by type, name, and start offset instead. Matched directives are updated
+        with any changed fields, unmatched activities are inserted, and unmatched directives are deleted. Plan
+        attributes (name, start time, duration) are not changed.
+
+        Inserts, updates, and deletes are issued as one mutation, which Hasura runs in a single transaction. If a new
+        activity is anchored to another new activity, or an existing directive is re-anchored to a new activity, the new
+        activities are first inserted by anchor level as in `create_activities`, so that their IDs are known.
+
+        Args:
+            plan_id (int): ID of the plan to update
+            activities (List[Activity]): Desired activity directives. Anchors reference the `id` of other activities in
+                this list.
+            chunk_size (int, optional): Maximum number of activity directives inserted per request, if new activities
+                must be inserted ahead of the other changes
+
+        Raises:
+            RuntimeError: If any activity is anchored to an activity which isn't in `activities`
+
+        Returns:
+            PlanSyncResult: IDs of the inserted, updated, and deleted directives
+        """
+        existing = {act.id: act for act in self.get_activity_plan_by_id(plan_id).activities}
+
+        # Match by ID first, then by key among the directives which are left
+        remaining = dict(existing)
+        matches: Dict[int, int] = {}
+        unmatched = []
+        for idx, act in enumerate(activities):
+            if act.id in remaining and remaining[act.id].type == act.type:
+                matches[idx] = remaining.pop(act.id).id
+            else:
+                unmatched.append(idx)
+
+        directives_by_key: Dict[Tuple, List[int]] = {}
+        for directive in remaining.values():
+            directives_by_key.setdefault(_activity_sync_key(directive), []).append(directive.id)
+
+        to_insert = []
+        for idx in unmatched:
+            candidates = directives_by_key.get(_activity_sync_key(activities[idx]))
+            if candidates:
+                matches[idx] = candidates.pop(0)
+                del remaining[matches[idx]]
+            else:
+                to_insert.append(activities[idx])
+
+        # Map of input to existing directive IDs, for anchors
+        directive_id_mapping = {activities[idx].id: d_id for idx, d_id in matches.items() if activities[idx].id is not None}
+        new_ids = {act.id for act in to_insert if act.id is not None}
+
+        unresolved = [
+            activities[idx] for idx in matches
+            if activities[idx].anchor_id is not None
+            and activities[idx].anchor_id not in directive_id_mapping
+            and activities[idx].anchor_id not in new_ids
+        ]
+        if len(unresolved):
+            raise RuntimeError(
+                f"Failed to anchor activities: {', '.join([act.name for act in unresolved])}"
+            )
+
+        levels = _sort_activities_by_anchor_level(to_insert, resolved_ids=set(directive_id_mapping))
+        inserted_ids = []
+        if len(levels) > 1 or any(activities[idx].anchor_id in new_ids for idx in matches):
+            created_ids = self.__insert_activity_levels(levels, plan_id, chunk_size, directive_id_mapping)
+            inserted_ids = [created_ids[idx] for idx in range(len(to_insert))]
+            levels = []
+
+        inserts = []
+        for level in levels:
+            for _, act in level:
+                api_activity = act.to_api_create(plan_id).to_dict()
+                if act.anchor_id is not None:
+                    api_activity["anchor_id"] = directive_id_mapping[act.anchor_id]
+                inserts.append((act, api_activity))
+
+        updates = []
+        for idx, directive_id in matches.items():
+            api_activity = activities[idx].to_api_update().to_dict()
+            if activities[idx].anchor_id is not None:
+                api_activity["anchor_id"] = directive_id_mapping[activities[idx].anchor_id]
+            current = existing[directive_id].to_api_update().to_dict()
+            changed = {k: v for k, v in api_activity.items() if current.get(k) != v}
+            if len(changed):
+                updates.append({
+                    "where": {"id": {"_eq": directive_id}, "plan_id": {"_eq": plan_id}},
+                    "_set": changed,
+                })
+
+        deletes = list(remaining)
+
+        # Hasura runs the fields of a mutation in order, so directives are re-anchored before their anchors are deleted
+        variables = {}
+        declarations = []
+        fields = []
+        if len(inserts):
+            variables["inserts"] = [api_activity for _, api_activity in inserts]
+            declarations.append("$inserts: [activity_directive_insert_input!]!")
+            fields.append(
+                "insertActivities: insert_activity_directive(objects: $inserts) "
+                "{ returning { id type name start_offset anchor_id } }"
+            )
+        if len(updates):
+            variables["updates"] = updates
+            declarations.append("$updates: [activity_directive_updates!]!")
+            fields.append("updateActivities: update_activity_directive_many(updates: $updates) { returning { id } }")
+        if len(deletes):
+            variables["plan_id"] = plan_id
+            variables["deletes"] = deletes
+            declarations.extend(["$plan_id: Int!", "$deletes: [Int!]!"])
+            fields.append(
+                "deleteActivities: delete_activity_directive("
+                "where: { plan_id: { _eq: $plan_id }, id: { _in: $deletes } }) { returning { id } }"
+            )
+
+        result = PlanSyncResult(inserted=inserted_ids, updated=[], deleted=[])
+        if not len(fields):
+            return result
+
+        sync_mutation = "mutation SyncActivities(" + ", ".join(declarations) + ") {\n" + "\n".join(fields) + "\n}"
+        resp = self.aerie_host.post_to_graphql_fields(sync_mutation, **variables)
+
+        if "insertActivities" in resp:
+            result.inserted = _match_inserted_directives(inserts, resp["insertActivities"]["returning"])
+        if "updateActivities" in resp:
+            result.updated = [act["id"] for batch in resp["updateActivities"] for act in batch["returning"]]
+        if "deleteActivities" in resp:
+            result.deleted = [act["id"] for act in resp["deleteActivities"]["returning"]]
+
+        return result
+
+    def __insert_activity_levels(
+        self,
+        levels: List[List[Tuple[int, Activity]]],
+        plan_id: int,
+        chunk_size: int,
+        directive_id_mapping: Dict[int, int],
+    ) -> Dict[int, int]:
+        """Insert levels of activity directives, as grouped by `_sort_activities_by_anchor_level`
+
+        Args:
+            levels (List[List[Tuple[int, Activity]]]): Levels of (index, activity) to insert, in order
+            plan_id (int): ID of the plan to which activities are added
+            chunk_size (int): Maximum number of activity directives inserted per request
+            directive_id_mapping (Dict[int, int]): Map of activity `id` to directive ID in Aerie, used to re-map anchors.
+                Updated with the inserted activities.
+
+        Returns:
+            Dict[int, int]: Map of index to the ID of the created activity directive
+        """
+        insert_activities_mutation = """
+        mutation CreateActivities($activities: [activity_directive_insert_input!]!) {
+            createActivities: insert_activity_directive(objects: $activities) {
+                returning {
+                    id
+                    type
+                    name
+                    start_offset
+                    anchor_id
+                }
+            }
+        }
+        """
+
+        created_ids = {}
+        for level in levels:
+            for chunk_start in range(0, len(level), chunk_size):
+                chunk = level[chunk_start:chunk_start + chunk_size]
+
+                inserted = []
+                for _, act in chunk:
+                    api_activity = act.to_api_create(plan_id).to_dict()
+                    if act.anchor_id is not None:
+                        api_activity["anchor_id"] = directive_id_mapping[act.anchor_id]
+                    inserted.append((act, api_activity))
+
+                resp = self.aerie_host.post_to_graphql(
+                    insert_activities_mutation,
+                    activities=[api_activity for _, api_activity in inserted]
+                )
+
+                for (idx, act), directive_id in zip(chunk, _match_inserted_directives(inserted, resp["returning"])):
+                    created_ids[idx] = directive_id
+                    if act.id is not None:
+                        directive_id_mapping[act.id] = directive_id
+
+        return created_ids
+
     def get_all_activity_presets(self, m_id:int) -> List:
         get_all_presets_query = """
         query ($model_id: Int!) {
@@ -326,8 +784,80 @@ class AerieClient:
 
         return resp["returning"]
 
-    def simulate_plan(self, plan_id: int, poll_period: int = 5) -> int:
+    def simulate_plan(
+        self,
+        plan_id: int,
+        poll_period: float = 5,
+        subscribe: bool = False,
+        initial_poll_period: float = SIMULATION_INITIAL_POLL_PERIOD,
+    ) -> int:
+        """Simulate a plan and wait for the simulation to finish
+
+        By default, the simulation status is polled, starting every `initial_poll_period` seconds and backing off
+        until polls are `poll_period` seconds apart. With `subscribe`, Aerie is instead asked once to start the
+        simulation and its dataset status is watched over a GraphQL websocket subscription, which returns as soon as the
+        simulation finishes (requires the optional `websocket-client` package).
+
+        Args:
+            plan_id (int): ID of the plan to simulate
+            poll_period (float, optional): Maximum seconds between polls. Defaults to 5.
+            subscribe (bool, optional): Wait on a websocket subscription instead of polling. Defaults to False.
+            initial_poll_period (float, optional): Seconds before the first poll.
+
+        Raises:
+            SimulationFailedError: If the simulation fails
 
+        Returns:
+            int: ID of the simulation dataset
+        """
+        resp = self.__start_simulation(plan_id)
+        return self.__wait_for_simulation(plan_id, resp, poll_period, subscribe, initial_poll_period)
+
+    def simulate_plans(
+        self,
+        plan_ids: List[int],
+        poll_period: float = 5,
+        subscribe: bool = False,
+        max_workers: int = SIMULATION_MAX_WORKERS,
+        initial_poll_period: float = SIMULATION_INITIAL_POLL_PERIOD,
+    ) -> Iterator[PlanSimulationResult]:
+        """Simulate several plans concurrently, yielding each plan's result as soon as its simulation finishes
+
+        All simulations are requested first, then waited on by a pool of `max_workers` threads as in `simulate_plan`. A
+        failed simulation doesn't stop the others; its result holds the error instead of a simulation dataset ID.
+
+        Args:
+            plan_ids (List[int]): IDs of the plans to simulate
+            poll_period (float, optional): Maximum seconds between polls of each simulation. Defaults to 5.
+            subscribe (bool, optional): Wait on websocket subscriptions instead of polling. Defaults to False.
+            max_workers (int, optional): Maximum number of concurrent requests
+            initial_poll_period (float, optional): Seconds before the first poll of each simulation.
+
+        Yields:
+            PlanSimulationResult: Result for each plan, in order of completion
+        """
+        t0 = time.perf_counter()
+
+        def wait(plan_id: int, started: Future) -> PlanSimulationResult:
+            try:
+                sim_dataset_id = self.__wait_for_simulation(
+                    plan_id, started.result(), poll_period, subscribe, initial_poll_period
+                )
+                return PlanSimulationResult(plan_id, sim_dataset_id, time.perf_counter() - t0)
+            except Exception as e:
+                return PlanSimulationResult(plan_id, None, time.perf_counter() - t0, error=e)
+
+        # Tasks run in submission order, so every simulation is requested before any is waited on
+        n_workers = max(1, min(max_workers, len(plan_ids)))
+        self.aerie_host.reserve_connections(n_workers)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            started = [executor.submit(self.__start_simulation, plan_id) for plan_id in plan_ids]
+            waiting = [executor.submit(wait, plan_id, s) for plan_id, s in zip(plan_ids, started)]
+            for future in as_completed(waiting):
+                yield future.result()
+
+    def __start_simulation(self, plan_id: int) -> Dict:
+        """Request a plan's simulation, returning the status, reason, and simulationDatasetId"""
         simulate_query = """
         query Simulate($plan_id: Int!) {
             simulate(planId: $plan_id) {
@@ -337,29 +867,70 @@ class AerieClient:
             }
         }
         """
+        return self.aerie_host.post_to_graphql(simulate_query, plan_id=plan_id)
 
-        def exec_sim_query():
-            return self.aerie_host.post_to_graphql(simulate_query, plan_id=plan_id)
+    def __wait_for_simulation(
+        self, plan_id: int, resp: Dict, poll_period: float, subscribe: bool, initial_poll_period: float
+    ) -> int:
+        """Wait for a simulation to finish, given the response to the request which started it
 
-        resp = exec_sim_query()
+        Raises:
+            SimulationFailedError: If the simulation fails
 
-        nonterminal_status = ["incomplete", "pending"]
-        while resp["status"] in nonterminal_status:
-            time.sleep(poll_period)
-            resp = exec_sim_query()
+        Returns:
+            int: ID of the simulation dataset
+        """
+        if subscribe and resp["status"] in SIMULATION_NONTERMINAL_STATUSES:
+            resp = self.__wait_for_simulation_dataset(resp["simulationDatasetId"])
+
+        period = min(initial_poll_period, poll_period)
+        while resp["status"] in SIMULATION_NONTERMINAL_STATUSES:
+            time.sleep(period)
+            period = min(period * SIMULATION_POLL_BACKOFF, poll_period)
+            resp = self.__start_simulation(plan_id)
 
         if resp["status"] == "failed":
-            sys.exit(f"Simulation failed. Response:\n{resp}")
+            raise SimulationFailedError(plan_id, resp)
+
+        return resp["simulationDatasetId"]
+
+    def __wait_for_simulation_dataset(self, sim_dataset_id: int) -> Dict:
+        """Watch a simulation dataset's status over a subscription until the simulation finishes
+
+        Returns:
+            Dict: Final status, reason, and simulationDatasetId, as returned by the `simulate` query
+        """
+        status_subscription = """
+        subscription SimulationDatasetStatus($id: Int!) {
+            simulation_dataset_by_pk(id: $id) {
+                status
+                reason
+            }
+        }
+        """
+        updates = self.aerie_host.subscribe_to_graphql(status_subscription, id=sim_dataset_id)
+        try:
+            for dataset in updates:
+                if dataset is not None and dataset["status"] not in SIMULATION_NONTERMINAL_STATUSES:
+                    return {**dataset, "simulationDatasetId": sim_dataset_id}
+        finally:
+            updates.close()
 
-        sim_dataset_id = resp["simulationDatasetId"]
-        return sim_dataset_id
+        raise RuntimeError(f"Subscription to simulation dataset {sim_dataset_id} ended before the simulation finished")
 
     def get_resource_timelines(self, plan_id: int):
         samples = self.get_resource_samples(self.get_simulation_dataset_ids_by_plan_id(plan_id)[0])
         api_resource_timeline = ApiResourceSampleResults.from_dict(samples)
         return api_resource_timeline
 
-    def get_resource_samples(self, simulation_dataset_id: int, state_names: List=None):
+    def get_resource_samples(
+        self,
+        simulation_dataset_id: int,
+        state_names: List=None,
+        start: timedelta = None,
+        end: timedelta = None,
+        max_points: int = None,
+    ):
         """Pull resource samples from a simulation dataset, optionally filtering for specific states
 
         Each resource's values are returned in a list of points {x: <time>, y: <value>}.
@@ -373,16 +944,189 @@ class AerieClient:
         Args:
             simulation_dataset_id (int)
             state_names (List, optional): List of state/resource names to pull. Defaults to None (all).
+            start (timedelta, optional): Only pull profile segments from this offset from plan start, plus the segment in
+                progress at that time. Defaults to None (plan start).
+            end (timedelta, optional): Only pull profile segments starting before this offset from plan start.
+                Defaults to None (plan end).
+            max_points (int, optional): Decimate each resource to at most this many samples. See `decimate_samples`.
+                Defaults to None (all samples).
 
         Returns:
             Dict: Object with key "resourceSamples," the value of which is a dictionary of resource sample series keyed by resource name.
         """        
+        return {
+            "resourceSamples": dict(
+                self.iter_resource_samples(
+                    simulation_dataset_id, state_names, start=start, end=end, max_points=max_points
+                )
+            )
+        }
+
+    def iter_resource_samples(
+        self,
+        simulation_dataset_id: int,
+        state_names: List = None,
+        chunk_size: int = None,
+        start: timedelta = None,
+        end: timedelta = None,
+        max_points: int = None,
+    ) -> Iterator[Tuple[str, List[Dict]]]:
+        """Iterate over resource timelines from a simulation dataset, one resource at a time
+
+        Resources are yielded in name order as (name, samples) pairs, where samples are formatted as in
+        `get_resource_samples`. Only one resource's samples are built at a time; if `chunk_size` is given, profile
+        segments are also downloaded `chunk_size` profiles at a time so the raw response stays bounded.
+
+        Args:
+            simulation_dataset_id (int)
+            state_names (List, optional): List of state/resource names to pull. Defaults to None (all).
+            chunk_size (int, optional): Number of profiles to download per request. Defaults to None (all at once).
+            start (timedelta, optional): Start of the time window. See `get_resource_samples`.
+            end (timedelta, optional): End of the time window. See `get_resource_samples`.
+            max_points (int, optional): Maximum number of samples per resource. See `get_resource_samples`.
+
+        Yields:
+            Tuple[str, List[Dict]]: Resource name and list of samples
+        """
+        for name, arrays in self.iter_resource_arrays(
+            simulation_dataset_id, state_names, chunk_size, start=start, end=end, max_points=max_points
+        ):
+            yield name, arrays_to_samples(*arrays)
+
+    def iter_resource_arrays(
+        self,
+        simulation_dataset_id: int,
+        state_names: List = None,
+        chunk_size: int = None,
+        start: timedelta = None,
+        end: timedelta = None,
+        max_points: int = None,
+    ) -> Iterator[Tuple[str, Tuple[np.ndarray, np.ndarray]]]:
+        """Iterate over resource timelines from a simulation dataset as arrays, one resource at a time
+
+        Like `iter_resource_samples`, but each timeline is a pair of arrays: int64 sample times in microseconds from
+        plan start, and sample values. See `profile_segments_to_arrays` for details.
+
+        Args:
+            simulation_dataset_id (int)
+            state_names (List, optional): List of state/resource names to pull. Defaults to None (all).
+            chunk_size (int, optional): Number of profiles to download per request. Defaults to None (all at once).
+            start (timedelta, optional): Start of the time window. See `get_resource_samples`.
+            end (timedelta, optional): End of the time window. See `get_resource_samples`.
+            max_points (int, optional): Maximum number of samples per resource. See `get_resource_samples`.
+
+        Yields:
+            Tuple[str, Tuple[np.ndarray, np.ndarray]]: Resource name and arrays of sample times and values
+        """
+        yield from self.get_simulation_resource_timelines(
+            simulation_dataset_id, state_names, chunk_size, start=start, end=end, max_points=max_points
+        ).resources
+
+    def get_simulation_resource_timelines(
+        self,
+        simulation_dataset_id: int,
+        state_names: List = None,
+        chunk_size: int = None,
+        start: timedelta = None,
+        end: timedelta = None,
+        max_points: int = None,
+    ) -> ResourceTimelines:
+        """Get the plan start time and duration of a simulation dataset, and a generator of its resource timelines
+
+        Profiles are requested in the same nested query as the plan start time and duration. If `chunk_size` is given,
+        only profile names are requested up front, and profile segments are requested as the timelines are iterated.
+
+        Args:
+            simulation_dataset_id (int)
+            state_names (List, optional): List of state/resource names to pull. Defaults to None (all).
+            chunk_size (int, optional): Number of profiles to download per request. Defaults to None (all at once).
+            start (timedelta, optional): Start of the time window. See `get_resource_samples`.
+            end (timedelta, optional): End of the time window. See `get_resource_samples`.
+            max_points (int, optional): Maximum number of samples per resource. See `get_resource_samples`.
+
+        Returns:
+            ResourceTimelines: Plan start time and duration, and resource timelines as arrays (see
+                `iter_resource_arrays`)
+        """
+        window = None
+        if start is not None or end is not None:
+            window = (start, end)
+
+        if chunk_size is None:
+            resp = self.__get_profiles(simulation_dataset_id, state_names, window)
+            profile_chunks = iter([resp["dataset"]["profiles"]])
+
+        else:
+            profile_names_query = """
+            query GetSimulationProfileNames($simulation_dataset_id: Int!) {
+                simulation_dataset_by_pk(id: $simulation_dataset_id) {
+                    simulation {
+                        plan {
+                            start_time
+                            duration
+                        }
+                    }
+                    dataset {
+                        profiles {
+                            name
+                        }
+                    }
+                }
+            }
+            """
+            resp = self.aerie_host.post_to_graphql(profile_names_query, simulation_dataset_id=simulation_dataset_id)
+            names = sorted(
+                p["name"] for p in resp["dataset"]["profiles"] if not state_names or p["name"] in state_names
+            )
+            profile_chunks = (
+                self.__get_profiles(simulation_dataset_id, names[i:i + chunk_size], window)["dataset"]["profiles"]
+                for i in range(0, len(names), chunk_size)
+            )
+
+        plan = resp["simulation"]["plan"]
+        duration = postgres_interval_to_microseconds(plan["duration"])
+        return ResourceTimelines(
+            plan_start_time=plan["start_time"],
+            plan_duration=timedelta(microseconds=duration),
+            resources=self.__iter_profile_arrays(profile_chunks, duration, max_points),
+        )
+
+    def __iter_profile_arrays(
+        self, profile_chunks: Iterator[List[Dict]], duration: int, max_points: int = None
+    ) -> Iterator[Tuple[str, Tuple[np.ndarray, np.ndarray]]]:
+        for profiles in profile_chunks:
+            for profile in sorted(profiles, key=lambda _: _["name"]):
+                arrays = profile_segments_to_arrays(profile, self.__get_profile_end(profile, duration))
+                if max_points is not None:
+                    arrays = decimate_samples(*arrays, profile["type"]["type"], max_points)
+                yield profile["name"], arrays
+
+    @staticmethod
+    def __get_profile_end(profile: Dict, duration: int) -> int:
+        # In a time window, the last segment ends where the first segment after the window starts
+        following_segment = profile.get("following_segment")
+        if following_segment:
+            return postgres_interval_to_microseconds(following_segment[0]["start_offset"])
+        return duration
+
+    def __get_profiles(
+        self, simulation_dataset_id: int, state_names: List = None, window: Tuple[timedelta, timedelta] = None
+    ) -> Dict:
+        """Get profiles, and the plan start time and duration, from a simulation dataset"""
+        if window is not None:
+            return self.__get_profiles_in_window(simulation_dataset_id, state_names, *window)
 
         # checks to see if user inputted specific states. If so, use this query.
         if state_names:
             resource_profile_query = """
             query GetSimulationDataset($simulation_dataset_id: Int!, $state_names: [String!]) {
                 simulation_dataset_by_pk(id: $simulation_dataset_id) {
+                    simulation {
+                        plan {
+                            start_time
+                            duration
+                        }
+                    }
                     dataset {
                         profiles(where: { name: { _in: $state_names } }) {
                             name
@@ -403,6 +1147,12 @@ class AerieClient:
             resource_profile_query = """
             query GetSimulationDataset($simulation_dataset_id: Int!) {
                 simulation_dataset_by_pk(id: $simulation_dataset_id) {
+                    simulation {
+                        plan {
+                            start_time
+                            duration
+                        }
+                    }
                     dataset {
                         profiles {
                             name
@@ -417,108 +1167,78 @@ class AerieClient:
             }
             """
             resp = self.aerie_host.post_to_graphql(resource_profile_query, simulation_dataset_id=simulation_dataset_id)
-        
-        
-        profiles = resp["dataset"]["profiles"]
-
-        plan_duration_query = """
-        query GetPlanDuration($plan_id: Int!) {
-          plan_by_pk(id: $plan_id) {
-            duration
-          }
-        }
-        """
-        resp = self.aerie_host.post_to_graphql(
-            plan_duration_query,
-            plan_id=self.get_plan_id_by_sim_id(simulation_dataset_id),
-        )
-        duration = postgres_interval_to_microseconds(resp["duration"])
-
-        # Parse profile segments into resource timelines
-        resources = {}
-        for profile in sorted(profiles, key=lambda _: _["name"]):
-            name = profile["name"]
-            profile_segments = profile["profile_segments"]
-            profile_type = profile["type"]["type"]
-            values = []
-
-            for i in range(len(profile_segments)):
-                segment = profile_segments[i]
-
-                # The segment offset is the offset from plan start to the beginning of this segment
-                segment_start_time = postgres_interval_to_microseconds(
-                    segment["start_offset"]
-                )
-
-                # If this is *not* the last segment, then this segment ends where the next segment starts
-                if i + 1 < len(profile_segments):
-                    segment_end_time = postgres_interval_to_microseconds(
-                        profile_segments[i + 1]["start_offset"]
-                    )
-
-                # If this is the last segment, then this segment ends at the end of the plan
-                else:
-                    segment_end_time = duration
-
-                dynamics = segment["dynamics"]
-
-                # Discrete profiles don't have rates
-                if profile_type == 'discrete':
-
-                    # Define points at the start and end of this profile segment
-                    start_value = {
-                        "x": segment_start_time,
-                        "y": dynamics,
-                    }
-                    end_value = {
-                        "x": segment_end_time,
-                        "y": dynamics,
-                    }
-
-                    # Check if the previous point is identical to this one
-                    if len(values) and (values[-1] == start_value):
 
-                        # If the resource value hasn't changed, remove the previous point and extend out to the end of this profile segment
-                        values.pop()
-                        values.append(end_value)
-
-                    else:
-
-                        # If the value has changed, add points at the boundaries of this segment
-                        values.append(start_value)
-                        values.append(end_value)
+        return resp
 
-                # Real profiles can have rates over time
-                elif profile_type == 'real':
+    def __get_profiles_in_window(
+        self, simulation_dataset_id: int, state_names: List, start: timedelta, end: timedelta
+    ) -> Dict:
+        """Get profile segments in a time window, plus the segment in progress at the start of the window
 
-                    start_value = {
-                        "x": segment_start_time,
-                        "y": dynamics["initial"],
+        The first segment starting at or after the end of the window is returned as "following_segment".
+        """
+        resource_profile_query = """
+        query GetSimulationDatasetWindow(
+            $simulation_dataset_id: Int!
+            $profile_filter: profile_bool_exp!
+            $segment_filter: profile_segment_bool_exp!
+            $preceding_filter: profile_segment_bool_exp!
+            $following_filter: profile_segment_bool_exp!
+        ) {
+            simulation_dataset_by_pk(id: $simulation_dataset_id) {
+                simulation {
+                    plan {
+                        start_time
+                        duration
                     }
-
-                    # If the last value is not identical to this segment's start, then add the start
-                    if (len(values) and values[-1] != start_value) or (
-                        len(values) == 0
-                    ):
-                        values.append(start_value)
-
-                    # Add a value at the end of this segment
-                    values.append(
-                        {
-                            "x": segment_end_time,
-                            "y": dynamics["initial"]
-                            + dynamics["rate"]
-                            * ((segment_end_time - segment_start_time) / 1e6),
+                }
+                dataset {
+                    profiles(where: $profile_filter) {
+                        name
+                        preceding_segment: profile_segments(
+                            where: $preceding_filter, order_by: { start_offset: desc }, limit: 1
+                        ) {
+                            dynamics
+                            start_offset
                         }
-                    )
+                        profile_segments(where: $segment_filter, order_by: { start_offset: asc }) {
+                            dynamics
+                            start_offset
+                        }
+                        following_segment: profile_segments(
+                            where: $following_filter, order_by: { start_offset: asc }, limit: 1
+                        ) {
+                            start_offset
+                        }
+                        type
+                    }
+                }
+            }
+        }
+        """
+        # An empty filter matches everything, and its negation matches nothing
+        segment_filter = {}
+        preceding_filter = {"_not": {}}
+        following_filter = {"_not": {}}
+        if start is not None:
+            segment_filter["_gt"] = timedelta_to_postgres_interval(start)
+            preceding_filter = {"start_offset": {"_lte": timedelta_to_postgres_interval(start)}}
+        if end is not None:
+            segment_filter["_lt"] = timedelta_to_postgres_interval(end)
+            following_filter = {"start_offset": {"_gte": timedelta_to_postgres_interval(end)}}
 
-                else:
-                    raise ValueError(f"Unknown resource profile type: {profile_type}")
+        resp = self.aerie_host.post_to_graphql(
+            resource_profile_query,
+            simulation_dataset_id=simulation_dataset_id,
+            profile_filter={"name": {"_in": state_names}} if state_names else {},
+            segment_filter={"start_offset": segment_filter} if segment_filter else {},
+            preceding_filter=preceding_filter,
+            following_filter=following_filter,
+        )
 
-            resources[name] = values
-        return {
-            "resourceSamples": resources
-        }
+        for profile in resp["dataset"]["profiles"]:
+            profile["profile_segments"] = profile.pop("preceding_segment") + profile["profile_segments"]
+        return resp
 
     def get_simulation_results(self, sim_dataset_id: int) -> str:
 
@@ -542,6 +1262,63 @@ class AerieClient:
             sim_result_query, sim_dataset_id=sim_dataset_id)
         return resp
 
+    def iter_simulation_results(
+        self, sim_dataset_id: int, page_size: int = DEFAULT_SIMULATION_RESULTS_PAGE_SIZE
+    ) -> Iterator[Dict]:
+        """Iterate over simulated activities from a simulation dataset, downloading one page at a time
+
+        Activities are yielded in the same format and order as `get_simulation_results`, but only one page is held in
+        memory at a time. Pages are requested with keyset pagination on (start_offset, id), so each request is
+        equally cheap regardless of how deep into the dataset it is.
+
+        Args:
+            sim_dataset_id (int): ID of the simulation dataset
+            page_size (int, optional): Number of simulated activities to request at a time
+
+        Yields:
+            Dict: Simulated activity
+        """
+        sim_result_page_query = """
+        query SimulationPage($where: simulated_activity_bool_exp!, $limit: Int!) {
+            simulated_activity(where: $where, order_by: [{ start_offset: asc }, { id: asc }], limit: $limit) {
+                activity_type_name
+                attributes
+                directive_id
+                duration
+                end_time
+                id
+                start_offset
+                start_time
+                simulation_dataset_id
+                parent_id
+            }
+        }
+        """
+        dataset_filter = {"simulation_dataset_id": {"_eq": sim_dataset_id}}
+        where = dataset_filter
+        while True:
+            page = self.aerie_host.post_to_graphql(
+                sim_result_page_query, where=where, limit=page_size
+            )
+            yield from page
+
+            if len(page) < page_size:
+                return
+
+            # Continue after the last activity of this page
+            last = page[-1]
+            where = {
+                "_and": [
+                    dataset_filter,
+                    {
+                        "_or": [
+                            {"start_offset": {"_gt": last["start_offset"]}},
+                            {"start_offset": {"_eq": last["start_offset"]}, "id": {"_gt": last["id"]}},
+                        ]
+                    },
+                ]
+            }
+
     def delete_plan(self, plan_id: int) -> str:
 
         delete_plan_mutation = """
@@ -587,6 +1364,7 @@ class AerieClient:
         resp = self.aerie_host.post_to_graphql(
             create_model_mutation, model=api_mission_model.to_dict()
         )
+        self._invalidate_cached_mission_model(resp["id"])
 
         return resp["id"]
 
@@ -626,6 +1404,7 @@ class AerieClient:
 
         resp = self.aerie_host.post_to_graphql(
             delete_model_mutation, model_id=model_id)
+        self._invalidate_cached_mission_model(model_id)
 
         return resp["name"]
 
@@ -643,7 +1422,7 @@ class AerieClient:
         }
         """
 
-        resp = self.aerie_host.post_to_graphql(get_mission_model_query)
+        resp = self._post_cached_metadata_query("get_mission_models", get_mission_model_query)
         api_mission_models = [
             ApiMissionModelRead.from_dict(model) for model in resp]
 
@@ -819,6 +1598,7 @@ class AerieClient:
             mission_model_id=model_id,
             command_dictionary_id=command_dictionary_id,
         )
+        self._invalidate_cached_metadata_query("list_expansion_rules")
 
         return data["id"]
 
@@ -951,7 +1731,7 @@ class AerieClient:
             }
         }
         """
-        resp = self.aerie_host.post_to_graphql(list_rules_query)
+        resp = self._post_cached_metadata_query("list_expansion_rules", list_rules_query)
         return [ExpansionRule.from_dict(r) for r in resp]
 
     def get_rules_by_type(self) -> Dict[str, List[ExpansionRule]]:
@@ -1049,6 +1829,41 @@ class AerieClient:
         )
         return [ExpansionRun.from_dict(r) for r in resp]
 
+    def list_expansion_runs_by_datasets(
+        self, simulation_dataset_ids: List[int], chunk_size: int = DEFAULT_ID_FILTER_CHUNK_SIZE
+    ) -> List[ExpansionRun]:
+        """List all expansion runs from several simulation datasets
+
+        Runs are fetched with one query per `chunk_size` datasets.
+
+        Args:
+            simulation_dataset_ids (List[int]): IDs of the simulation datasets
+            chunk_size (int, optional): Maximum number of dataset IDs per query
+
+        Returns:
+            List[ExpansionRun]: Expansion runs in reverse chronological order
+        """
+        get_runs_query = """
+        query GetExpansionRunsByDatasets($simulation_dataset_ids: [Int!]!) {
+            expansion_run(order_by: { created_at: desc }, where: { simulation_dataset_id: { _in: $simulation_dataset_ids } }) {
+                created_at
+                id
+                expansion_set_id
+                simulation_dataset_id
+            }
+        }
+        """
+        simulation_dataset_ids = [int(sd) for sd in simulation_dataset_ids]
+        runs = []
+        for chunk in _chunks(simulation_dataset_ids, chunk_size):
+            resp = self.aerie_host.post_to_graphql(get_runs_query, simulation_dataset_ids=chunk)
+            runs += [ExpansionRun.from_dict(r) for r in resp]
+
+        # Each chunk is already ordered, but chunks need to be merged
+        if len(simulation_dataset_ids) > chunk_size:
+            runs.sort(key=lambda r: r.created_at, reverse=True)
+        return runs
+
     def get_expansion_run(
         self, expansion_run_id: int, include_commands: bool = False
     ) -> ExpansionRun:
@@ -1079,8 +1894,14 @@ class AerieClient:
         return ExpansionRun.from_dict(resp[0])
 
     def link_activities_to_sequence(
-        self, seq_id: str, simulation_dataset_id: int, simulated_activity_ids: List[int]
-    ) -> None:
+        self,
+        seq_id: str,
+        simulation_dataset_id: int,
+        simulated_activity_ids: List[int],
+        chunk_size: int = DEFAULT_SEQUENCE_LINK_CHUNK_SIZE,
+        max_workers: int = 1,
+        ignore_conflicts: bool = False,
+    ) -> int:
         """Link a set of simulated activities to a sequence for expansion
 
         Take a set of simulated activities (not plan activities) of a given
@@ -1088,37 +1909,54 @@ class AerieClient:
         expansion outputs from the given activities are included in the
         sequence.
 
+        Links are inserted with one `insert_sequence_to_simulated_activity` mutation per `chunk_size` activities.
+
         Args:
             seq_id (str): ID of the sequence to which activities will be linked
             simulation_dataset_id (int): Dataset which contains the activities being linked
             simulated_activity_ids (List[int]): IDs of simulated activities to be linked
-        """
+            chunk_size (int, optional): Maximum number of activities linked per request
+            max_workers (int, optional): Number of chunks to link concurrently. Defaults to 1 (sequential).
+            ignore_conflicts (bool, optional): Skip activities which are already linked to a sequence, instead of
+                failing, so that re-linking is idempotent. Defaults to False.
 
-        for simulated_activity_id in simulated_activity_ids:
+        Returns:
+            int: Number of links created
+        """
+        on_conflict = (
+            ", on_conflict: { constraint: sequence_to_simulated_activity_primary_key, update_columns: [] }"
+            if ignore_conflicts else ""
+        )
+        link_activities_to_sequence_query = f"""
+        mutation LinkSimulatedActivitiesToSequence($links: [sequence_to_simulated_activity_insert_input!]!) {{
+            insert_sequence_to_simulated_activity(objects: $links{on_conflict}) {{
+                affected_rows
+            }}
+        }}
+        """
 
-            link_activity_to_sequence_query = """
-            mutation LinkSimulatedActivityToSequence(
-                $seq_id: String!
-                $simulation_dataset_id: Int!
-                $simulated_activity_id: Int!
-            ) {
-                insert_sequence_to_simulated_activity_one(
-                    object: {
-                        seq_id: $seq_id
-                        simulated_activity_id: $simulated_activity_id
-                        simulation_dataset_id: $simulation_dataset_id
+        def link_chunk(chunk: List[int]) -> int:
+            resp = self.aerie_host.post_to_graphql(
+                link_activities_to_sequence_query,
+                links=[
+                    {
+                        "seq_id": seq_id,
+                        "simulated_activity_id": simulated_activity_id,
+                        "simulation_dataset_id": simulation_dataset_id,
                     }
-                ) {
-                    seq_id
-                }
-            }
-            """
-            self.aerie_host.post_to_graphql(
-                link_activity_to_sequence_query,
-                seq_id=seq_id,
-                simulated_activity_id=simulated_activity_id,
-                simulation_dataset_id=simulation_dataset_id,
+                    for simulated_activity_id in chunk
+                ],
             )
+            return resp["affected_rows"]
+
+        chunks = list(_chunks(simulated_activity_ids, chunk_size))
+        if max_workers <= 1 or len(chunks) <= 1:
+            return sum(link_chunk(chunk) for chunk in chunks)
+
+        n_workers = min(max_workers, len(chunks))
+        self.aerie_host.reserve_connections(n_workers)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            return sum(executor.map(link_chunk, chunks))
 
     def get_simulated_activity_ids(self, simulation_dataset_id: int) -> List[int]:
         """Get the IDs of all simulated activities in a simulation dataset
@@ -1181,6 +2019,42 @@ class AerieClient:
         )
         return data["seqJson"]
 
+    def iter_expanded_sequences(
+        self,
+        seq_ids: List[str],
+        simulation_dataset_id: int,
+        max_workers: int = SEQUENCE_DOWNLOAD_MAX_WORKERS,
+    ) -> Iterator[Tuple[str, Dict]]:
+        """Get SeqJson from several expanded Aerie sequences concurrently
+
+        Args:
+            seq_ids (List[str]): IDs of the sequences
+            simulation_dataset_id (int): ID of the simulation dataset being expanded
+            max_workers (int, optional): Maximum number of concurrent requests
+
+        Raises:
+            RuntimeError: If any sequence fails to download. Downloads which haven't started are cancelled.
+
+        Yields:
+            Tuple[str, Dict]: Sequence ID and SeqJson, in order of completion
+        """
+        if not len(seq_ids):
+            return
+
+        n_workers = max(1, min(max_workers, len(seq_ids)))
+        self.aerie_host.reserve_connections(n_workers)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = {
+                executor.submit(self.get_expanded_sequence, seq_id, simulation_dataset_id): seq_id
+                for seq_id in seq_ids
+            }
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
     def list_sequences(self, simulation_dataset_id: int) -> List[str]:
         """List all sequences tied to a simulation dataset
 
@@ -1204,6 +2078,35 @@ class AerieClient:
         )
         return [s["seq_id"] for s in data]
 
+    def list_sequences_by_datasets(
+        self, simulation_dataset_ids: List[int], chunk_size: int = DEFAULT_ID_FILTER_CHUNK_SIZE
+    ) -> Dict[int, List[str]]:
+        """List all sequences tied to several simulation datasets
+
+        Sequences are fetched with one query per `chunk_size` datasets.
+
+        Args:
+            simulation_dataset_ids (List[int]): IDs on the Aerie host
+            chunk_size (int, optional): Maximum number of dataset IDs per query
+
+        Returns:
+            Dict[int, List[str]]: Sequence IDs in alphabetical order, by simulation dataset ID in the order given
+        """
+        list_sequences_query = """
+        query ListSequencesByDatasets($simulation_dataset_ids: [Int!]!) {
+            sequence(order_by: { seq_id: asc }, where: { simulation_dataset_id: { _in: $simulation_dataset_ids } }) {
+                seq_id
+                simulation_dataset_id
+            }
+        }
+        """
+        seq_ids_by_dataset = {int(sd): [] for sd in simulation_dataset_ids}
+        for chunk in _chunks(list(seq_ids_by_dataset), chunk_size):
+            data = self.aerie_host.post_to_graphql(list_sequences_query, simulation_dataset_ids=chunk)
+            for s in data:
+                seq_ids_by_dataset[s["simulation_dataset_id"]].append(s["seq_id"])
+        return seq_ids_by_dataset
+
     def delete_sequence(self, seq_id: str, simulation_dataset_id: int) -> None:
         """Delete a command sequence
 
@@ -1283,8 +2186,8 @@ class AerieClient:
             }
         }
         """
-        data = self.aerie_host.post_to_graphql(
-            get_types_query, model_id=model_id)
+        data = self._post_cached_metadata_query(
+            "get_all_activity_types", get_types_query, model_id=model_id)
         activity_types = [o["name"] for o in data]
         return activity_types
 
@@ -1304,7 +2207,7 @@ class AerieClient:
             }
         }
         """
-        resp = self.aerie_host.post_to_graphql(list_dictionaries_query)
+        resp = self._post_cached_metadata_query("list_command_dictionaries", list_dictionaries_query)
         return [CommandDictionaryInfo.from_dict(i) for i in resp]
 
     def upload_command_dictionary(self, command_dictionary_string: str) -> int:
@@ -1330,6 +2233,7 @@ class AerieClient:
             upload_command_dictionary_query,
             command_dictionary_string=command_dictionary_string,
         )
+        self._invalidate_cached_metadata_query("list_command_dictionaries")
 
         return data["id"]
 
@@ -1541,6 +2445,8 @@ class AerieClient:
             get_plan_revision_query, 
             plan_id=planId
         )
+        if not resp:
+            raise RuntimeError(f"Plan with ID {planId} not found")
 
         return resp[0]["revision"]
 
@@ -1549,30 +2455,106 @@ class AerieClient:
             return plan
         expand_all = full_args.lower() == "true"
         expand_types = {} if expand_all else set(full_args.split(","))
+
+        # Group activities with identical type and arguments, which have identical effective arguments
+        activities_by_key: Dict[Tuple[str, str], List[Activity]] = {}
         for activity in plan.activities:
             if expand_all or activity.type in expand_types:
-                query = """
-                query ($args: ActivityArguments!, $act_type: String!, $model_id: ID!) {
-                    getActivityEffectiveArguments(
-                        activityArguments: $args,
-                        activityTypeName: $act_type,
+                key = (activity.type, hash_arguments(activity.arguments))
+                activities_by_key.setdefault(key, []).append(activity)
+
+        keys = list(activities_by_key.keys())
+        unique_activities = [(k[0], activities_by_key[k][0].arguments) for k in keys]
+        effective_arguments = self.get_effective_activity_arguments(plan.model_id, unique_activities)
+
+        for key, arguments in zip(keys, effective_arguments):
+            for activity in activities_by_key[key]:
+                activity.arguments = deepcopy(arguments)
+        return plan
+
+    def get_effective_activity_arguments(
+        self,
+        model_id: int,
+        activities: List[Tuple[str, Dict]],
+        batch_size: int = EFFECTIVE_ARGS_BATCH_SIZE,
+        max_workers: int = EFFECTIVE_ARGS_MAX_WORKERS,
+    ) -> List[Dict]:
+        """Get the effective (default-filled) arguments for a list of activities
+
+        Multiple activities are queried per request as aliased `getActivityEffectiveArguments` fields, and requests
+        are issued concurrently. If the client has an effective arguments cache, cached results are used and new
+        successful results are stored.
+
+        Args:
+            model_id (int): ID of the mission model
+            activities (List[Tuple[str, Dict]]): Pairs of activity type name and supplied arguments
+            batch_size (int, optional): Maximum number of activities queried per request
+            max_workers (int, optional): Maximum number of concurrent requests
+
+        Returns:
+            List[Dict]: Effective arguments, in the same order as `activities`
+        """
+
+        def get_batch(batch: List[Tuple[str, Dict]]) -> List[Dict]:
+            variable_defs = ["$model_id: ID!"]
+            fields = []
+            variables = {"model_id": model_id}
+            for i, (act_type, arguments) in enumerate(batch):
+                variable_defs.append(f"$args_{i}: ActivityArguments!, $act_type_{i}: String!")
+                fields.append(
+                    f"""
+                    effective_{i}: getActivityEffectiveArguments(
+                        activityArguments: $args_{i},
+                        activityTypeName: $act_type_{i},
                         missionModelId: $model_id
                     )
-                    {
+                    {{
                         arguments
                         success
-                    }
-                }
-                """
-                resp = self.aerie_host.post_to_graphql(
-                    query,
-                    args=activity.arguments,
-                    act_type=activity.type,
-                    model_id=plan.model_id,
+                    }}"""
                 )
-                activity.arguments = ApiEffectiveActivityArguments.from_dict(
-                    resp).arguments
-        return plan
+                variables[f"args_{i}"] = arguments
+                variables[f"act_type_{i}"] = act_type
+
+            query = f"""
+            query GetEffectiveArguments({", ".join(variable_defs)}) {{{"".join(fields)}
+            }}
+            """
+            resp = self.aerie_host.post_to_graphql_fields(query, **variables)
+            return [
+                ApiEffectiveActivityArguments.from_dict(resp[f"effective_{i}"])
+                for i in range(len(batch))
+            ]
+
+        cache = self.effective_arguments_cache
+        if cache is None:
+            cached = {}
+            keys = [None] * len(activities)
+        else:
+            keys = [
+                cache.make_key(self.aerie_host.graphql_url, model_id, act_type, hash_arguments(arguments))
+                for act_type, arguments in activities
+            ]
+            cached = cache.get_many(keys)
+
+        uncached_idxs = [i for i, key in enumerate(keys) if key not in cached]
+        uncached = [activities[i] for i in uncached_idxs]
+
+        batches = [uncached[i:i + batch_size] for i in range(0, len(uncached), batch_size)]
+        n_workers = max(1, min(max_workers, len(batches)))
+        self.aerie_host.reserve_connections(n_workers)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(get_batch, batches))
+        results = [r for batch_result in results for r in batch_result]
+
+        effective_arguments = [cached.get(key) for key in keys]
+        for i, result in zip(uncached_idxs, results):
+            effective_arguments[i] = result.arguments
+
+        if cache is not None:
+            cache.set_many({keys[i]: r.arguments for i, r in zip(uncached_idxs, results) if r.success})
+
+        return effective_arguments
 
     def upload_constraint(self, constraint):
         upload_constraint_query = """
@@ -1688,8 +2670,8 @@ class AerieClient:
         }
         """
 
-        resp = self.aerie_host.post_to_graphql(
-            get_resource_types_query, missionModelId=model_id
+        resp = self._post_cached_metadata_query(
+            "get_resource_types", get_resource_types_query, missionModelId=model_id
         )
         return [ResourceType.from_dict(r) for r in resp]
 
@@ -1736,7 +2718,7 @@ class AerieClient:
         }
         """
 
-        resp = self.aerie_host.post_to_graphql(get_metadata_query)
+        resp = self._post_cached_metadata_query("get_directive_metadata", get_metadata_query)
         return resp
 
     def add_directive_metadata_schemas(self, schemas: list) -> list:
@@ -1765,6 +2747,7 @@ class AerieClient:
             add_schemas_query,
             schemas=schemas
         )
+        self._invalidate_cached_metadata_query("get_directive_metadata")
         return resp
         
     def delete_directive_metadata_schema(self, key) -> list:
@@ -1785,6 +2768,7 @@ class AerieClient:
             delete_schema_query,
             key=key
         )
+        self._invalidate_cached_metadata_query("get_directive_metadata")
         return resp["key"]
 
     def list_plan_collaborators(self, plan_id: int) -> list:
@@ -1,12 +1,25 @@
 import json
+import re
+import time
 import requests
 from copy import deepcopy
+from typing import Callable
 from typing import Dict
+from typing import Iterator
+from typing import List
 from typing import Optional
 from base64 import b64decode
+from datetime import timedelta
 
 from attrs import define, field
 
+from aerie_cli.utils import json_backend
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
 
 def process_gateway_response(resp: requests.Response) -> dict:
     """Throw a RuntimeError if the Gateway response is malformed or contains errors
@@ -31,6 +44,55 @@ def process_gateway_response(resp: requests.Response) -> dict:
     return resp_json
 
 
+GRAPHQL_OPERATION_RE = re.compile(r"^\s*(?:query|mutation|subscription)\s+(\w+)")
+GRAPHQL_ROOT_FIELD_RE = re.compile(r"{\s*(?:\w+\s*:\s*)?(\w+)")
+
+
+def get_graphql_operation_name(query: str) -> str:
+    """Get the operation name of a GraphQL document, or its first root field if the operation is anonymous"""
+    match = GRAPHQL_OPERATION_RE.match(query)
+    if match is None:
+        match = GRAPHQL_ROOT_FIELD_RE.search(query)
+    return match.group(1) if match else "anonymous"
+
+
+@define
+class RequestRecord:
+    """Measurements of a single request to an Aerie host
+
+    api (str): "graphql", "graphql-ws" (subscriptions) or "gateway"
+    operation (str): GraphQL operation name or gateway route
+    variables_bytes (int): Size of JSON-encoded GraphQL variables (0 for gateway requests)
+    request_bytes (int): Size of the request body
+    response_bytes (int): Size of the response body
+    wall_time (float): Seconds from sending the request to receiving the full response
+    server_time (float): Seconds from sending the request to receiving response headers
+    status (int): HTTP status code (the handshake status, 101, for subscriptions), or None if no response was received
+        or a subscription failed
+    """
+
+    api: str
+    operation: str
+    variables_bytes: int
+    request_bytes: int
+    response_bytes: int
+    wall_time: float
+    server_time: Optional[float]
+    status: Optional[int]
+
+    def to_dict(self) -> Dict:
+        return {
+            "api": self.api,
+            "operation": self.operation,
+            "variables_bytes": self.variables_bytes,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "wall_time": self.wall_time,
+            "server_time": self.server_time,
+            "status": self.status,
+        }
+
+
 class AerieJWT:
     def __init__(self, encoded_jwt: str) -> None:
         jwt_components = encoded_jwt.split(".")
@@ -46,6 +108,9 @@ class AerieJWT:
             self.default_role = payload["https://hasura.io/jwt/claims"]["x-hasura-default-role"]
             self.username = payload["username"]
 
+            # Expiry time (seconds since the epoch) is optional
+            self.exp = payload.get("exp")
+
         except KeyError:
             raise ValueError(f"Missing fields in JWT: {encoded_jwt}")
 
@@ -54,6 +119,21 @@ class AerieJWT:
 
         self.encoded_jwt = encoded_jwt
 
+    def is_valid_for(self, duration: timedelta) -> bool:
+        """Check whether the JWT will still be unexpired after a given duration, according to its `exp` claim
+
+        Args:
+            duration (timedelta): Time from now
+
+        Returns:
+            bool: False if the JWT has no expiry time or will have expired by then
+        """
+        # JWTs pickled by older versions don't have an expiry time
+        exp = getattr(self, "exp", None)
+        if exp is None:
+            return False
+        return time.time() + duration.total_seconds() < exp
+
 
 class AerieHost:
     """
@@ -84,6 +164,75 @@ class AerieHost:
         self.configuration_name = configuration_name
         self.aerie_jwt = None
         self.active_role = None
+        self._request_observers: List[Callable[[RequestRecord], None]] = []
+
+    def __getstate__(self) -> Dict:
+        # Observers are runtime hooks and aren't persisted with sessions
+        state = self.__dict__.copy()
+        state.pop("_request_observers", None)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._request_observers = []
+
+    def add_request_observer(self, observer: Callable[[RequestRecord], None]) -> None:
+        """Register a callback to receive a `RequestRecord` after every request to this host
+
+        Args:
+            observer (Callable[[RequestRecord], None]): Called with a record of each GraphQL and gateway request
+        """
+        if observer not in self._request_observers:
+            self._request_observers.append(observer)
+
+    def remove_request_observer(self, observer: Callable[[RequestRecord], None]) -> None:
+        self._request_observers.remove(observer)
+
+    def reserve_connections(self, n: int) -> None:
+        """Size the session's connection pools for `n` concurrent requests
+
+        Concurrent requests share the session. This is safe because workers only send requests: session headers and
+        authentication aren't changed while requests are in flight, the cookie jar is locked, and urllib3's connection
+        pools are thread-safe. Without a large enough pool, connections beyond the default 10 are opened and then
+        discarded instead of reused.
+
+        Args:
+            n (int): Number of concurrent requests
+        """
+        for adapter in self.session.adapters.values():
+            if isinstance(adapter, requests.adapters.HTTPAdapter) and adapter._pool_maxsize < n:
+                # Re-initializing in place keeps any adapter configuration (e.g., retries or TLS settings)
+                adapter.poolmanager.clear()
+                adapter.init_poolmanager(adapter._pool_connections, n, block=adapter._pool_block)
+
+    def _request(
+        self, method: str, url: str, api: str, operation: str, variables_bytes: int = 0, **kwargs
+    ) -> requests.Response:
+        """Issue a request with the session, reporting measurements to any observers"""
+        observers = self._request_observers
+        if not len(observers):
+            return self.session.request(method, url, **kwargs)
+
+        resp = None
+        t0 = time.perf_counter()
+        try:
+            resp = self.session.request(method, url, **kwargs)
+            return resp
+        finally:
+            wall_time = time.perf_counter() - t0
+            request_body = resp.request.body if resp is not None and resp.request is not None else None
+            record = RequestRecord(
+                api=api,
+                operation=operation,
+                variables_bytes=variables_bytes,
+                request_bytes=len(request_body) if request_body else 0,
+                response_bytes=len(resp.content) if resp is not None else 0,
+                wall_time=wall_time,
+                server_time=resp.elapsed.total_seconds() if resp is not None else None,
+                status=resp.status_code if resp is not None else None,
+            )
+            for observer in observers:
+                observer(record)
 
     def post_to_graphql(self, query: str, **kwargs) -> Dict:
         """Issue a post request to the Aerie instance GraphQL API
@@ -98,29 +247,136 @@ class AerieHost:
         Returns:
             Dict: Query response data
         """
+        return self._post_to_graphql(query, kwargs, all_fields=False)
+
+    def post_to_graphql_fields(self, query: str, **kwargs) -> Dict:
+        """Issue a post request to the Aerie instance GraphQL API, returning every top-level field
+
+        Use for documents which query multiple (aliased) fields in one request.
+
+        Args:
+            query (str): GraphQL query text
+            kwargs: keyword arguments for named variables for the query
+
+        Raises:
+            RuntimeError
+
+        Returns:
+            Dict: Query response data keyed by field name or alias
+        """
+        return self._post_to_graphql(query, kwargs, all_fields=True)
+
+    def subscribe_to_graphql(self, query: str, **kwargs) -> Iterator[Dict]:
+        """Subscribe to a GraphQL query over a websocket, yielding the data of each update
+
+        Uses the `graphql-transport-ws` protocol and requires the optional `websocket-client` package. The subscription
+        is closed when the server completes it or the iterator is closed.
+
+        Args:
+            query (str): GraphQL subscription text
+            kwargs: keyword arguments for named variables for the subscription
+
+        Raises:
+            RuntimeError
+
+        Yields:
+            Dict: Data of the subscription's first top-level field, for each update
+        """
+        if websocket is None:
+            raise RuntimeError('GraphQL subscriptions require websocket-client: pip install "aerie-cli[subscriptions]"')
+
+        headers = {k: v for k, v in self.session.headers.items() if k.lower().startswith("x-hasura")}
+        headers.update(self.get_auth_headers())
+        cookie = "; ".join(f"{c.name}={c.value}" for c in self.session.cookies)
+
+        t0 = time.perf_counter()
+        response_bytes = 0
+        completed = False
+        failed = False
+        ws = websocket.create_connection(
+            re.sub(r"^http", "ws", self.graphql_url),
+            subprotocols=["graphql-transport-ws"],
+            cookie=cookie if cookie else None,
+        )
+        try:
+            ws.send(json.dumps({"type": "connection_init", "payload": {"headers": headers}}))
+            while True:
+                message = ws.recv()
+                if not message:
+                    raise RuntimeError("GraphQL subscription closed unexpectedly")
+                response_bytes += len(message)
+                message = json_backend.loads(message)
+
+                if message["type"] == "connection_ack":
+                    ws.send(
+                        json.dumps({"id": "1", "type": "subscribe", "payload": {"query": query, "variables": kwargs}})
+                    )
+                elif message["type"] == "ping":
+                    ws.send(json.dumps({"type": "pong"}))
+                elif message["type"] == "next":
+                    if "errors" in message["payload"]:
+                        raise RuntimeError(f"GraphQL Error: {json.dumps(message['payload']['errors'])}")
+                    yield next(iter(message["payload"]["data"].values()))
+                elif message["type"] == "error":
+                    completed = True
+                    raise RuntimeError(f"GraphQL Error: {json.dumps(message['payload'])}")
+                elif message["type"] == "complete":
+                    completed = True
+                    return
+        except Exception:
+            failed = True
+            raise
+        finally:
+            try:
+                if not completed:
+                    ws.send(json.dumps({"id": "1", "type": "complete"}))
+                ws.close()
+            finally:
+                record = RequestRecord(
+                    api="graphql-ws",
+                    operation=get_graphql_operation_name(query),
+                    variables_bytes=len(json.dumps(kwargs)),
+                    request_bytes=len(query),
+                    response_bytes=response_bytes,
+                    wall_time=time.perf_counter() - t0,
+                    server_time=None,
+                    status=None if failed else ws.getstatus(),
+                )
+                for observer in self._request_observers:
+                    observer(record)
 
+    def _post_to_graphql(self, query: str, kwargs: Dict, all_fields: bool) -> Dict:
         try:
 
-            resp = self.session.post(
+            resp = self._request(
+                "POST",
                 self.graphql_url,
+                "graphql",
+                get_graphql_operation_name(query),
+                variables_bytes=len(json.dumps(kwargs)) if len(self._request_observers) else 0,
                 json={"query": query, "variables": kwargs},
                 headers=self.get_auth_headers(),
             )
 
-            if resp.ok:
-                try:
-                    resp_json = resp.json()
-                except json.decoder.JSONDecodeError:
-                    raise RuntimeError(f"Failed to process response")
+            if not resp.ok:
+                raise RuntimeError(f"Bad response from GraphQL API: {resp.status_code}")
 
-                if "success" in resp_json.keys() and not resp_json["success"]:
-                    raise RuntimeError("GraphQL request was not successful")
-                elif "errors" in resp_json.keys():
-                    raise RuntimeError(
-                        f"GraphQL Error: {json.dumps(resp_json['errors'])}"
-                    )
-                else:
-                    data = next(iter(resp.json()["data"].values()))
+            # Decode the response once; it may be very large
+            try:
+                resp_json = json_backend.loads(resp.content)
+            except ValueError:
+                raise RuntimeError(f"Failed to process response")
+
+            if "success" in resp_json.keys() and not resp_json["success"]:
+                raise RuntimeError("GraphQL request was not successful")
+            elif "errors" in resp_json.keys():
+                raise RuntimeError(
+                    f"GraphQL Error: {json.dumps(resp_json['errors'])}"
+                )
+            elif all_fields:
+                data = resp_json["data"]
+            else:
+                data = next(iter(resp_json["data"].values()))
 
             if data is None:
                 raise RuntimeError(f"Failed to process response: {resp}")
@@ -179,8 +435,11 @@ class AerieHost:
             Dist: JSON response
         """
 
-        resp = self.session.post(
+        resp = self._request(
+            "POST",
             self.gateway_url + "/file",
+            "gateway",
+            "/file",
             files={"file": (file_name, file_contents)},
             headers=self.get_auth_headers(),
         )
@@ -217,8 +476,8 @@ class AerieHost:
             return False
 
         try:
-            resp = self.session.get(
-                self.gateway_url + "/auth/session", headers=self.get_auth_headers()
+            resp = self._request(
+                "GET", self.gateway_url + "/auth/session", "gateway", "/auth/session", headers=self.get_auth_headers()
             )
         except requests.exceptions.ConnectionError:
             return False
@@ -242,7 +501,7 @@ class AerieHost:
         Returns:
             bool: False if authentication is disabled, otherwise True
         """
-        resp = self.session.get(self.gateway_url + "/auth/session")
+        resp = self._request("GET", self.gateway_url + "/auth/session", "gateway", "/auth/session")
         if resp.ok:
             try:
                 resp_json = resp.json()
@@ -258,8 +517,11 @@ class AerieHost:
 
     def authenticate(self, username: str, password: str = None):
 
-        resp = self.session.post(
+        resp = self._request(
+            "POST",
             self.gateway_url + "/auth/login",
+            "gateway",
+            "/auth/login",
             json={"username": username, "password": password},
         )
 
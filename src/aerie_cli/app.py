@@ -1,39 +1,55 @@
 """Main CLI application
 
 `app` is the CLI application with which all commands, subcommands, and callbacks are registered.
+
+Subcommand modules, and the client and persistence modules behind them, are slow to import. To keep startup fast,
+subcommands are registered by module path and only imported when invoked, and the top-level commands import what they
+need when they run.
 """
-import typer
+import importlib
+from typing import Dict
+from typing import List
 from typing import Optional
 
-from aerie_cli.commands import models
-from aerie_cli.commands import plans
-from aerie_cli.commands import configurations
-from aerie_cli.commands import expansion
-from aerie_cli.commands import constraints
-from aerie_cli.commands import scheduling
-from aerie_cli.commands import metadata
+import typer
+from typer.core import TyperGroup
 
 from aerie_cli.commands.command_context import CommandContext
 from aerie_cli.__version__ import __version__
-from aerie_cli.persistent import (
-    PersistentConfigurationManager,
-    PersistentSessionManager,
-)
-from aerie_cli.utils.prompts import select_from_list
-from aerie_cli.utils.sessions import (
-    start_session_from_configuration,
-    get_active_session_client,
-)
-from aerie_cli.utils.configurations import find_configuration
-
-app = typer.Typer()
-app.add_typer(plans.plans_app, name="plans")
-app.add_typer(models.app, name="models")
-app.add_typer(configurations.app, name="configurations")
-app.add_typer(expansion.app, name="expansion")
-app.add_typer(constraints.app, name="constraints")
-app.add_typer(scheduling.app, name="scheduling")
-app.add_typer(metadata.app, name="metadata")
+
+
+class LazySubcommandGroup(TyperGroup):
+    """Command group which imports each subcommand's Typer app only when it's needed
+
+    `lazy_subcommands` maps subcommand names to the "module:attribute" path of their Typer app.
+    """
+
+    lazy_subcommands: Dict[str, str] = {
+        "plans": "aerie_cli.commands.plans:plans_app",
+        "models": "aerie_cli.commands.models:app",
+        "configurations": "aerie_cli.commands.configurations:app",
+        "expansion": "aerie_cli.commands.expansion:app",
+        "constraints": "aerie_cli.commands.constraints:app",
+        "scheduling": "aerie_cli.commands.scheduling:app",
+        "metadata": "aerie_cli.commands.metadata:app",
+        "cache": "aerie_cli.commands.cache:app",
+    }
+
+    def list_commands(self, ctx: typer.Context) -> List[str]:
+        commands = super().list_commands(ctx)
+        return [name for name in commands if name not in self.lazy_subcommands] + list(self.lazy_subcommands)
+
+    def get_command(self, ctx: typer.Context, cmd_name: str):
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_subcommands[cmd_name].split(":")
+            subcommand_app = getattr(importlib.import_module(module_name), attribute)
+            group = typer.main.get_group(subcommand_app)
+            group.name = cmd_name
+            self.add_command(group)
+        return super().get_command(ctx, cmd_name)
+
+
+app = typer.Typer(cls=LazySubcommandGroup)
 
 
 def print_version(print_version: bool):
@@ -45,17 +61,47 @@ def print_version(print_version: bool):
 def set_alternate_configuration(configuration_identifier: str):
     if configuration_identifier == None:
         return
+    from aerie_cli.utils.configurations import find_configuration
+
     found_configuration = find_configuration(configuration_identifier)
 
     CommandContext.alternate_configuration = found_configuration
 
 
-def setup_global_command_context(hasura_admin_secret: str):
+def setup_global_command_context(hasura_admin_secret: str, use_cache: bool, use_plan_cache: bool):
     CommandContext.hasura_admin_secret = hasura_admin_secret
+    CommandContext.use_cache = use_cache
+    CommandContext.use_plan_cache = use_plan_cache
+
+
+def set_force_session_revalidation(revalidate_session: bool):
+    from aerie_cli.persistent import PersistentSessionManager
+
+    PersistentSessionManager.force_revalidation = revalidate_session
+
+
+def setup_request_profiling(ctx: typer.Context, profile: bool, profile_output: str):
+    if not (profile or profile_output):
+        return
+    from aerie_cli.utils.profiling import RequestProfiler
+
+    profiler = RequestProfiler()
+    CommandContext.request_profiler = profiler
+
+    def report():
+        if profile:
+            from rich.console import Console
+
+            Console(stderr=True).print(profiler.summary_table())
+        if profile_output:
+            profiler.write_records(profile_output)
+
+    ctx.call_on_close(report)
 
 
 @app.callback()
 def app_callback(
+    ctx: typer.Context,
     version: Optional[bool] = typer.Option(
         None,
         "--version",
@@ -76,8 +122,38 @@ def app_callback(
             Accepts either a configuration name or the path to a configuration json.\n\
             Configuration names are prioritized over paths.",
     ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print a summary of requests to Aerie, by operation, after the command completes.",
+    ),
+    profile_output: str = typer.Option(
+        None,
+        "--profile-output",
+        help="Write a JSON record of every request to Aerie to this file.",
+        metavar="FILE",
+    ),
+    use_cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help="Use cached results of slowly-changing queries (e.g., mission models and activity types).",
+    ),
+    use_plan_cache: bool = typer.Option(
+        False,
+        "--plan-cache/--no-plan-cache",
+        envvar="AERIE_CLI_PLAN_CACHE",
+        help="Cache downloaded plans locally and only download them again when their revision changes.",
+    ),
+    revalidate_session: bool = typer.Option(
+        False,
+        "--revalidate-session",
+        envvar="AERIE_CLI_REVALIDATE_SESSION",
+        callback=set_force_session_revalidation,
+        help="Validate the active session with the Aerie gateway, even if its token hasn't expired.",
+    ),
 ):
-    setup_global_command_context(hasura_admin_secret)
+    setup_global_command_context(hasura_admin_secret, use_cache, use_plan_cache)
+    setup_request_profiling(ctx, profile, profile_output)
 
 
 @app.command("activate")
@@ -95,6 +171,11 @@ def activate_session(
     """
     Activate a session with an Aerie host using a given configuration
     """
+    from aerie_cli.persistent import PersistentConfigurationManager
+    from aerie_cli.persistent import PersistentSessionManager
+    from aerie_cli.utils.prompts import select_from_list
+    from aerie_cli.utils.sessions import start_session_from_configuration
+
     if name is None:
         name = select_from_list(
             [c.name for c in PersistentConfigurationManager.get_configurations()]
@@ -118,6 +199,8 @@ def deactivate_session():
     """
     Deactivate any active session
     """
+    from aerie_cli.persistent import PersistentSessionManager
+
     name = PersistentSessionManager.unset_active_session()
     if name is None:
         typer.echo("No active session")
@@ -134,6 +217,10 @@ def change_role(
     """
     Change Aerie permissions role for the active session
     """
+    from aerie_cli.persistent import PersistentSessionManager
+    from aerie_cli.utils.prompts import select_from_list
+    from aerie_cli.utils.sessions import get_active_session_client
+
     client = get_active_session_client()
 
     if role is None:
@@ -0,0 +1,46 @@
+"""cache.py
+
+Commands to inspect and clear persistent caches of Aerie query results.
+"""
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from aerie_cli.persistent import PersistentCache, CACHE_FILE_DIRECTORY
+
+app = typer.Typer()
+
+
+@app.command('stats')
+def cache_stats():
+    """
+    List the number of entries and size of each cache
+    """
+    table = Table(title='Aerie-CLI Caches', caption=f'Cache location: {CACHE_FILE_DIRECTORY}')
+    table.add_column('Cache', style='magenta')
+    table.add_column('Entries', no_wrap=True, justify='right')
+    table.add_column('Size (MB)', no_wrap=True, justify='right')
+    for namespace in PersistentCache.list_namespaces():
+        stats = PersistentCache(namespace).stats()
+        table.add_row(
+            namespace,
+            str(stats['entries']),
+            f"{stats['bytes'] / 2**20:.2f}"
+        )
+
+    Console().print(table)
+
+
+@app.command('clear')
+def clear_cache(
+    name: str = typer.Option(
+        None, '--name', '-n', help='Name of a cache to clear [defaults to all]', metavar='NAME'
+    )
+):
+    """
+    Delete cached query results
+    """
+    namespaces = [name] if name else PersistentCache.list_namespaces()
+    n_entries = sum(PersistentCache(namespace).clear() for namespace in namespaces)
+    typer.echo(f"Deleted {n_entries} cache entries")
@@ -1,24 +1,41 @@
+from typing import TYPE_CHECKING
+
 import typer
-from aerie_cli.aerie_client import AerieClient
-from aerie_cli.utils.sessions import get_active_session_client, start_session_from_configuration
-from aerie_cli.aerie_host import AerieHostConfiguration
+
+# The client and its dependencies are slow to import, so they're imported when a command first needs a client rather
+# than on every CLI invocation
+if TYPE_CHECKING:
+    from aerie_cli.aerie_client import AerieClient
+    from aerie_cli.aerie_host import AerieHostConfiguration
+    from aerie_cli.utils.profiling import RequestProfiler
 
 app = typer.Typer()
 
 class CommandContext:
     hasura_admin_secret: str = None
-    alternate_configuration: AerieHostConfiguration = None
+    alternate_configuration: "AerieHostConfiguration" = None
+    request_profiler: "RequestProfiler" = None
+    use_cache: bool = True
+    use_plan_cache: bool = False
 
     def __init__(self) -> None:
         raise NotImplementedError
 
     @classmethod
-    def get_client(cls) -> AerieClient:
+    def get_client(cls) -> "AerieClient":
         """Get the AerieClient for any command's execution.
         If an alternate configuration has been specified, this method will attempt to find the persistent configuration or load a file with that name. If no alternate configuration is specified, then the active session is used.
         Returns:
             AerieClient
         """
+        from aerie_cli.aerie_client import AerieClient
+        from aerie_cli.aerie_client import EFFECTIVE_ARGS_CACHE_NAMESPACE
+        from aerie_cli.aerie_client import METADATA_CACHE_NAMESPACE
+        from aerie_cli.aerie_client import PLAN_CACHE_NAMESPACE
+        from aerie_cli.persistent import PersistentCache
+        from aerie_cli.utils.sessions import get_active_session_client
+        from aerie_cli.utils.sessions import start_session_from_configuration
+
         # If the configuration was set in the CLI by the user,
         # then the returned client will be derived from that configuration.
         client = None
@@ -30,6 +47,15 @@ class CommandContext:
             # no configuration specified in CLI, so the active session will be used instead
             client = get_active_session_client()
 
+        if cls.use_cache:
+            client.effective_arguments_cache = PersistentCache(EFFECTIVE_ARGS_CACHE_NAMESPACE)
+            client.metadata_cache = PersistentCache(METADATA_CACHE_NAMESPACE)
+            if cls.use_plan_cache:
+                client.plan_cache = PersistentCache(PLAN_CACHE_NAMESPACE)
+
+        if cls.request_profiler is not None:
+            client.aerie_host.add_request_observer(cls.request_profiler.record)
+
         if cls.hasura_admin_secret:
             if client.aerie_host.aerie_jwt is None:
                 raise RuntimeError(f"Unauthenticated Aerie session")
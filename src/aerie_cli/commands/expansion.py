@@ -7,6 +7,7 @@ import fnmatch
 from rich.console import Console
 from rich.table import Table
 
+from aerie_cli.aerie_client import SEQUENCE_DOWNLOAD_MAX_WORKERS
 from aerie_cli.commands.command_context import CommandContext
 from aerie_cli.utils.prompts import select_from_list
 from aerie_cli.schemas.client import ExpansionRun
@@ -79,9 +80,7 @@ def list_expansion_runs(
         simulation_datasets = [simulation_dataset_id]
         table_caption = f'All runs for Simulation Dataset ID {simulation_dataset_id}'
 
-    runs: List[ExpansionRun] = []
-    for sd in simulation_datasets:
-        runs += client.list_expansion_runs(sd)
+    runs: List[ExpansionRun] = client.list_expansion_runs_by_datasets(simulation_datasets)
 
     table = Table(
         title="Expansion Runs",
@@ -139,9 +138,7 @@ def list_sequences(
         simulation_datasets = [simulation_dataset_id]
         table_caption = f'All sequences for Simulation Dataset ID {simulation_dataset_id}'
 
-    seq_ids_by_dataset: Dict[List[str]] = {}
-    for sd in simulation_datasets:
-        seq_ids_by_dataset[sd] = client.list_sequences(sd)
+    seq_ids_by_dataset: Dict[int, List[str]] = client.list_sequences_by_datasets(simulation_datasets)
 
     table = Table(
         title="Sequences",
@@ -265,6 +262,44 @@ def download_sequence(
     with open(output_fn, 'w') as fid:
         json.dump(seq_dict, fid, indent=2)
 
+
+@sequences_app.command('download-all')
+def download_all_sequences(
+    simulation_dataset_id: int = typer.Option(
+        ..., '--sim-id', '-s', prompt='Simulation Dataset ID',
+        help='Simulation Dataset ID'
+    ),
+    output_dir: str = typer.Option(
+        ..., '--output-dir', '-o', prompt='Output Directory',
+        help='Directory to which to write a <sequence ID>.json file for each sequence'
+    ),
+    match_str: str = typer.Option(
+        None, '--filter', '-f',
+        help='Only download sequences whose IDs match this glob string'
+    ),
+    max_workers: int = typer.Option(
+        SEQUENCE_DOWNLOAD_MAX_WORKERS, help='Maximum number of sequences to download concurrently'
+    )
+):
+    """
+    Download SeqJson files for all sequences of a simulation dataset
+    """
+    client = CommandContext.get_client()
+
+    seq_ids = client.list_sequences(simulation_dataset_id)
+    if match_str:
+        seq_ids = fnmatch.filter(seq_ids, match_str)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Write each sequence as soon as it's downloaded
+    for seq_id, seq_dict in client.iter_expanded_sequences(seq_ids, simulation_dataset_id, max_workers):
+        with open(output_dir.joinpath(f"{seq_id}.json"), 'w') as fid:
+            json.dump(seq_dict, fid, indent=2)
+
+    Console().print(f"Downloaded {len(seq_ids)} sequences to {output_dir}", style='green')
+
 # === Commands for expansion sets ===
 
 
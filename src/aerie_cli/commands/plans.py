@@ -1,15 +1,28 @@
 import json
+import os
+from datetime import datetime
+from datetime import timedelta
+from typing import List
 from typing import Union
 
 import arrow
-import pandas as pd
 import typer
 from rich.console import Console
 from rich.table import Table
 
+from aerie_cli.aerie_client import SIMULATION_MAX_WORKERS
+from aerie_cli.aerie_client import AerieClient
+from aerie_cli.aerie_client import SimulationFailedError
 from aerie_cli.commands.command_context import CommandContext
 from aerie_cli.schemas.client import ActivityPlanCreate
+from aerie_cli.schemas.client import PlanSimulationResult
+from aerie_cli.utils import parquet
+from aerie_cli.utils.profiles import arrays_to_samples
+from aerie_cli.utils.profiles import write_resources_csv
 from aerie_cli.utils.prompts import select_from_list
+from aerie_cli.utils.serialization import postgres_interval_to_timedelta
+from aerie_cli.utils.serialization import write_json_dict
+from aerie_cli.utils.serialization import write_json_list
 
 plans_app = typer.Typer()
 collaborators_app = typer.Typer()
@@ -39,16 +52,18 @@ def download_simulation(
         help="Simulation Dataset ID", prompt=True),
     output: str = typer.Option(
         ..., '--output', '-o',
-        help="The output file destination", prompt=True)
+        help="The output file destination", prompt=True),
+    file_format: str = typer.Option(
+        "json", "--format", help="Output file format: json or parquet"
+    )
 ):
     """
-    Download simulated activity instances and save to a JSON file
+    Download simulated activity instances and save to a JSON or Parquet file
     """
+    _check_format(file_format, ["json", "parquet"])
     client = CommandContext.get_client()
-    simulated_activities = client.get_simulation_results(sim_id)
-    with open(output, "w") as out_file:
-        out_file.write(json.dumps(simulated_activities, indent=2))
-        typer.echo(f"Wrote activity plan to {output}")
+    _write_simulated_activities(client, sim_id, output, file_format)
+    typer.echo(f"Wrote activity plan to {output}")
 
 
 @plans_app.command()
@@ -67,17 +82,43 @@ def download_resources(
     ),
     specific_states: str = typer.Option(
         None, help="The file with the specific states, one state per line [defaults to all]"
+    ),
+    chunk_size: int = typer.Option(
+        None, help="Number of resource profiles to download per request [defaults to all at once]"
+    ),
+    file_format: str = typer.Option(
+        None, "--format", help="Output file format: json, csv or parquet. Overrides --csv/--json"
+    ),
+    start: str = typer.Option(
+        None, help="Only download from this offset from plan start, e.g. 12:00:00 or '2 days 06:00:00'"
+    ),
+    end: str = typer.Option(
+        None, help="Only download up to this offset from plan start, e.g. 12:00:00 or '2 days 06:00:00'"
+    ),
+    max_points: int = typer.Option(
+        None, min=3, help="Decimate each resource to at most this many points for a quick look"
     )
 ):
     """
-    Download resource timelines from a simulation and save to either JSON or CSV.
+    Download resource timelines from a simulation and save to JSON, CSV or Parquet.
 
     JSON resource timelines are formatted as lists of time-value pairs. Relative timestamps are milliseconds since 
     plan start time. Absolute timestamps are of the form YYYY-DDDTh:mm:ss.sss
 
     CSV resource timeline relative timestamps are seconds since plan start time. Absolute timestamps are formatted the 
     same as the JSON outputs.
+
+    Parquet resource timelines are a long-format table of resource name, time and value. Times are always microseconds
+    since plan start time, which is stored in the file metadata.
+
+    With --start/--end, each timeline also includes the segment in progress at the start of the window, so timelines
+    may begin before --start and end after --end.
     """
+    if file_format is None:
+        file_format = "csv" if csv else "json"
+    _check_format(file_format, ["json", "csv", "parquet"])
+    start_offset = _parse_offset(start, "--start")
+    end_offset = _parse_offset(end, "--end")
     client = CommandContext.get_client()
 
     # reads the states
@@ -87,79 +128,59 @@ def download_resources(
             for line in in_file:
                 contents.append(line.strip("\n"))
 
-    # Get start time of plan
-    plan_id = client.get_plan_id_by_sim_id(sim_id)
-    start_time = client.get_activity_plan_by_id(plan_id, "").start_time
-    # get resource timelines
-    resources = client.get_resource_samples(sim_id, contents)
-
-    if csv:
-        # the key is the time and the value is a list of tuples: (activity, state)
-        time_dictionary = {}
-
-        # this stores the header names for the CSV
-        field_name = ["Time (s)"]
-        if absolute_time:
-            field_name = ["Time (YYYY-DDDThh:mm:ss.sss)"]
-
-        for activity in resources.get("resourceSamples"):
-            list = resources.get("resourceSamples").get(activity)
-            field_name.append(activity)
-            for i in list:
-                time_dictionary.setdefault(i.get("x"), []).append(
-                    (activity, i.get("y"))
-                )
-
-        # a list of dictionaries that will be fed into the DictWriter method
-        csv_dictionary = []
-
-        for time in time_dictionary:
-            seconds = 0
-            if time != 0:
-                seconds = time / 1000000
-            if absolute_time:
-                formatted = start_time.shift(seconds=seconds)
-                formatted = formatted.format("YYYY-DDDDTHH:mm:ss.SSS")
-                tempDict = {"Time (YYYY-DDDThh:mm:ss.sss)": formatted}
-            else:
-                tempDict = {"Time (s)": seconds}
-            for activity in time_dictionary.get(time):
-                tempDict[activity[0]] = activity[1]
-            csv_dictionary.append(tempDict)
-
-        # Sort the dictionary by time
+    # get the plan start time along with the resource timelines, which are downloaded as they're written
+    timelines = client.get_simulation_resource_timelines(
+        sim_id, contents, chunk_size, start=start_offset, end=end_offset, max_points=max_points
+    )
+    start_time = timelines.plan_start_time
+    if file_format == "parquet":
+        parquet.write_resources_parquet(output, timelines.resources, plan_start_time=start_time.isoformat())
+        typer.echo(f"Wrote resource timelines to {output}")
+
+    elif file_format == "csv":
+        # merge resource timelines into rows, carrying forward each resource's last value
+        start_datetime = start_time.datetime
         if absolute_time:
-            sorted_by_time = sorted(csv_dictionary, key=lambda d: d["Time (YYYY-DDDThh:mm:ss.sss)"])
+            time_header = "Time (YYYY-DDDThh:mm:ss.sss)"
+
+            def format_time(t: int) -> str:
+                return _format_absolute_time(start_datetime, t)
         else:
-            sorted_by_time = sorted(csv_dictionary, key=lambda d: d["Time (s)"])
+            time_header = "Time (s)"
 
-        # use panda to fill in missing data
-        df = pd.DataFrame(sorted_by_time)
-        # 'ffill' will fill each missing row with the value of the nearest one above it.
-        df.fillna(method="ffill", inplace=True)
+            def format_time(t: int) -> float:
+                return t / 1000000
 
-        # write to file
-        with open(output, "w") as out_file:
-            df.to_csv(out_file, index=False, header=field_name)
+        with open(output, "w", newline="") as out_file:
+            write_resources_csv(out_file, timelines.resources, time_header, format_time)
             typer.echo(f"Wrote resource timelines to {output}")
 
     else:
+        resources = ((activity, arrays_to_samples(*arrays)) for activity, arrays in timelines.resources)
         if absolute_time:
-            for activity in resources.get("resourceSamples"):
-                list = resources.get("resourceSamples").get(activity)
-                for i in list:
-                    milliseconds = i.get("x")
-                    seconds = 0
-                    if milliseconds != 0:
-                        seconds = milliseconds/1000000
-                    i["x"] = str(start_time.shift(seconds=seconds).format("YYYY-DDDDTHH:mm:ss.SSS"))
-
-        # write to file
+            start_datetime = start_time.datetime
+            resources = (
+                (activity, [{**i, "x": _format_absolute_time(start_datetime, i["x"])} for i in samples])
+                for activity, samples in resources
+            )
+
+        # write to file, streaming each resource as it is downloaded
         with open(output, "w") as out_file:
-            out_file.write(json.dumps(resources, indent=2))
+            out_file.write('{\n  "resourceSamples": ')
+            write_json_dict(out_file, resources, indent=2, level=1)
+            out_file.write("\n}")
             typer.echo(f"Wrote resource timelines to {output}")
 
 
+def _format_absolute_time(start_time: datetime, microseconds: int) -> str:
+    """Format an offset from plan start as YYYY-DDDThh:mm:ss.sss"""
+    t = start_time + timedelta(microseconds=microseconds)
+    return (
+        f"{t.year:04d}-{t.timetuple().tm_yday:03d}T{t.hour:02d}:{t.minute:02d}:{t.second:02d}."
+        f"{t.microsecond // 1000:03d}"
+    )
+
+
 @plans_app.command()
 def upload(
     input: str = typer.Option(
@@ -182,6 +203,26 @@ def upload(
     typer.echo(f"Created plan ID: {plan_id}")
 
 
+@plans_app.command()
+def sync(
+    id: int = typer.Option(..., "--plan-id", "--id", "-p", help="Plan ID", prompt=True),
+    input: str = typer.Option(
+        ..., "--input", "-i", help="The input file with the plan's desired activities", prompt=True
+    ),
+):
+    """Update a plan's activities to match an input JSON file, changing only the activities which differ."""
+    client = CommandContext.get_client()
+
+    with open(input) as in_file:
+        contents = in_file.read()
+    plan_to_sync = ActivityPlanCreate.from_json(contents)
+    result = client.sync_activity_plan(id, plan_to_sync.activities)
+    typer.echo(
+        f"Synced plan ID {id}: {len(result.inserted)} inserted, {len(result.updated)} updated, "
+        f"{len(result.deleted)} deleted"
+    )
+
+
 @plans_app.command()
 def duplicate(
     id: int = typer.Option(..., "--plan-id", "--id", "-p", help="Plan ID", prompt=True),
@@ -201,29 +242,119 @@ def duplicate(
 
 @plans_app.command()
 def simulate(
-    id: int = typer.Option(..., help="Plan ID", prompt=True),
+    id: List[int] = typer.Option(None, help="Plan ID. Repeat to simulate several plans concurrently"),
+    ids_file: str = typer.Option(None, "--ids-file", help="File with plan IDs to simulate, one per line"),
     output: Union[str, None] = typer.Option(
         None, "--output", "-o", help="The output file destination for simulation results (if desired)"
     ),
-    poll_period: int = typer.Option(
+    output_dir: Union[str, None] = typer.Option(
+        None,
+        "--output-dir",
+        help="Directory to which to write each plan's simulation results as it finishes, as plan-<id>-sim-<dataset id>.<format>",
+    ),
+    poll_period: float = typer.Option(
         5,
-        help="The period (seconds) at which to poll for simulation completion",
+        help="The maximum period (seconds) at which to poll for simulation completion",
+    ),
+    subscribe: bool = typer.Option(
+        False,
+        "--subscribe",
+        help="Wait for simulation completion over a GraphQL subscription instead of polling (requires websocket-client)",
+    ),
+    max_workers: int = typer.Option(
+        SIMULATION_MAX_WORKERS, help="Maximum number of simulations to wait on concurrently"
+    ),
+    file_format: str = typer.Option(
+        "json", "--format", help="Output file format for simulation results: json or parquet"
     ),
 ):
-    """Simulate a plan and optionally download the results."""
+    """Simulate one or more plans and optionally download the results."""
+    _check_format(file_format, ["json", "parquet"])
+    plan_ids = _read_plan_ids(id, ids_file)
+    if len(plan_ids) > 1 and output:
+        raise typer.BadParameter("Use --output-dir when simulating several plans", param_hint="--output")
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
     client = CommandContext.get_client()
 
-    start_time = arrow.utcnow()
-    sim_dataset_id = client.simulate_plan(id, poll_period)
-    end_time = arrow.utcnow()
-    res = client.get_simulation_results(sim_dataset_id)
-    total_sim_time = end_time - start_time
-    typer.echo(f"Simulation completed in " + str(total_sim_time))
-
-    if output:
+    if len(plan_ids) == 1:
+        start_time = arrow.utcnow()
+        try:
+            sim_dataset_id = client.simulate_plan(plan_ids[0], poll_period, subscribe=subscribe)
+        except SimulationFailedError as e:
+            typer.echo(str(e), err=True)
+            raise typer.Exit(code=1)
+        end_time = arrow.utcnow()
+        total_sim_time = end_time - start_time
+        typer.echo(f"Simulation completed in " + str(total_sim_time))
+        results = [PlanSimulationResult(plan_ids[0], sim_dataset_id, total_sim_time.total_seconds())]
+    else:
+        results = client.simulate_plans(plan_ids, poll_period, subscribe=subscribe, max_workers=max_workers)
+
+    n_failed = 0
+    for result in results:
+        if result.error is not None:
+            n_failed += 1
+            typer.echo(f"Plan {result.plan_id}: simulation failed after {timedelta(seconds=result.elapsed)}: {result.error}")
+            continue
+        if len(plan_ids) > 1:
+            typer.echo(
+                f"Plan {result.plan_id}: simulation dataset {result.simulation_dataset_id} completed in "
+                f"{timedelta(seconds=result.elapsed)}"
+            )
+
+        # Download each plan's results while the other simulations are still running
+        if output_dir:
+            output = os.path.join(output_dir, f"plan-{result.plan_id}-sim-{result.simulation_dataset_id}.{file_format}")
+        if output:
+            _write_simulated_activities(client, result.simulation_dataset_id, output, file_format)
+            typer.echo(f"Wrote simulation results to {output}")
+
+    if n_failed:
+        raise typer.Exit(code=1)
+
+
+def _read_plan_ids(ids: List[int], ids_file: Union[str, None]) -> List[int]:
+    """Combine plan IDs from options and a file, prompting for one if neither is given"""
+    plan_ids = list(ids) if ids else []
+    if ids_file:
+        with open(ids_file) as in_file:
+            for line in in_file:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    try:
+                        plan_ids.append(int(line))
+                    except ValueError:
+                        raise typer.BadParameter(f"Invalid plan ID: {line}", param_hint="--ids-file")
+    if not plan_ids:
+        plan_ids.append(typer.prompt("Plan ID", type=int))
+    return plan_ids
+
+
+def _parse_offset(offset: Union[str, None], param_hint: str) -> Union[timedelta, None]:
+    if offset is None:
+        return None
+    try:
+        return postgres_interval_to_timedelta(offset)
+    except ValueError:
+        raise typer.BadParameter(f"Invalid offset: {offset}", param_hint=param_hint)
+
+
+def _check_format(file_format: str, allowed: List[str]) -> None:
+    if file_format not in allowed:
+        raise typer.BadParameter(f"Format must be one of: {', '.join(allowed)}", param_hint="--format")
+    if file_format == "parquet" and not parquet.AVAILABLE:
+        raise typer.BadParameter('Parquet output requires pyarrow: pip install "aerie-cli[parquet]"', param_hint="--format")
+
+
+def _write_simulated_activities(client: AerieClient, sim_dataset_id: int, output: str, file_format: str) -> None:
+    """Stream simulated activities to a JSON list or a Parquet table of spans"""
+    activities = client.iter_simulation_results(sim_dataset_id)
+    if file_format == "parquet":
+        parquet.write_activities_parquet(output, activities)
+    else:
         with open(output, "w") as out_file:
-            out_file.write(json.dumps(res, indent=2))
-        typer.echo(f"Wrote simulation results to {output}")
+            write_json_list(out_file, activities)
 
 
 @plans_app.command()
@@ -231,7 +362,7 @@ def list():
     """List uploaded plans."""
 
     client = CommandContext.get_client()
-    resp = client.list_all_activity_plans()
+    resp = client.list_all_activity_plans(include_latest_sim_dataset=True)
 
     # Create output table
     table = Table(title="Current Activity Plans")
@@ -242,12 +373,11 @@ def list():
     table.add_column("Latest Sim. Dataset ID", no_wrap=True)
     table.add_column("Model ID", no_wrap=True)
     for activity_plan in resp:
-        sim_ids = client.get_simulation_dataset_ids_by_plan_id(activity_plan.id)
-        if len(sim_ids):
-            simulation_dataset_id = str(max(sim_ids))
+        if activity_plan.latest_sim_dataset_id is not None:
+            simulation_dataset_id = str(activity_plan.latest_sim_dataset_id)
         else:
             simulation_dataset_id = ''
-            
+
         table.add_row(
             str(activity_plan.id),
             activity_plan.name,
@@ -5,10 +5,13 @@ Manage persistent storage of Aerie host configurations and active sessions
 
 from copy import deepcopy
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List
+import hashlib
 import json
+import os
 import shutil
 import pickle
+import time
 from datetime import datetime, timedelta
 
 from appdirs import AppDirs
@@ -25,10 +28,17 @@ SESSION_FILE_DIRECTORY = Path(APP_DIRS.user_config_dir).resolve().absolute()
 SESSION_TIMESTAMP_FSTRING = r'%Y-%jT%H-%M-%S.%f'
 SESSION_TIMEOUT = timedelta(hours=12)
 
+# Sessions aren't re-validated with the gateway while their JWT is valid for at least this long
+SESSION_REVALIDATION_MARGIN = timedelta(minutes=10)
+
+CACHE_FILE_DIRECTORY = Path(APP_DIRS.user_cache_dir).resolve().absolute()
+DEFAULT_CACHE_MAX_BYTES = 256 * 2**20
+
 
 def delete_all_persistent_files():
     shutil.rmtree(CONFIGURATION_FILE_DIRECTORY, ignore_errors=True)
     shutil.rmtree(SESSION_FILE_DIRECTORY, ignore_errors=True)
+    shutil.rmtree(CACHE_FILE_DIRECTORY, ignore_errors=True)
 
 
 class PersistentConfigurationManager:
@@ -108,9 +118,17 @@ class PersistentConfigurationManager:
         cls._configurations = None
 
 
+def _new_session_file_path() -> Path:
+    """Path of a session file marked as last used now"""
+    return SESSION_FILE_DIRECTORY.joinpath(datetime.utcnow().strftime(SESSION_TIMESTAMP_FSTRING) + '.aerie_cli.session')
+
+
 class PersistentSessionManager:
     _active_session = None
 
+    # Always validate sessions with the gateway, even if their JWT hasn't expired
+    force_revalidation: bool = False
+
     def __init__(self) -> None:
         """Pseudo-singleton"""
         raise NotImplementedError
@@ -154,6 +172,12 @@ class PersistentSessionManager:
             session_file.unlink()
             raise NoActiveSessionError
 
+        # While the JWT is well within its validity window, skip the gateway ping and only mark the session as used
+        if not cls._needs_validation(session):
+            session_file.rename(_new_session_file_path())
+            cls._active_session = session
+            return
+
         # If gateway ping fails, mark session as inactive
         if not cls.set_active_session(session):
             session_file.unlink()
@@ -166,8 +190,18 @@ class PersistentSessionManager:
 
     @classmethod
     def set_active_session(cls, session: AerieHost) -> bool:
+        """Validate a session and save it as the active session
 
-        if not session.check_auth():
+        The session is validated by pinging the gateway, unless its JWT is valid for at least
+        `SESSION_REVALIDATION_MARGIN` and `force_revalidation` isn't set.
+
+        Args:
+            session (AerieHost): Session to activate
+
+        Returns:
+            bool: False if the session failed validation and wasn't set
+        """
+        if cls._needs_validation(session) and not session.check_auth():
             return False
 
         session_files: List[Path] = [
@@ -177,14 +211,19 @@ class PersistentSessionManager:
 
         cls._active_session = session
 
-        session_file = datetime.utcnow().strftime(SESSION_TIMESTAMP_FSTRING) + '.aerie_cli.session'
-        session_file = SESSION_FILE_DIRECTORY.joinpath(session_file)
-
-        with open(session_file, 'wb') as fid:
+        with open(_new_session_file_path(), 'wb') as fid:
             pickle.dump(session, fid)
 
         return True
 
+    @classmethod
+    def _needs_validation(cls, session: AerieHost) -> bool:
+        return (
+            cls.force_revalidation
+            or session.aerie_jwt is None
+            or not session.aerie_jwt.is_valid_for(SESSION_REVALIDATION_MARGIN)
+        )
+
     @classmethod
     def unset_active_session(cls) -> str:
         """Unset any active session
@@ -221,5 +260,150 @@ class PersistentSessionManager:
             fn.unlink()
 
 
+class PersistentCache:
+    """Size-bounded, least-recently-used store of JSON values on disk
+
+    Each cache is a namespace (sub-directory) of the user cache directory with one file per entry, named by the hash
+    of its key. Reading an entry marks it as recently used; once the namespace exceeds `max_bytes`, the least recently
+    used entries are deleted. Entries record their creation time so readers may also ignore entries older than a TTL.
+    """
+
+    def __init__(self, namespace: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        """
+        Args:
+            namespace (str): Name of the sub-directory for this cache
+            max_bytes (int, optional): Size limit for all entries in this namespace
+        """
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+
+    @property
+    def directory(self) -> Path:
+        return CACHE_FILE_DIRECTORY.joinpath(self.namespace)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a content-addressed key from JSON-serializable parts"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def list_namespaces(cls) -> List[str]:
+        if not CACHE_FILE_DIRECTORY.is_dir():
+            return []
+        return sorted(d.name for d in CACHE_FILE_DIRECTORY.iterdir() if d.is_dir())
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory.joinpath(key + '.json')
+
+    def _entries(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return [f for f in self.directory.glob('*.json')]
+
+    def get(self, key: str, max_age: float = None) -> Any:
+        """Get a cached value
+
+        Args:
+            key (str): Entry key
+            max_age (float, optional): Ignore entries created more than this many seconds ago. Defaults to None (no limit).
+
+        Returns:
+            Any: Cached value, or None if there is no (readable, unexpired) entry
+        """
+        entry = self._entry_path(key)
+        try:
+            with open(entry, 'r') as fid:
+                contents = json.load(fid)
+            if max_age is not None and time.time() - contents["created"] > max_age:
+                return None
+            os.utime(entry)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return contents["value"]
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get cached values for the keys which have entries"""
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set(self, key: str, value: Any) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, values: Dict[str, Any]) -> None:
+        """Write cache entries, then evict least recently used entries if over the size limit
+
+        Args:
+            values (Dict[str, Any]): JSON-serializable values keyed by entry key
+        """
+        if not len(values):
+            return
+
+        self.directory.mkdir(exist_ok=True, parents=True)
+        for key, value in values.items():
+            # Write then rename so concurrent readers never see a partial entry
+            entry = self._entry_path(key)
+            tmp_entry = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+            with open(tmp_entry, 'w') as fid:
+                json.dump({"created": time.time(), "value": value}, fid)
+            os.replace(tmp_entry, entry)
+
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        """Delete a cache entry, if it exists"""
+        try:
+            self._entry_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache is within its size limit
+
+        Returns:
+            int: Number of entries deleted
+        """
+        entries = []
+        for f in self._entries():
+            try:
+                stat = f.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, f))
+
+        total_bytes = sum(e[1] for e in entries)
+        n_deleted = 0
+        for _, size, f in sorted(entries, key=lambda e: e[0]):
+            if total_bytes <= self.max_bytes:
+                break
+            f.unlink()
+            total_bytes -= size
+            n_deleted += 1
+
+        return n_deleted
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of entries and total size of this cache
+
+        Returns:
+            Dict[str, int]: "entries" and "bytes"
+        """
+        sizes = [f.stat().st_size for f in self._entries()]
+        return {"entries": len(sizes), "bytes": sum(sizes)}
+
+    def clear(self) -> int:
+        """Delete all entries in this cache
+
+        Returns:
+            int: Number of entries deleted
+        """
+        n_entries = len(self._entries())
+        shutil.rmtree(self.directory, ignore_errors=True)
+        return n_entries
+
+
 class NoActiveSessionError(Exception):
     pass
@@ -129,7 +129,7 @@ class ApiActivityPlanCreate(ApiActivityPlanBase):
 @define
 class ApiActivityPlanRead(ApiActivityPlanBase):
     id: int
-    simulations: List[int]
+    simulations: List[Dict[str, Any]]
     duration: timedelta = field(
         converter = convert_to_time_delta,
     )
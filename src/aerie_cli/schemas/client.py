@@ -5,6 +5,7 @@ Client dataclasses store data in accessible formats and provide helper methods t
 from datetime import timedelta
 from typing import Any
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Union
 from typing import Optional
@@ -42,12 +43,16 @@ def serialize_timedelta_to_str(inst, field, value):
         return str(value)
     return value
 
+def is_serialized_field(attribute, value) -> bool:
+    """Filter for `asdict` which excludes fields marked with `metadata={"serialize": False}`"""
+    return attribute.metadata.get("serialize", True)
+
 class ClientSerialize:
     @classmethod
     def from_dict(cls, dictionary: dict) -> "ClientSerialize":
         return cls(**dictionary)
     def to_dict(self) -> dict:
-        return asdict(self, value_serializer=serialize_timedelta_to_str)
+        return asdict(self, filter=is_serialized_field, value_serializer=serialize_timedelta_to_str)
     @classmethod
     def from_json(cls, dictionary: dict) -> "ClientSerialize":
         return cls(**json.loads(dictionary))
@@ -175,6 +180,12 @@ class ActivityPlanRead(EmptyActivityPlan):
         converter=converters.optional(
             lambda listOfDicts: [Activity.from_dict(d) if isinstance(d, dict) else d for d in listOfDicts])
     )
+    # Only populated by plan listings which request it, and not saved with the plan
+    latest_sim_dataset_id: Optional[int] = field(
+        default = None,
+        kw_only = True,
+        metadata = {"serialize": False}
+    )
 
     def get_activity_start_time(self, activity: Union[int, Activity]) -> arrow.Arrow:
         """Get the effective start time of an activity instance
@@ -213,6 +224,11 @@ class ActivityPlanRead(EmptyActivityPlan):
     @classmethod
     def from_api_read(cls, api_plan_read: ApiActivityPlanRead) -> "ActivityPlanRead":
         plan_start = arrow.get(api_plan_read.start_time)
+        sim_dataset_ids = [
+            dataset["id"]
+            for simulation in api_plan_read.simulations
+            for dataset in simulation.get("simulation_datasets", [])
+        ]
         return ActivityPlanRead(
             id=api_plan_read.id,
             name=api_plan_read.name,
@@ -224,6 +240,7 @@ class ActivityPlanRead(EmptyActivityPlan):
                 Activity.from_api_read(api_activity)
                 for api_activity in api_plan_read.activity_directives
             ],
+            latest_sim_dataset_id=max(sim_dataset_ids) if len(sim_dataset_ids) else None,
         )
 
 
@@ -316,6 +333,40 @@ class SimulationResults(ClientSerialize):
         )
 
 
+@define
+class ResourceTimelines:
+    """Resource timelines from a simulation dataset, downloaded as `resources` is iterated
+
+    `resources` yields (name, (times, values)) pairs in name order, where times are int64 microseconds from plan start.
+    """
+    plan_start_time: Arrow = field(
+        converter = arrow.get
+    )
+    plan_duration: timedelta
+    resources: Iterator
+
+
+@define
+class PlanSyncResult:
+    """IDs of the activity directives changed by syncing a plan"""
+    inserted: List[int]
+    updated: List[int]
+    deleted: List[int]
+
+
+@define
+class PlanSimulationResult:
+    """Outcome of simulating one of several plans
+
+    `elapsed` is seconds from when the simulations were requested until this one finished. `error` is set, and
+    `simulation_dataset_id` is None, if the simulation failed.
+    """
+    plan_id: int
+    simulation_dataset_id: Optional[int]
+    elapsed: float
+    error: Optional[Exception] = field(default=None)
+
+
 @define
 class ActivityInstanceCommand(ClientSerialize):
     activity_instance_id: int
@@ -0,0 +1,38 @@
+"""JSON decoding backend
+
+Large responses from Aerie (e.g., resource profiles) are decoded with `orjson` if it's installed, which is several
+times faster than the standard library. Otherwise, the standard library `json` module is used.
+"""
+
+import json
+from typing import Any
+from typing import Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "json" if orjson is None else "orjson"
+
+
+def stdlib_loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON with the standard library"""
+    return json.loads(data)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON with the fastest available backend
+
+    Args:
+        data (Union[bytes, str]): JSON document
+
+    Raises:
+        ValueError: Invalid JSON (both backends raise subclasses of ValueError)
+
+    Returns:
+        Any: Decoded object
+    """
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
@@ -0,0 +1,219 @@
+"""Parquet export of resource timelines and simulated activities
+
+Requires the optional `pyarrow` package, installed with the "parquet" extra. Tables are written one row group at a
+time as data is downloaded, so exports never need to be held in memory in full.
+
+Times are int64 microseconds from plan start. The plan start time, if given, is stored in the file's key-value metadata
+under "plan_start_time".
+"""
+
+import importlib.util
+import json
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from aerie_cli.utils.serialization import postgres_interval_to_microseconds
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+# pyarrow is slow to import, so it is only imported once a Parquet file is written
+AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+DEFAULT_ROW_GROUP_SIZE = 2**20
+
+
+def _import_pyarrow():
+    if not AVAILABLE:
+        raise RuntimeError('Parquet export requires pyarrow: pip install "aerie-cli[parquet]"')
+    import pyarrow
+    import pyarrow.parquet
+
+    return pyarrow, pyarrow.parquet
+
+
+def _metadata(plan_start_time: str = None) -> Dict[bytes, bytes]:
+    if plan_start_time is None:
+        return {}
+    return {b"plan_start_time": str(plan_start_time).encode("utf-8")}
+
+
+def write_resources_parquet(
+    filename: str,
+    resources: Iterable[Tuple[str, Tuple[np.ndarray, np.ndarray]]],
+    plan_start_time: str = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> int:
+    """Write resource timelines to a long-format Parquet table
+
+    Each row is one sample, with columns:
+        resource (string): Resource name
+        time (int64): Microseconds from plan start
+        value (float64): Sample value, if the resource's values are all floats
+        value_json (string): JSON-encoded sample value, for any other resource
+
+    Args:
+        filename (str): Output file
+        resources (Iterable[Tuple[str, Tuple[np.ndarray, np.ndarray]]]): Resource names and arrays of sample times and
+            values, as returned by `profile_segments_to_arrays`
+        plan_start_time (str, optional): Plan start time to store in the file metadata
+        row_group_size (int, optional): Maximum number of rows per row group
+
+    Returns:
+        int: Number of rows written
+    """
+    pa, pq = _import_pyarrow()
+
+    schema = pa.schema(
+        [
+            pa.field("resource", pa.string()),
+            pa.field("time", pa.int64()),
+            pa.field("value", pa.float64()),
+            pa.field("value_json", pa.string()),
+        ],
+        metadata=_metadata(plan_start_time),
+    )
+
+    n_rows = 0
+    with pq.ParquetWriter(filename, schema) as writer:
+        buffer = _RowGroupBuffer(writer, schema, row_group_size)
+        for name, (times, values) in resources:
+            for i in range(0, len(times), row_group_size):
+                chunk_times = times[i:i + row_group_size]
+                chunk_values = values[i:i + row_group_size]
+                n_chunk = len(chunk_times)
+                if chunk_values.dtype == np.float64:
+                    value = pa.array(chunk_values, type=pa.float64())
+                    value_json = pa.nulls(n_chunk, type=pa.string())
+                else:
+                    value = pa.nulls(n_chunk, type=pa.float64())
+                    value_json = pa.array([json.dumps(v) for v in chunk_values.tolist()], type=pa.string())
+
+                buffer.append(
+                    pa.repeat(pa.scalar(name, type=pa.string()), n_chunk),
+                    pa.array(chunk_times, type=pa.int64()),
+                    value,
+                    value_json,
+                )
+                n_rows += n_chunk
+        buffer.flush()
+
+    return n_rows
+
+
+def write_activities_parquet(
+    filename: str,
+    activities: Iterable[Dict],
+    plan_start_time: str = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> int:
+    """Write simulated activities to a Parquet table of spans
+
+    Each row is one simulated activity, with columns:
+        id (int64), directive_id (int64), parent_id (int64), simulation_dataset_id (int64)
+        activity_type_name (string)
+        start_offset, duration, end_offset (int64): Microseconds, relative to plan start for offsets
+        start_time, end_time (string): Timestamps as reported by Aerie
+        attributes (string): JSON-encoded activity attributes (arguments and computed attributes)
+
+    Args:
+        filename (str): Output file
+        activities (Iterable[Dict]): Simulated activities, as returned by `AerieClient.iter_simulation_results`
+        plan_start_time (str, optional): Plan start time to store in the file metadata
+        row_group_size (int, optional): Maximum number of rows per row group
+
+    Returns:
+        int: Number of rows written
+    """
+    pa, pq = _import_pyarrow()
+
+    schema = pa.schema(
+        [
+            pa.field("id", pa.int64()),
+            pa.field("directive_id", pa.int64()),
+            pa.field("parent_id", pa.int64()),
+            pa.field("simulation_dataset_id", pa.int64()),
+            pa.field("activity_type_name", pa.string()),
+            pa.field("start_offset", pa.int64()),
+            pa.field("duration", pa.int64()),
+            pa.field("end_offset", pa.int64()),
+            pa.field("start_time", pa.string()),
+            pa.field("end_time", pa.string()),
+            pa.field("attributes", pa.string()),
+        ],
+        metadata=_metadata(plan_start_time),
+    )
+
+    n_rows = 0
+    with pq.ParquetWriter(filename, schema) as writer:
+        rows: List[Dict] = []
+        for activity in activities:
+            rows.append(_activity_to_row(activity))
+            if len(rows) == row_group_size:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                n_rows += len(rows)
+                rows = []
+        if rows:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            n_rows += len(rows)
+
+    return n_rows
+
+
+def _activity_to_row(activity: Dict) -> Dict[str, Any]:
+    start_offset = postgres_interval_to_microseconds(activity["start_offset"])
+    duration = activity.get("duration")
+    duration = None if duration is None else postgres_interval_to_microseconds(duration)
+    return {
+        "id": activity["id"],
+        "directive_id": activity.get("directive_id"),
+        "parent_id": activity.get("parent_id"),
+        "simulation_dataset_id": activity.get("simulation_dataset_id"),
+        "activity_type_name": activity["activity_type_name"],
+        "start_offset": start_offset,
+        "duration": duration,
+        "end_offset": None if duration is None else start_offset + duration,
+        "start_time": activity.get("start_time"),
+        "end_time": activity.get("end_time"),
+        "attributes": json.dumps(activity.get("attributes")),
+    }
+
+
+class _RowGroupBuffer:
+    """Accumulate column chunks and write them out as row groups of a fixed size"""
+
+    def __init__(self, writer: "pq.ParquetWriter", schema: "pa.Schema", row_group_size: int) -> None:
+        self.writer = writer
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.chunks: List[List["pa.Array"]] = []
+        self.n_rows = 0
+
+    def append(self, *columns: "pa.Array") -> None:
+        self.chunks.append(list(columns))
+        self.n_rows += len(columns[0])
+        if self.n_rows >= self.row_group_size:
+            self._write(self.row_group_size)
+
+    def flush(self) -> None:
+        if self.n_rows:
+            self._write(self.n_rows)
+
+    def _write(self, n_rows: int) -> None:
+        pa, _ = _import_pyarrow()
+        table = pa.Table.from_arrays(
+            [pa.chunked_array([c[i] for c in self.chunks], type=f.type) for i, f in enumerate(self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_table(table.slice(0, n_rows), row_group_size=self.row_group_size)
+
+        # Keep any remainder for the next row group
+        rest = table.slice(n_rows)
+        self.chunks = [[rest.column(i).combine_chunks() for i in range(rest.num_columns)]] if rest.num_rows else []
+        self.n_rows = rest.num_rows
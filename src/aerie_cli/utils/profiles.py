@@ -0,0 +1,305 @@
+import csv
+import heapq
+from operator import itemgetter
+from typing import IO
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+import numpy as np
+
+from aerie_cli.utils.serialization import parse_intervals_to_microseconds
+
+
+def profile_segments_to_samples(profile: Dict, duration: int) -> List[Dict]:
+    """Convert a resource profile's segments into a list of samples {x: <time>, y: <value>}
+
+    Times are in microseconds from plan start. Discrete profiles get a point at the start and end of each run of
+    identical values; real profiles get a point wherever the value is discontinuous and at the end of each segment.
+
+    Args:
+        profile (Dict): Profile with "profile_segments" and "type", as returned by the Aerie API
+        duration (int): Plan duration in microseconds, where the last segment ends
+
+    Returns:
+        List[Dict]: Resource samples
+    """
+    return arrays_to_samples(*profile_segments_to_arrays(profile, duration))
+
+
+def profile_segments_to_arrays(profile: Dict, duration: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert a resource profile's segments into arrays of sample times and values
+
+    Produces the same samples as `profile_segments_to_samples`, computed with array operations. Times are an int64
+    array of microseconds from plan start. Values are a float64 array if every value is a float; otherwise they are an
+    object array holding the same Python values the samples would (e.g., integer initial values or discrete structs).
+
+    Args:
+        profile (Dict): Profile with "profile_segments" and "type", as returned by the Aerie API
+        duration (int): Plan duration in microseconds, where the last segment ends
+
+    Raises:
+        ValueError: Unknown profile type
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Sample times and values
+    """
+    profile_segments = profile["profile_segments"]
+    profile_type = profile["type"]["type"]
+    n_segments = len(profile_segments)
+
+    if n_segments == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    # Each segment ends where the next segment starts, and the last segment ends at the end of the plan
+    start_times = parse_intervals_to_microseconds([s["start_offset"] for s in profile_segments])
+    end_times = np.empty(n_segments, dtype=np.int64)
+    end_times[:-1] = start_times[1:]
+    end_times[-1] = duration
+
+    # Discrete profiles don't have rates. Merge runs of identical values into a single pair of points at the start and
+    # end of the run.
+    if profile_type == "discrete":
+        dynamics = [s["dynamics"] for s in profile_segments]
+        dynamics_array = _to_values_array(dynamics)
+
+        run_starts = np.flatnonzero(
+            np.concatenate(([True], ~_elementwise_equal(dynamics_array[1:], dynamics_array[:-1])))
+        )
+        run_ends = np.append(run_starts[1:] - 1, n_segments - 1)
+
+        times = np.empty(2 * len(run_starts), dtype=np.int64)
+        times[0::2] = start_times[run_starts]
+        times[1::2] = end_times[run_ends]
+        values = np.empty(2 * len(run_starts), dtype=dynamics_array.dtype)
+        values[0::2] = dynamics_array[run_starts]
+        values[1::2] = dynamics_array[run_ends]
+        return times, values
+
+    # Real profiles can have rates over time. Each segment gets a point at its end, and a point at its start unless
+    # the previous segment ended at the same value.
+    elif profile_type == "real":
+        initial_values = [s["dynamics"]["initial"] for s in profile_segments]
+        initial_array = _to_values_array(initial_values)
+        initial_floats = np.asarray(initial_values, dtype=np.float64)
+        rates = np.fromiter((s["dynamics"]["rate"] for s in profile_segments), dtype=np.float64, count=n_segments)
+
+        end_values = initial_floats + rates * ((end_times - start_times) / 1e6)
+
+        keep_start = np.empty(n_segments, dtype=bool)
+        keep_start[0] = True
+        keep_start[1:] = end_values[:-1] != initial_floats[1:]
+
+        end_indices = np.cumsum(keep_start.astype(np.int64) + 1) - 1
+        start_indices = end_indices[keep_start] - 1
+
+        n_samples = int(end_indices[-1]) + 1
+        times = np.empty(n_samples, dtype=np.int64)
+        times[start_indices] = start_times[keep_start]
+        times[end_indices] = end_times
+        values = np.empty(n_samples, dtype=initial_array.dtype)
+        values[start_indices] = initial_array[keep_start]
+        values[end_indices] = end_values
+        return times, values
+
+    else:
+        raise ValueError(f"Unknown resource profile type: {profile_type}")
+
+
+def arrays_to_samples(times: np.ndarray, values: np.ndarray) -> List[Dict]:
+    """Convert arrays of sample times and values to a list of samples {x: <time>, y: <value>}
+
+    Args:
+        times (np.ndarray): Sample times
+        values (np.ndarray): Sample values
+
+    Returns:
+        List[Dict]: Resource samples
+    """
+    return [{"x": x, "y": y} for x, y in zip(times.tolist(), values.tolist())]
+
+
+def decimate_samples(
+    times: np.ndarray, values: np.ndarray, profile_type: str, max_points: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a resource timeline to at most `max_points` samples for plotting or previews
+
+    Real profiles are downsampled with Largest-Triangle-Three-Buckets (LTTB), which keeps the samples that best preserve
+    the shape of the timeline. Discrete profiles keep only samples where the value changes, and if there are still too
+    many, the first change in each of `max_points - 1` equal groups of changes. Every sample kept is an original sample.
+
+    Args:
+        times (np.ndarray): Sample times
+        values (np.ndarray): Sample values
+        profile_type (str): "real" or "discrete"
+        max_points (int): Maximum number of samples to keep. Must be at least 3.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Decimated sample times and values
+    """
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    if len(times) <= max_points:
+        return times, values
+
+    if profile_type == "real":
+        keep = _lttb_indices(times, np.asarray(values, dtype=np.float64), max_points)
+
+    elif profile_type == "discrete":
+        # Samples come in pairs at the start and end of each run of a value. Drop the end of each run but the last,
+        # which a step interpolation recovers from the start of the next.
+        changes = np.append(np.arange(0, len(times) - 1, 2), len(times) - 1)
+        if len(changes) > max_points:
+            groups = np.array_split(changes[:-1], max_points - 1)
+            changes = np.append([g[0] for g in groups], changes[-1])
+        keep = changes
+
+    else:
+        raise ValueError(f"Unknown resource profile type: {profile_type}")
+
+    return times[keep], values[keep]
+
+
+def _lttb_indices(times: np.ndarray, values: np.ndarray, max_points: int) -> np.ndarray:
+    x = times.astype(np.float64)
+    n_samples = len(x)
+
+    # Keep the first and last points, and one point from each of `max_points - 2` buckets between them
+    bucket_edges = np.linspace(1, n_samples - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n_samples - 1
+
+    for i in range(max_points - 2):
+        start, end = bucket_edges[i], max(bucket_edges[i + 1], bucket_edges[i] + 1)
+
+        # The next bucket is represented by its average point, or by the last point after the final bucket
+        if i + 2 < len(bucket_edges):
+            next_start, next_end = end, max(bucket_edges[i + 2], end + 1)
+            next_x = x[next_start:next_end].mean()
+            next_y = values[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[-1], values[-1]
+
+        # Pick the point forming the largest triangle with the previously kept point and the next bucket
+        prev_x, prev_y = x[keep[i]], values[keep[i]]
+        areas = np.abs(
+            (prev_x - next_x) * (values[start:end] - prev_y) - (prev_x - x[start:end]) * (next_y - prev_y)
+        )
+        keep[i + 1] = start + int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else start
+
+    return keep
+
+
+def _to_values_array(values: List) -> np.ndarray:
+    if all(type(v) is float for v in values):
+        return np.array(values, dtype=np.float64)
+
+    # Fill element-wise so that list-valued resources aren't expanded into another array dimension
+    array = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        array[i] = v
+    return array
+
+
+def _elementwise_equal(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.dtype != object:
+        return a == b
+    return np.fromiter((x == y for x, y in zip(a, b)), dtype=bool, count=len(a))
+
+
+def write_resources_csv(
+    fid: IO[str],
+    resources: Iterable[Tuple[str, Tuple[np.ndarray, np.ndarray]]],
+    time_header: str,
+    format_time: Callable[[int], Any],
+) -> int:
+    """Write resource timelines to a CSV file with one column per resource and one row per sample time
+
+    Timelines are merged in time order with a heap, so rows are written as they're produced. Each cell holds the
+    resource's latest value at or before the row's time; where a resource has several samples at the same time, the
+    last one is used. Cells before a resource's first sample are left empty.
+
+    Numbers are formatted as pandas formatted them in earlier versions of this command: integers in a numeric column
+    are written as floats (e.g., "5.0"), unless every value in the column is an integer and the column has a sample at
+    every row's time.
+
+    Args:
+        fid (IO[str]): Text file to write
+        resources (Iterable[Tuple[str, Tuple[np.ndarray, np.ndarray]]]): Resource names and arrays of sample times and
+            values, as returned by `profile_segments_to_arrays`
+        time_header (str): Header of the time column
+        format_time (Callable[[int], Any]): Converts a sample time in microseconds to the time column value
+
+    Returns:
+        int: Number of rows written
+    """
+    resources = list(resources)
+    n_row_times = None
+    if any(values.dtype == object or np.issubdtype(values.dtype, np.integer) for _, (_, values) in resources):
+        n_row_times = len(np.unique(np.concatenate([times for _, (times, _) in resources])))
+
+    names = []
+    timelines = []
+    for column, (name, (times, values)) in enumerate(resources):
+        if n_row_times is not None:
+            values = _format_integers_as_floats(values, len(np.unique(times)) == n_row_times)
+        names.append(name)
+        timelines.append(_iter_column_samples(column, times, values))
+
+    writer = csv.writer(fid, lineterminator="\n")
+    writer.writerow([time_header] + names)
+
+    # Cells are escaped once, when a value arrives, rather than on every row it's carried forward to
+    n_rows = 0
+    row = [""] * len(names)
+    row_time = None
+    for time, column, value in heapq.merge(*timelines, key=itemgetter(0)):
+        if time != row_time:
+            if row_time is not None:
+                fid.write(_csv_field(format_time(row_time)) + "," + ",".join(row) + "\n")
+                n_rows += 1
+            row_time = time
+        row[column] = _csv_field(value)
+
+    if row_time is not None:
+        fid.write(_csv_field(format_time(row_time)) + "," + ",".join(row) + "\n")
+        n_rows += 1
+
+    return n_rows
+
+
+def _format_integers_as_floats(values: np.ndarray, complete: bool) -> np.ndarray:
+    # pandas stores a column of numbers as floats if any is a float or null, or if any row is missing a value
+    if np.issubdtype(values.dtype, np.integer):
+        return values if complete else values.astype(np.float64)
+    if values.dtype != object:
+        return values
+
+    types = {type(v) for v in values.tolist()}
+    if not types <= {int, float, type(None)} or (complete and types == {int}):
+        return values
+    return np.array([float(v) if type(v) is int else v for v in values.tolist()], dtype=object)
+
+
+def _csv_field(value: Any) -> str:
+    # Matches the escaping of `csv.writer` with the default dialect
+    if value is None:
+        return ""
+    text = value if type(value) is str else str(value)
+    if "," in text or '"' in text or "\n" in text or "\r" in text:
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _iter_column_samples(
+    column: int, times: np.ndarray, values: np.ndarray, chunk_size: int = 2**16
+) -> Iterator[Tuple[int, int, Any]]:
+    # Convert to Python values a chunk at a time to keep memory bounded
+    for i in range(0, len(times), chunk_size):
+        for time, value in zip(times[i:i + chunk_size].tolist(), values[i:i + chunk_size].tolist()):
+            yield time, column, value
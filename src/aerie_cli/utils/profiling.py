@@ -0,0 +1,85 @@
+"""Collect and summarize measurements of requests to an Aerie host"""
+
+import json
+from typing import Dict
+from typing import List
+from threading import Lock
+
+from rich.table import Table
+
+from aerie_cli.aerie_host import RequestRecord
+
+
+class RequestProfiler:
+    """Request observer which accumulates `RequestRecord`s
+
+    Register with `AerieHost.add_request_observer(profiler.record)`.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[RequestRecord] = []
+        self._lock = Lock()
+
+    def record(self, record: RequestRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def summarize(self) -> List[Dict]:
+        """Aggregate records by API and operation
+
+        Returns:
+            List[Dict]: One summary per operation, in descending order of total wall time
+        """
+        summaries: Dict = {}
+        for r in self.records:
+            s = summaries.setdefault(
+                (r.api, r.operation),
+                {
+                    "api": r.api,
+                    "operation": r.operation,
+                    "count": 0,
+                    "errors": 0,
+                    "wall_time": 0.0,
+                    "server_time": 0.0,
+                    "request_bytes": 0,
+                    "response_bytes": 0,
+                },
+            )
+            s["count"] += 1
+            s["errors"] += 0 if r.status is not None and r.status < 400 else 1
+            s["wall_time"] += r.wall_time
+            s["server_time"] += r.server_time or 0.0
+            s["request_bytes"] += r.request_bytes
+            s["response_bytes"] += r.response_bytes
+
+        return sorted(summaries.values(), key=lambda s: s["wall_time"], reverse=True)
+
+    def summary_table(self) -> Table:
+        table = Table(title="Aerie Requests", caption=f"{len(self.records)} requests")
+        table.add_column("API", no_wrap=True)
+        table.add_column("Operation", style="cyan")
+        table.add_column("Count", justify="right", no_wrap=True)
+        table.add_column("Errors", justify="right", no_wrap=True)
+        table.add_column("Wall Time (s)", justify="right", no_wrap=True)
+        table.add_column("Mean (s)", justify="right", no_wrap=True)
+        table.add_column("Server Time (s)", justify="right", no_wrap=True)
+        table.add_column("Sent (kB)", justify="right", no_wrap=True)
+        table.add_column("Received (kB)", justify="right", no_wrap=True)
+        for s in self.summarize():
+            table.add_row(
+                s["api"],
+                s["operation"],
+                str(s["count"]),
+                str(s["errors"]),
+                f"{s['wall_time']:.3f}",
+                f"{s['wall_time'] / s['count']:.3f}",
+                f"{s['server_time']:.3f}",
+                f"{s['request_bytes'] / 1e3:.1f}",
+                f"{s['response_bytes'] / 1e3:.1f}",
+            )
+        return table
+
+    def write_records(self, filename: str) -> None:
+        """Write all raw records to a JSON file"""
+        with open(filename, "w") as fid:
+            json.dump([r.to_dict() for r in self.records], fid, indent=2)
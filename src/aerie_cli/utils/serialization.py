@@ -34,8 +34,18 @@ Django is licensed under the BSD 3-Clause License:
 
 """
 
+import hashlib
+import json
 import re
 from datetime import timedelta
+from functools import lru_cache
+from typing import Any
+from typing import IO
+from typing import Iterable
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
 
 
 POSTGRES_INTERVAL_RE = re.compile(
@@ -49,6 +59,8 @@ POSTGRES_INTERVAL_RE = re.compile(
     r")?$"
 )
 
+INTERVAL_CACHE_SIZE = 2**16
+
 
 def postgres_interval_to_timedelta(interval: str) -> timedelta:
     """Parse a Postgres inteval to a `timedelta` object
@@ -64,25 +76,113 @@ def postgres_interval_to_timedelta(interval: str) -> timedelta:
     Returns:
         timedelta
     """
-    match = POSTGRES_INTERVAL_RE.match(interval)
-    if match:
-        kw = match.groupdict()
-        sign = -1 if kw.pop("sign", "+") == "-" else 1
-        if kw.get("microseconds"):
-            kw["microseconds"] = kw["microseconds"].ljust(6, "0")
-        kw = {k: float(v.replace(",", ".")) for k, v in kw.items() if v is not None}
-        days = timedelta(kw.pop("days", 0.0) or 0.0)
-        return days + sign * timedelta(**kw)
-    else:
-        raise ValueError(f"Unable to parse interval string: {interval}")
+    return timedelta(microseconds=postgres_interval_to_microseconds(interval))
 
 
+@lru_cache(maxsize=INTERVAL_CACHE_SIZE)
 def postgres_interval_to_microseconds(interval: str) -> int:
     """Convert a postgres interval string to an integer number of microseconds
 
-    Both `timedelta` and Postgres intervals have a precision of 1us, so this conversion shouldn't introduce any rounding errors
+    Both `timedelta` and Postgres intervals have a precision of 1us, so the conversion is done in integer arithmetic.
+    Results are memoized, as the same offsets recur across activities and profile segments.
+
+    Args:
+        interval (str): Postgres interval string
+
+    Raises:
+        ValueError: Unable to match patterns in the interval
+
+    Returns:
+        int: Microseconds
+    """
+    match = POSTGRES_INTERVAL_RE.match(interval)
+    if not match:
+        raise ValueError(f"Unable to parse interval string: {interval}")
+
+    days, sign, hours, minutes, seconds, microseconds = match.group(
+        "days", "sign", "hours", "minutes", "seconds", "microseconds"
+    )
+    time_microseconds = (int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds or 0)) * 10**6
+    if microseconds:
+        time_microseconds += int(microseconds.ljust(6, "0"))
+    if sign == "-":
+        time_microseconds = -time_microseconds
+    return int(days or 0) * 86400 * 10**6 + time_microseconds
+
+
+def parse_intervals_to_microseconds(intervals: Sequence[str]) -> np.ndarray:
+    """Convert many postgres interval strings to microseconds at once
+
+    Intervals of the form HH:MM:SS[.ffffff], as Aerie reports offsets within a plan, are parsed with array operations.
+    Any others (e.g., with days or signs) fall back to `postgres_interval_to_microseconds`.
+
+    Args:
+        intervals (Sequence[str]): Postgres interval strings
+
+    Raises:
+        ValueError: Unable to match patterns in an interval
+
+    Returns:
+        np.ndarray: int64 array of microseconds
     """
-    return int(postgres_interval_to_timedelta(interval).total_seconds() * (10**6))
+    n_intervals = len(intervals)
+    result = np.zeros(n_intervals, dtype=np.int64)
+    if n_intervals == 0:
+        return result
+
+    try:
+        chars = np.array(intervals, dtype=bytes)
+    except UnicodeEncodeError:
+        chars = np.array([b""] * n_intervals)
+
+    # View the strings as a NUL-padded byte matrix, with room to look past the end of the longest string
+    width = chars.itemsize
+    padded = np.zeros((n_intervals, width + 14), dtype=np.uint8)
+    if width:
+        padded[:, :width] = chars.view(np.uint8).reshape(n_intervals, width)
+    rows = np.arange(n_intervals)
+
+    def is_digit(c: np.ndarray) -> np.ndarray:
+        return (c >= ord("0")) & (c <= ord("9"))
+
+    def digit(c: np.ndarray) -> np.ndarray:
+        return np.where(is_digit(c), c.astype(np.int64) - ord("0"), 0)
+
+    # Hours are all digits up to the first colon
+    colon = padded == ord(":")
+    first_colon = colon.argmax(axis=1)
+    fast = colon[rows, first_colon] & (first_colon >= 1) & (first_colon <= 12)
+    hours = np.zeros(n_intervals, dtype=np.int64)
+    for j in range(min(int(first_colon.max()), 12)):
+        in_hours = j < first_colon
+        fast &= ~in_hours | is_digit(padded[:, j])
+        hours = np.where(in_hours, hours * 10 + digit(padded[:, j]), hours)
+
+    def after_colon(k: int) -> np.ndarray:
+        return padded[rows, first_colon + k]
+
+    # Then MM:SS, optionally followed by a decimal point and up to six digits
+    for k in (1, 2, 4, 5):
+        fast &= is_digit(after_colon(k))
+    fast &= after_colon(3) == ord(":")
+    has_fraction = after_colon(6) == ord(".")
+    fast &= has_fraction | (after_colon(6) == 0)
+    fast &= ~has_fraction | is_digit(after_colon(7))
+    fraction = np.zeros(n_intervals, dtype=np.int64)
+    for k in range(6):
+        c = after_colon(7 + k)
+        fast &= is_digit(c) | (c == 0)
+        fraction = fraction * 10 + digit(c)
+    fast &= after_colon(13) == 0
+
+    minutes = digit(after_colon(1)) * 10 + digit(after_colon(2))
+    seconds = digit(after_colon(4)) * 10 + digit(after_colon(5))
+    result[:] = ((hours * 60 + minutes) * 60 + seconds) * 10**6 + fraction
+
+    for i in np.flatnonzero(~fast):
+        result[i] = postgres_interval_to_microseconds(intervals[i])
+
+    return result
 
 
 def timedelta_to_postgres_interval(td: timedelta) -> str:
@@ -116,3 +216,70 @@ def parse_timedelta_str(td_string: str) -> timedelta:
 
     else:
         raise ValueError(f"Invalid time string format: {td_string}")
+
+
+def hash_arguments(arguments: Any) -> str:
+    """Hash a JSON-serializable object of arguments independent of key order
+
+    Args:
+        arguments (Any): JSON-serializable arguments, e.g. activity arguments
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON encoding
+    """
+    canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def write_json_list(fid: IO[str], items: Iterable[Any], indent: int = 2, level: int = 0) -> int:
+    """Write an iterable to a file as a JSON list, one item at a time
+
+    Output is identical to `json.dump(list(items), fid, indent=indent)` without holding all items in memory.
+
+    Args:
+        fid (IO[str]): Text file to write
+        items (Iterable[Any]): JSON-serializable items
+        indent (int, optional): JSON indentation. Defaults to 2.
+        level (int, optional): Nesting level of the list, if written inside another JSON container. Defaults to 0.
+
+    Returns:
+        int: Number of items written
+    """
+    return _write_json_container(fid, ((None, item) for item in items), "[]", indent, level)
+
+
+def write_json_dict(fid: IO[str], items: Iterable[Tuple[str, Any]], indent: int = 2, level: int = 0) -> int:
+    """Write (key, value) pairs to a file as a JSON object, one value at a time
+
+    Output is identical to `json.dump(dict(items), fid, indent=indent)` without holding all values in memory.
+
+    Args:
+        fid (IO[str]): Text file to write
+        items (Iterable[Tuple[str, Any]]): Keys and JSON-serializable values
+        indent (int, optional): JSON indentation. Defaults to 2.
+        level (int, optional): Nesting level of the object, if written inside another JSON container. Defaults to 0.
+
+    Returns:
+        int: Number of items written
+    """
+    return _write_json_container(fid, items, "{}", indent, level)
+
+
+def _write_json_container(
+    fid: IO[str], items: Iterable[Tuple[Any, Any]], brackets: str, indent: int, level: int
+) -> int:
+    prefix = " " * indent * (level + 1)
+    n_items = 0
+    for key, value in items:
+        fid.write(brackets[0] + "\n" if n_items == 0 else ",\n")
+        fid.write(prefix)
+        if key is not None:
+            fid.write(json.dumps(key) + ": ")
+        fid.write(json.dumps(value, indent=indent).replace("\n", "\n" + prefix))
+        n_items += 1
+
+    if n_items == 0:
+        fid.write(brackets)
+    else:
+        fid.write("\n" + " " * indent * level + brackets[1])
+    return n_items
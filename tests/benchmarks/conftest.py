@@ -0,0 +1,16 @@
+import time
+from typing import Callable
+
+
+def best_time(fn: Callable, repeat: int = 3) -> float:
+    """Best wall-clock time (seconds) over several calls of a function"""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def report(name: str, reference_time: float, fast_time: float) -> None:
+    print(f"\n{name}: reference {reference_time:.4f} s, fast {fast_time:.4f} s ({reference_time / fast_time:.1f}x)")
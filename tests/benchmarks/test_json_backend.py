@@ -0,0 +1,44 @@
+"""Compare decoding a large GraphQL response twice with the standard library (the previous `post_to_graphql`
+behavior) against decoding it once with the fastest available backend.
+"""
+
+import json
+from pathlib import Path
+
+from aerie_cli.utils import json_backend
+
+from .conftest import best_time, report
+
+MOCK_RESPONSES_DIRECTORY = Path(__file__).parent.parent.joinpath("unit_tests", "files", "mock_responses")
+
+
+def _large_profile_response(n_segments: int) -> bytes:
+    """Scale up a recorded resource profile response to `n_segments` segments per profile"""
+    with open(MOCK_RESPONSES_DIRECTORY.joinpath("get_resource_samples_1.json"), "r") as fid:
+        recorded = json.load(fid)[0]["response"]
+
+    for profile in recorded["dataset"]["profiles"]:
+        segments = profile["profile_segments"]
+        profile["profile_segments"] = [segments[i % len(segments)] for i in range(n_segments)]
+
+    return json.dumps({"data": {"simulation_dataset_by_pk": recorded}}).encode("utf-8")
+
+
+def test_decode_large_response():
+    content = _large_profile_response(200000)
+
+    def reference():
+        # Previously, the response was decoded once to check for errors and again to get the data
+        assert "errors" not in json.loads(content.decode("utf-8")).keys()
+        return next(iter(json.loads(content.decode("utf-8"))["data"].values()))
+
+    def fast():
+        return next(iter(json_backend.loads(content)["data"].values()))
+
+    assert fast() == reference()
+
+    report(
+        f"Decode {len(content) / 2**20:.1f} MB response ({json_backend.BACKEND})",
+        best_time(reference),
+        best_time(fast),
+    )
@@ -0,0 +1,112 @@
+"""Compare the per-segment loop previously used by `get_resource_samples` against the vectorized profile engine on
+synthetic 1M-segment profiles.
+"""
+
+import json
+import random
+from typing import Dict
+from typing import List
+
+import pytest
+
+from aerie_cli.utils.profiles import arrays_to_samples
+from aerie_cli.utils.profiles import profile_segments_to_arrays
+from aerie_cli.utils.serialization import postgres_interval_to_microseconds
+
+from .conftest import best_time, report
+
+N_SEGMENTS = 1000000
+
+
+def _reference_profile_segments_to_samples(profile: Dict, duration: int) -> List[Dict]:
+    """Per-segment implementation from `AerieClient.get_resource_samples` before vectorization"""
+    profile_segments = profile["profile_segments"]
+    profile_type = profile["type"]["type"]
+    values = []
+
+    for i in range(len(profile_segments)):
+        segment = profile_segments[i]
+        segment_start_time = postgres_interval_to_microseconds(segment["start_offset"])
+        if i + 1 < len(profile_segments):
+            segment_end_time = postgres_interval_to_microseconds(profile_segments[i + 1]["start_offset"])
+        else:
+            segment_end_time = duration
+
+        dynamics = segment["dynamics"]
+        if profile_type == "discrete":
+            start_value = {"x": segment_start_time, "y": dynamics}
+            end_value = {"x": segment_end_time, "y": dynamics}
+            if len(values) and (values[-1] == start_value):
+                values.pop()
+                values.append(end_value)
+            else:
+                values.append(start_value)
+                values.append(end_value)
+
+        elif profile_type == "real":
+            start_value = {"x": segment_start_time, "y": dynamics["initial"]}
+            if (len(values) and values[-1] != start_value) or (len(values) == 0):
+                values.append(start_value)
+            values.append(
+                {
+                    "x": segment_end_time,
+                    "y": dynamics["initial"] + dynamics["rate"] * ((segment_end_time - segment_start_time) / 1e6),
+                }
+            )
+
+        else:
+            raise ValueError(f"Unknown resource profile type: {profile_type}")
+
+    return values
+
+
+def _offset(microseconds: int) -> str:
+    seconds, microseconds = divmod(microseconds, 10**6)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{microseconds:06d}"
+
+
+def _synthetic_profile(profile_type: str, n_segments: int) -> Dict:
+    rng = random.Random(0)
+    offsets = [_offset(i * 1500000) for i in range(n_segments)]
+
+    if profile_type == "real":
+        # Mix continuous segments, discontinuities, integer values and zero rates
+        segments = []
+        value = 0.0
+        for offset in offsets:
+            rate = rng.choice([0, 0.0, 1.5, -2.25])
+            if rng.random() < 0.3:
+                value = rng.choice([0, 10, rng.random() * 100])
+            segments.append({"start_offset": offset, "dynamics": {"initial": value, "rate": rate}})
+            value = value + rate * 1.5
+        schema = {"type": "struct", "items": {"rate": {"type": "real"}, "initial": {"type": "real"}}}
+    else:
+        states = ["OFF", "IDLE", "ON"] if profile_type == "discrete" else [1, 2, 3]
+        segments = [{"start_offset": offset, "dynamics": rng.choice(states)} for offset in offsets]
+        schema = {"type": "variant"}
+
+    return {
+        "name": profile_type,
+        "profile_segments": segments,
+        "type": {"type": "real" if profile_type == "real" else "discrete", "schema": schema},
+    }
+
+
+@pytest.mark.parametrize("profile_type", ["real", "discrete", "discrete_int"])
+def test_profile_segments_to_arrays(profile_type: str):
+    profile = _synthetic_profile(profile_type, N_SEGMENTS)
+    duration = N_SEGMENTS * 1500000 + 1
+
+    reference_samples = _reference_profile_segments_to_samples(profile, duration)
+    samples = arrays_to_samples(*profile_segments_to_arrays(profile, duration))
+
+    # Serialized output is byte-for-byte identical, including int vs. float values
+    assert json.dumps(samples) == json.dumps(reference_samples)
+
+    report(
+        f"Process {N_SEGMENTS} {profile_type} segments",
+        best_time(lambda: _reference_profile_segments_to_samples(profile, duration), repeat=1),
+        best_time(lambda: profile_segments_to_arrays(profile, duration), repeat=1),
+    )
@@ -0,0 +1,80 @@
+"""Compare the previous pandas-based `download-resources --csv` writer against the streaming heap-merge writer."""
+
+import io
+import random
+from typing import Dict
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from aerie_cli.utils.profiles import write_resources_csv
+
+from .conftest import best_time, report
+
+N_RESOURCES = 20
+N_SAMPLES = 50000
+
+
+def _reference_write_resources_csv(fid, resource_samples: Dict[str, List[Dict]]) -> None:
+    """Relative-time CSV writer from `plans download-resources` before the heap merge"""
+    time_dictionary = {}
+    field_name = ["Time (s)"]
+    for activity, samples in resource_samples.items():
+        field_name.append(activity)
+        for i in samples:
+            time_dictionary.setdefault(i.get("x"), []).append((activity, i.get("y")))
+
+    csv_dictionary = []
+    for time in time_dictionary:
+        seconds = 0
+        if time != 0:
+            seconds = time / 1000000
+        temp_dict = {"Time (s)": seconds}
+        for activity in time_dictionary.get(time):
+            temp_dict[activity[0]] = activity[1]
+        csv_dictionary.append(temp_dict)
+
+    sorted_by_time = sorted(csv_dictionary, key=lambda d: d["Time (s)"])
+    df = pd.DataFrame(sorted_by_time)
+    df.ffill(inplace=True)  # fillna(method="ffill") in pandas < 2
+    df.to_csv(fid, index=False, header=field_name)
+
+
+def _synthetic_resources() -> Dict[str, List[Dict]]:
+    """Real-valued timelines which all start at plan start, with discontinuities and shared sample times"""
+    rng = random.Random(0)
+    resources = {}
+    for i in range(N_RESOURCES):
+        samples = [{"x": 0, "y": rng.random()}]
+        for _ in range(N_SAMPLES):
+            x = samples[-1]["x"] + rng.choice([0, 10**6, rng.randrange(1, 10**8)])
+            samples.append({"x": x, "y": rng.random() * 100})
+        resources[f"resource_{i:02d}"] = samples
+    return resources
+
+
+def test_write_resources_csv():
+    resources = _synthetic_resources()
+    arrays = [
+        (name, (np.array([s["x"] for s in samples]), np.array([s["y"] for s in samples])))
+        for name, samples in resources.items()
+    ]
+
+    def reference():
+        fid = io.StringIO()
+        _reference_write_resources_csv(fid, resources)
+        return fid.getvalue()
+
+    def fast():
+        fid = io.StringIO()
+        write_resources_csv(fid, arrays, "Time (s)", lambda t: t / 1000000)
+        return fid.getvalue()
+
+    assert fast() == reference()
+
+    report(
+        f"Write {N_RESOURCES} x {N_SAMPLES} samples to CSV",
+        best_time(reference, repeat=1),
+        best_time(fast, repeat=1),
+    )
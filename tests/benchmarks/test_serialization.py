@@ -0,0 +1,102 @@
+"""Compare the previous regex-and-timedelta Postgres interval parser against the exact, memoized single-value parser
+and the bulk array parser, over intervals with days, signs and fractional seconds.
+"""
+
+import random
+from datetime import timedelta
+from typing import List
+
+import pytest
+
+from aerie_cli.utils.serialization import POSTGRES_INTERVAL_RE
+from aerie_cli.utils.serialization import parse_intervals_to_microseconds
+from aerie_cli.utils.serialization import postgres_interval_to_microseconds
+
+from .conftest import best_time, report
+
+N_INTERVALS = 1000000
+
+
+def _reference_postgres_interval_to_timedelta(interval: str) -> timedelta:
+    """Implementation of `postgres_interval_to_timedelta` before the integer parser"""
+    match = POSTGRES_INTERVAL_RE.match(interval)
+    if match:
+        kw = match.groupdict()
+        sign = -1 if kw.pop("sign", "+") == "-" else 1
+        if kw.get("microseconds"):
+            kw["microseconds"] = kw["microseconds"].ljust(6, "0")
+        kw = {k: float(v.replace(",", ".")) for k, v in kw.items() if v is not None}
+        days = timedelta(kw.pop("days", 0.0) or 0.0)
+        return days + sign * timedelta(**kw)
+    else:
+        raise ValueError(f"Unable to parse interval string: {interval}")
+
+
+def _reference_postgres_interval_to_microseconds(interval: str) -> int:
+    return int(_reference_postgres_interval_to_timedelta(interval).total_seconds() * (10**6))
+
+
+def _plan_offsets(n_intervals: int) -> List[str]:
+    """Increasing offsets within a plan, as Aerie reports profile segment and activity start offsets"""
+    rng = random.Random(0)
+    offsets = []
+    microseconds = 0
+    for _ in range(n_intervals):
+        microseconds += rng.choice([10**6, 1500000, rng.randrange(1, 10**8)])
+        seconds, fraction = divmod(microseconds, 10**6)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        offset = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        if fraction:
+            offset += "." + f"{fraction:06d}".rstrip("0")
+        offsets.append(offset)
+    return offsets
+
+
+def _mixed_intervals(n_intervals: int) -> List[str]:
+    """Intervals covering days, signs and fractional seconds of every precision"""
+    rng = random.Random(1)
+    intervals = []
+    for _ in range(n_intervals):
+        interval = f"{rng.randrange(0, 1000):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+        if rng.random() < 0.5:
+            interval += "." + "".join(rng.choice("0123456789") for _ in range(rng.randint(1, 6)))
+        if rng.random() < 0.3:
+            interval = rng.choice("+-") + interval
+        if rng.random() < 0.3:
+            interval = f"{rng.randrange(-400, 400)} {rng.choice(['day', 'days'])} " + interval
+        intervals.append(interval)
+    return intervals
+
+
+@pytest.mark.parametrize("intervals", [_plan_offsets(N_INTERVALS), _mixed_intervals(N_INTERVALS)], ids=["offsets", "mixed"])
+def test_parse_intervals_to_microseconds(intervals: List[str]):
+    # The previous parser converted through float seconds, which could truncate by 1us. Compare with its exact value.
+    expected = [_reference_postgres_interval_to_timedelta(i) // timedelta(microseconds=1) for i in intervals]
+
+    assert parse_intervals_to_microseconds(intervals).tolist() == expected
+
+    postgres_interval_to_microseconds.cache_clear()
+    assert [postgres_interval_to_microseconds(i) for i in intervals] == expected
+
+    report(
+        f"Parse {len(intervals)} intervals in bulk",
+        best_time(lambda: [_reference_postgres_interval_to_microseconds(i) for i in intervals], repeat=1),
+        best_time(lambda: parse_intervals_to_microseconds(intervals), repeat=1),
+    )
+
+
+def test_postgres_interval_to_microseconds_repeated():
+    # Activity offsets are highly repetitive, e.g. the same few start times across many plans
+    rng = random.Random(2)
+    distinct = _mixed_intervals(1000)
+    intervals = [rng.choice(distinct) for _ in range(N_INTERVALS)]
+
+    expected = [_reference_postgres_interval_to_timedelta(i) // timedelta(microseconds=1) for i in intervals]
+    assert [postgres_interval_to_microseconds(i) for i in intervals] == expected
+
+    report(
+        f"Parse {len(intervals)} repeated intervals one at a time",
+        best_time(lambda: [_reference_postgres_interval_to_microseconds(i) for i in intervals], repeat=1),
+        best_time(lambda: [postgres_interval_to_microseconds(i) for i in intervals], repeat=1),
+    )
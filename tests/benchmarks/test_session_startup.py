@@ -0,0 +1,86 @@
+"""Compare CLI cold start with an active session when the session is re-validated with the gateway on every invocation
+(the previous behavior, now `--revalidate-session`) against skipping validation while the session's JWT is fresh.
+
+The gateway is a local stand-in which answers `/auth/session` after a delay typical of a remote Aerie host.
+"""
+
+import base64
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from pathlib import Path
+
+from aerie_cli.aerie_host import AerieHost
+from aerie_cli.aerie_host import AerieJWT
+from aerie_cli.persistent import SESSION_TIMESTAMP_FSTRING
+
+from .conftest import best_time, report
+
+GATEWAY_LATENCY = 0.15
+
+
+class SlowGatewayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(GATEWAY_LATENCY)
+        body = json.dumps({"success": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _jwt() -> AerieJWT:
+    payload = {
+        "https://hasura.io/jwt/claims": {"x-hasura-allowed-roles": ["viewer"], "x-hasura-default-role": "viewer"},
+        "username": "benchmark",
+        "exp": int(time.time()) + 3600,
+    }
+    encoded_payload = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+    return AerieJWT(f"header.{encoded_payload}.signature")
+
+
+def test_session_startup(tmp_path: Path):
+    server = HTTPServer(("127.0.0.1", 0), SlowGatewayHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    session = AerieHost("http://127.0.0.1:1/v1/graphql", f"http://127.0.0.1:{server.server_port}", configuration_name="benchmark")
+    session.aerie_jwt = _jwt()
+    session.active_role = "viewer"
+
+    # Session files are stored in the user config directory, which follows XDG_CONFIG_HOME
+    session_directory = tmp_path.joinpath("aerie_cli")
+    session_directory.mkdir()
+    session_file = session_directory.joinpath(datetime.utcnow().strftime(SESSION_TIMESTAMP_FSTRING) + ".aerie_cli.session")
+    with open(session_file, "wb") as fid:
+        pickle.dump(session, fid)
+
+    env = {**os.environ, "XDG_CONFIG_HOME": str(tmp_path)}
+
+    def run_status(*args: str) -> str:
+        resp = subprocess.run(
+            [sys.executable, "-m", "aerie_cli", *args, "status"], env=env, capture_output=True, text=True, check=True
+        )
+        return resp.stdout
+
+    try:
+        assert "Active configuration: benchmark" in run_status()
+        assert "Active configuration: benchmark" in run_status("--revalidate-session")
+
+        report(
+            "CLI cold start with an active session",
+            best_time(lambda: run_status("--revalidate-session"), repeat=5),
+            best_time(run_status, repeat=5),
+        )
+    finally:
+        server.shutdown()
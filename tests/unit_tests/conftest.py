@@ -0,0 +1,141 @@
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+from typing import Dict
+from typing import List
+
+import pytest
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class GraphQLWebsocketServer:
+    """
+    Local stand-in for a GraphQL websocket endpoint using the `graphql-transport-ws` protocol.
+
+    Accepts one connection at a time. Acknowledges `connection_init`, then answers each `subscribe` message by sending
+    every payload in `updates` as a `next` message, followed by `complete` if `send_complete` is set. Messages received
+    from the client are recorded in `received`.
+    """
+
+    def __init__(self, updates: List[Dict], send_complete: bool = True) -> None:
+        self.updates = updates
+        self.send_complete = send_complete
+        self.received: List[Dict] = []
+        self.handshake_headers: Dict[str, str] = {}
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(1)
+        self.port = self._socket.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}/v1/graphql"
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._socket.close()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    self._handle(conn)
+                except (ConnectionError, OSError):
+                    pass
+
+    def _handle(self, conn: socket.socket) -> None:
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        for line in request.decode().split("\r\n")[1:]:
+            if ": " in line:
+                name, value = line.split(": ", 1)
+                self.handshake_headers[name.lower()] = value
+
+        accept = base64.b64encode(
+            hashlib.sha1((self.handshake_headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        conn.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n"
+                "Sec-WebSocket-Protocol: graphql-transport-ws\r\n\r\n"
+            ).encode()
+        )
+
+        while True:
+            opcode, payload = _recv_frame(conn)
+            if opcode == 0x8:
+                _send_frame(conn, 0x8, payload)
+                return
+            message = json.loads(payload)
+            self.received.append(message)
+            if message["type"] == "connection_init":
+                _send_json(conn, {"type": "connection_ack"})
+                _send_json(conn, {"type": "ping"})
+            elif message["type"] == "subscribe":
+                for update in self.updates:
+                    _send_json(conn, {"id": message["id"], "type": "next", "payload": update})
+                if self.send_complete:
+                    _send_json(conn, {"id": message["id"], "type": "complete"})
+
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        chunk = conn.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data += chunk
+    return data
+
+
+def _recv_frame(conn: socket.socket):
+    b0, b1 = _recv_exact(conn, 2)
+    length = b1 & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(conn, 8))[0]
+    mask = _recv_exact(conn, 4) if b1 & 0x80 else b"\x00" * 4
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(_recv_exact(conn, length)))
+    return b0 & 0x0F, payload
+
+
+def _send_frame(conn: socket.socket, opcode: int, payload: bytes) -> None:
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 2**16:
+        header += bytes([126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack("!Q", len(payload))
+    conn.sendall(header + payload)
+
+
+def _send_json(conn: socket.socket, message: Dict) -> None:
+    _send_frame(conn, 0x1, json.dumps(message).encode())
+
+
+@pytest.fixture
+def graphql_ws_server():
+    """Factory for local GraphQL websocket stand-ins, closed after the test"""
+    servers = []
+
+    def make_server(updates: List[Dict], send_complete: bool = True) -> GraphQLWebsocketServer:
+        server = GraphQLWebsocketServer(updates, send_complete)
+        servers.append(server)
+        return server
+
+    yield make_server
+
+    for server in servers:
+        server.close()
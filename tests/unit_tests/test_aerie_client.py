@@ -1,23 +1,43 @@
+from datetime import timedelta
 from pathlib import Path
 from typing import Dict, List
+import base64
 import json
 import re
+import threading
+import time
 
+import arrow
 import pytest
+import requests
 
 from aerie_cli.aerie_client import AerieClient
+from aerie_cli.aerie_client import SimulationFailedError
+from aerie_cli import persistent
 from aerie_cli.aerie_host import AerieHost
+from aerie_cli.aerie_host import AerieJWT
+from aerie_cli.persistent import PersistentCache
 from aerie_cli.schemas.client import Activity
 from aerie_cli.schemas.api import ApiActivityPlanRead
 from aerie_cli.schemas.client import ActivityPlanRead
 from aerie_cli.schemas.client import ActivityPlanCreate
 from aerie_cli.schemas.client import ResourceType
+from aerie_cli.utils.profiles import arrays_to_samples
 
 BLANK_LINE_REGEX = r"^\s*$"
 EXPECTED_RESULTS_DIRECTORY = Path(__file__).parent.joinpath("files", "expected_results")
 INPUTS_DIRECTORY = Path(__file__).parent.joinpath("files", "inputs")
 
 
+def make_jwt(allowed_roles: List[str]) -> AerieJWT:
+    payload = {
+        "https://hasura.io/jwt/claims": {"x-hasura-allowed-roles": allowed_roles, "x-hasura-default-role": allowed_roles[0]},
+        "username": "test",
+    }
+    encoded_payload = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+    return AerieJWT(f"header.{encoded_payload}.signature")
+
+
 def _preprocess_query(q) -> str:
     lines: List[str] = q.split('\n')
     lines = [ln.strip() for ln in lines if not re.match(BLANK_LINE_REGEX, ln)]
@@ -56,6 +76,11 @@ class MockAerieHost(AerieHost):
             f"{mock_query_name}.json")
         with open(mock_query_fn, 'r') as fid:
             self.mock_data: List = json.load(fid)
+        self.graphql_url = "http://localhost:8080/v1/graphql"
+        self.active_role = "aerie_admin"
+        self.session = requests.Session()
+        self.aerie_jwt = None
+        self._request_observers = []
 
     def post_to_graphql(self, query: str, **kwargs) -> Dict:
 
@@ -71,6 +96,9 @@ class MockAerieHost(AerieHost):
 
         return mock_transaction["response"]
 
+    def post_to_graphql_fields(self, query: str, **kwargs) -> Dict:
+        return self.post_to_graphql(query, **kwargs)
+
 
 def test_list_all_activity_plans():
     aerie_host = MockAerieHost('list_all_activity_plans')
@@ -109,6 +137,59 @@ def test_list_all_activity_plans():
     assert client.list_all_activity_plans() == expected
 
 
+def test_list_all_activity_plans_latest_sim_dataset():
+    aerie_host = MockAerieHost("list_all_activity_plans_latest_sim_dataset")
+    client = AerieClient(aerie_host)
+
+    res = client.list_all_activity_plans(include_latest_sim_dataset=True)
+
+    assert [p.latest_sim_dataset_id for p in res] == [7, None]
+    assert not aerie_host.mock_data
+
+    # The latest simulation dataset isn't saved with the plan
+    assert "latest_sim_dataset_id" not in res[0].to_dict()
+
+
+class MockPlanHost(AerieHost):
+    """
+    Mock Aerie host which serves plans by ID in any order, after a delay that
+    is longer for lower plan IDs, for testing concurrent plan downloads.
+    """
+
+    def __init__(self, num_plans: int) -> None:
+        self.num_plans = num_plans
+        self.session = requests.Session()
+
+    def post_to_graphql(self, query: str, **kwargs) -> Dict:
+        plans = [
+            {
+                "id": i,
+                "name": f"plan--{i}",
+                "model_id": 1,
+                "start_time": "2025-01-01T00:00:00+00:00",
+                "duration": "48:00:00",
+                "simulations": [{"id": i}],
+                "activity_directives": [],
+            }
+            for i in range(1, self.num_plans + 1)
+        ]
+        if "plan_id" not in kwargs:
+            return plans
+
+        time.sleep(0.01 * (self.num_plans - kwargs["plan_id"]))
+        return plans[kwargs["plan_id"] - 1]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_get_all_activity_plans(max_workers: int):
+    client = AerieClient(MockPlanHost(8))
+
+    res = client.get_all_activity_plans(max_workers=max_workers)
+
+    # Results are in the original order even if later plans finish first
+    assert [p.id for p in res] == list(range(1, 9))
+
+
 def test_create_activity():
     aerie_host = MockAerieHost('create_activity')
     client = AerieClient(aerie_host)
@@ -149,6 +230,282 @@ def test_update_activity():
     assert res == 15
 
 
+def _create_activities_inputs() -> List[Activity]:
+    return [
+        Activity.from_dict({"id": 1, "type": "NoOp", "start_offset": "01:00:00", "arguments": {}, "name": "First"}),
+        Activity.from_dict({"id": 2, "type": "NoOp", "start_offset": "01:00:00", "arguments": {}, "name": "Second"}),
+        Activity.from_dict(
+            {"id": 3, "type": "NoOp", "start_offset": "01:00:00", "arguments": {}, "name": "Third", "anchor_id": 2, "anchored_to_start": True}
+        ),
+        Activity.from_dict({"id": 4, "type": "NoOp", "start_offset": "01:00:00", "arguments": {}, "name": "Fourth"}),
+    ]
+
+
+def test_create_activities():
+    aerie_host = MockAerieHost("create_activities")
+    client = AerieClient(aerie_host)
+
+    res = client.create_activities(_create_activities_inputs(), 1, chunk_size=2)
+
+    # IDs are returned in input order, regardless of upload order
+    assert res == [11, 12, 14, 13]
+    assert len(aerie_host.mock_data) == 0
+
+
+def test_create_activities_returned_out_of_order():
+    aerie_host = MockAerieHost("create_activities")
+    aerie_host.mock_data[0]["response"]["returning"].reverse()
+    client = AerieClient(aerie_host)
+
+    # Rows are matched to inputs by content, so "Third" is still anchored to "Second" (directive 12)
+    res = client.create_activities(_create_activities_inputs(), 1, chunk_size=2)
+    assert res == [11, 12, 14, 13]
+    assert len(aerie_host.mock_data) == 0
+
+
+def test_create_activities_returned_count_mismatch():
+    aerie_host = MockAerieHost("create_activities")
+    aerie_host.mock_data[0]["response"]["returning"].pop()
+    client = AerieClient(aerie_host)
+
+    with pytest.raises(RuntimeError, match="Inserted 2 activity directives, but 1 were returned"):
+        client.create_activities(_create_activities_inputs(), 1, chunk_size=2)
+
+
+def test_create_activities_unresolved_anchor():
+    aerie_host = MockAerieHost("create_activities")
+    client = AerieClient(aerie_host)
+
+    activities = [
+        Activity.from_dict(
+            {"id": 1, "type": "NoOp", "start_offset": "01:00:00", "arguments": {}, "name": "Loop_1", "anchor_id": 2, "anchored_to_start": True}
+        ),
+        Activity.from_dict(
+            {"id": 2, "type": "NoOp", "start_offset": "01:00:00", "arguments": {}, "name": "Loop_2", "anchor_id": 1, "anchored_to_start": True}
+        ),
+    ]
+
+    with pytest.raises(RuntimeError, match="Loop_1, Loop_2"):
+        client.create_activities(activities, 1)
+
+
+def _sync_activity(id, name, start_offset, anchor_id=None, arguments=None):
+    return Activity.from_dict(
+        {"id": id, "type": "NoOp", "start_offset": start_offset, "arguments": arguments or {}, "name": name,
+         "anchor_id": anchor_id, "anchored_to_start": True}
+    )
+
+
+def test_sync_activity_plan():
+    # Plan 1 has NoOp directives A (1), B (2), C (3, anchored to B), D (4) and E (5)
+    aerie_host = MockAerieHost("sync_activity_plan_1")
+    client = AerieClient(aerie_host)
+
+    activities = [
+        _sync_activity(1, "A", "01:00:00"),
+        _sync_activity(2, "B", "02:30:00"),
+        _sync_activity(3, "C", "00:10:00", anchor_id=1),
+        _sync_activity(None, "D", "04:00:00"),
+        _sync_activity(None, "F", "00:30:00", anchor_id=1, arguments={"duration": 10}),
+    ]
+
+    res = client.sync_activity_plan(1, activities)
+
+    # D is matched by key and unchanged, so only changed fields are sent in a single mutation
+    assert res.inserted == [6]
+    assert res.updated == [2, 3]
+    assert res.deleted == [5]
+    assert not aerie_host.mock_data
+
+
+def test_sync_activity_plan_new_anchors():
+    aerie_host = MockAerieHost("sync_activity_plan_2")
+    client = AerieClient(aerie_host)
+
+    activities = [
+        _sync_activity(1, "A", "01:00:00"),
+        _sync_activity(2, "B", "02:00:00", anchor_id=101),
+        _sync_activity(3, "C", "00:10:00", anchor_id=2),
+        _sync_activity(4, "D", "04:00:00"),
+        _sync_activity(5, "E", "05:00:00"),
+        _sync_activity(100, "G", "03:00:00"),
+        _sync_activity(101, "H", "00:05:00", anchor_id=100),
+    ]
+
+    res = client.sync_activity_plan(1, activities)
+
+    # New activities are inserted by level before B is re-anchored to H
+    assert res.inserted == [6, 7]
+    assert res.updated == [2]
+    assert res.deleted == []
+    assert not aerie_host.mock_data
+
+    aerie_host = MockAerieHost("sync_activity_plan_2")
+    client = AerieClient(aerie_host)
+    with pytest.raises(RuntimeError, match="B"):
+        client.sync_activity_plan(1, activities[:5])
+
+
+def test_simulate_plan(monkeypatch):
+    aerie_host = MockAerieHost("simulate_plan")
+    client = AerieClient(aerie_host)
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+
+    assert client.simulate_plan(1, poll_period=0.5, initial_poll_period=0.2) == 3
+
+    # Polls back off from the initial period, up to the poll period
+    assert sleeps == pytest.approx([0.2, 0.3, 0.45, 0.5])
+    assert not aerie_host.mock_data
+
+
+def test_simulate_plan_failed(monkeypatch):
+    aerie_host = MockAerieHost("simulate_plan_failed")
+    client = AerieClient(aerie_host)
+    monkeypatch.setattr(time, "sleep", lambda _: None)
+
+    with pytest.raises(SimulationFailedError, match="Boom") as e:
+        client.simulate_plan(1)
+
+    assert e.value.plan_id == 1
+    assert e.value.response["status"] == "failed"
+
+
+def test_simulate_plan_subscribe(graphql_ws_server):
+    pytest.importorskip("websocket")
+    server = graphql_ws_server(
+        [
+            {"data": {"simulation_dataset_by_pk": {"status": "pending", "reason": None}}},
+            {"data": {"simulation_dataset_by_pk": {"status": "incomplete", "reason": None}}},
+            {"data": {"simulation_dataset_by_pk": {"status": "success", "reason": None}}},
+        ],
+        send_complete=False,
+    )
+    aerie_host = MockAerieHost("simulate_plan_subscribe")
+    aerie_host.graphql_url = server.url
+    client = AerieClient(aerie_host)
+
+    assert client.simulate_plan(1, subscribe=True) == 3
+
+    # The subscription is to the dataset from the simulate query, and is completed by the client once finished
+    assert not aerie_host.mock_data
+    assert [m["type"] for m in server.received] == ["connection_init", "subscribe", "pong", "complete"]
+    assert server.received[1]["payload"]["variables"] == {"id": 3}
+
+    # A failed dataset raises without polling again
+    server = graphql_ws_server([{"data": {"simulation_dataset_by_pk": {"status": "failed", "reason": {"message": "Boom"}}}}])
+    aerie_host = MockAerieHost("simulate_plan_subscribe")
+    aerie_host.graphql_url = server.url
+    client = AerieClient(aerie_host)
+
+    with pytest.raises(SimulationFailedError, match="Boom"):
+        client.simulate_plan(1, subscribe=True)
+
+
+class MockSimulationHost(AerieHost):
+    """
+    Mock Aerie host which reports each plan's simulation as finished after a
+    given number of `simulate` queries, or failed if that number is negative.
+    """
+
+    def __init__(self, queries_to_finish: Dict[int, int]) -> None:
+        self.queries_to_finish = queries_to_finish
+        self.session = requests.Session()
+        self.queries: List[int] = []
+        self.lock = threading.Lock()
+
+    def post_to_graphql(self, query: str, **kwargs) -> Dict:
+        plan_id = kwargs["plan_id"]
+        with self.lock:
+            self.queries.append(plan_id)
+            n_queries = self.queries.count(plan_id)
+        finish = self.queries_to_finish[plan_id]
+        if n_queries < abs(finish):
+            status = "pending"
+        else:
+            status = "failed" if finish < 0 else "complete"
+        return {"status": status, "reason": None, "simulationDatasetId": 10 + plan_id}
+
+
+def test_simulate_plans():
+    aerie_host = MockSimulationHost({1: 4, 2: 1, 3: -2, 4: 2})
+    client = AerieClient(aerie_host)
+
+    res = list(client.simulate_plans([1, 2, 3, 4], poll_period=0.01, max_workers=2, initial_poll_period=0.001))
+
+    # Every simulation is started before any is polled, and a failure doesn't stop the others
+    assert sorted(aerie_host.queries[:4]) == [1, 2, 3, 4]
+    assert {r.plan_id: r.simulation_dataset_id for r in res} == {1: 11, 2: 12, 3: None, 4: 14}
+    failed = next(r for r in res if r.plan_id == 3)
+    assert isinstance(failed.error, SimulationFailedError)
+    assert all(r.elapsed > 0 for r in res)
+
+
+def test_link_activities_to_sequence():
+    aerie_host = MockAerieHost("link_activities_to_sequence")
+    client = AerieClient(aerie_host)
+
+    # The first activity in the mock was already linked, so is skipped
+    res = client.link_activities_to_sequence("seq-1", 5, [101, 102, 103], chunk_size=2, ignore_conflicts=True)
+
+    assert res == 2
+    assert not aerie_host.mock_data
+
+
+class MockSequenceHost(AerieHost):
+    """
+    Mock Aerie host which serves SeqJson for any sequence after a delay that
+    is longer for earlier sequences, or fails for sequence IDs containing "bad".
+    """
+
+    def __init__(self, seq_ids: List[str]) -> None:
+        self.seq_ids = seq_ids
+        self.session = requests.Session()
+
+    def post_to_graphql(self, query: str, **kwargs) -> Dict:
+        if "bad" in kwargs["seq_id"]:
+            raise RuntimeError(f"Failed to expand {kwargs['seq_id']}")
+        time.sleep(0.02 * (len(self.seq_ids) - self.seq_ids.index(kwargs["seq_id"])))
+        return {"seqJson": {"id": kwargs["seq_id"], "metadata": {"simulationDatasetId": kwargs["simulation_dataset_id"]}}}
+
+
+def test_iter_expanded_sequences():
+    seq_ids = [f"seq-{i}" for i in range(6)]
+    client = AerieClient(MockSequenceHost(seq_ids))
+
+    res = list(client.iter_expanded_sequences(seq_ids, 3, max_workers=6))
+
+    # Sequences are yielded as they arrive, so later (faster) sequences come first
+    assert [seq_id for seq_id, _ in res] == seq_ids[::-1]
+    assert all(seq_json["id"] == seq_id for seq_id, seq_json in res)
+    assert list(client.iter_expanded_sequences([], 3)) == []
+
+    with pytest.raises(RuntimeError, match="seq-bad"):
+        list(client.iter_expanded_sequences(["seq-bad"] + seq_ids, 3, max_workers=2))
+
+
+def test_list_expansion_runs_by_datasets():
+    aerie_host = MockAerieHost("list_expansion_runs_by_datasets")
+    client = AerieClient(aerie_host)
+
+    res = client.list_expansion_runs_by_datasets([3, 2, 1], chunk_size=2)
+
+    # Runs from all chunks are merged in reverse chronological order
+    assert [r.id for r in res] == [4, 3, 2]
+    assert not aerie_host.mock_data
+
+
+def test_list_sequences_by_datasets():
+    aerie_host = MockAerieHost("list_sequences_by_datasets")
+    client = AerieClient(aerie_host)
+
+    res = client.list_sequences_by_datasets([3, 2, 1], chunk_size=2)
+
+    assert res == {3: ["a", "b"], 2: [], 1: ["a"]}
+    assert list(res) == [3, 2, 1]
+    assert not aerie_host.mock_data
+
+
 def test_get_resource_samples():
 
     # CASE 1: Get all states
@@ -172,6 +529,87 @@ def test_get_resource_samples():
     assert res == expected
 
 
+def test_get_resource_timelines():
+    aerie_host = MockAerieHost('get_resource_timelines_by_plan')
+    client = AerieClient(aerie_host)
+
+    with open(EXPECTED_RESULTS_DIRECTORY.joinpath('get_resource_samples_1.json'), 'r') as fid:
+        expected = json.load(fid)
+
+    # Resources are pulled from the latest simulation dataset of the plan
+    res = client.get_resource_timelines(7)
+    assert not aerie_host.mock_data
+    assert res.to_dict() == expected
+
+
+def test_get_simulation_resource_timelines():
+    aerie_host = MockAerieHost('get_resource_samples_1')
+    client = AerieClient(aerie_host)
+
+    timelines = client.get_simulation_resource_timelines(1)
+
+    # Plan start and duration come from the same request as the profiles
+    assert not aerie_host.mock_data
+    assert timelines.plan_start_time == arrow.get("2025-01-01T00:00:00+00:00")
+    assert timelines.plan_duration == timedelta(minutes=30)
+    assert [name for name, _ in timelines.resources] == ["dataVolume", "hardwareState", "totalRate"]
+
+
+def test_get_resource_samples_window():
+    aerie_host = MockAerieHost('get_resource_samples_window')
+    client = AerieClient(aerie_host)
+
+    res = client.get_resource_samples(1, ["dataVolume"], start=timedelta(minutes=12), end=timedelta(minutes=18))
+
+    # The segment in progress at the window start is included, and the last segment ends where the next one starts
+    assert res == {
+        "resourceSamples": {
+            "dataVolume": [
+                {"x": 600000000, "y": 0.0},
+                {"x": 900000000, "y": 55296000000.0},
+                {"x": 1200000000, "y": 55296000000.0},
+            ]
+        }
+    }
+    assert not aerie_host.mock_data
+
+
+def test_iter_resource_samples_chunked():
+    aerie_host = MockAerieHost('get_resource_samples_3')
+    client = AerieClient(aerie_host)
+
+    with open(EXPECTED_RESULTS_DIRECTORY.joinpath('get_resource_samples_1.json'), 'r') as fid:
+        expected = json.load(fid)
+
+    res = list(client.iter_resource_samples(1, chunk_size=2))
+
+    # Resources are yielded in name order across chunks
+    assert [name for name, _ in res] == sorted(expected["resourceSamples"])
+    assert dict(res) == expected["resourceSamples"]
+    assert not aerie_host.mock_data
+
+
+def test_iter_resource_arrays():
+    aerie_host = MockAerieHost('get_resource_samples_1')
+    client = AerieClient(aerie_host)
+
+    with open(EXPECTED_RESULTS_DIRECTORY.joinpath('get_resource_samples_1.json'), 'r') as fid:
+        expected = json.load(fid)
+
+    res = {name: arrays_to_samples(*arrays) for name, arrays in client.iter_resource_arrays(1)}
+    assert res == expected["resourceSamples"]
+
+
+def test_iter_simulation_results():
+    aerie_host = MockAerieHost("iter_simulation_results")
+    client = AerieClient(aerie_host)
+
+    res = client.iter_simulation_results(1, page_size=2)
+
+    assert [a["id"] for a in res] == [1, 3, 2]
+    assert not aerie_host.mock_data
+
+
 def test_get_activity_plan_by_id():
     aerie_host = MockAerieHost("get_activity_plan_by_id")
     client = AerieClient(aerie_host)
@@ -185,6 +623,59 @@ def test_get_activity_plan_by_id():
     assert res == expected
 
 
+def test_get_activity_plan_by_id_full_args():
+    aerie_host = MockAerieHost("get_activity_plan_by_id_full_args")
+    client = AerieClient(aerie_host)
+
+    res = client.get_activity_plan_by_id(1, "true")
+
+    # Activities with the same type and arguments share a single effective arguments request
+    assert len(aerie_host.mock_data) == 0
+    assert [a.arguments for a in res.activities] == [
+        {"a": 1, "b": 2, "c": 0},
+        {"a": 1, "b": 2, "c": 0},
+        {"d": "default"},
+        {"a": 3, "b": 0, "c": 0},
+    ]
+
+
+def test_get_activity_plan_by_id_full_args_cached(tmp_path: Path):
+    persistent.CACHE_FILE_DIRECTORY = tmp_path
+    cache = PersistentCache("effective_arguments")
+
+    aerie_host = MockAerieHost("get_activity_plan_by_id_full_args")
+    client = AerieClient(aerie_host, cache)
+    expected = client.get_activity_plan_by_id(1, "true")
+
+    # Second download only requests the plan, with effective arguments from the cache
+    aerie_host = MockAerieHost("get_activity_plan_by_id_full_args")
+    aerie_host.mock_data.pop()
+    client = AerieClient(aerie_host, cache)
+    assert client.get_activity_plan_by_id(1, "true") == expected
+
+
+def test_get_activity_plan_by_id_plan_cache(tmp_path: Path):
+    persistent.CACHE_FILE_DIRECTORY = tmp_path
+    aerie_host = MockAerieHost("get_activity_plan_by_id_cached")
+    client = AerieClient(aerie_host, plan_cache=PersistentCache("plans"))
+
+    # Downloaded on first read, served from the cache while the revision is unchanged, and downloaded again after
+    expected = client.get_activity_plan_by_id(1)
+    assert client.get_activity_plan_by_id(1) == expected
+    assert len(aerie_host.mock_data) == 2
+    assert client.get_activity_plan_by_id(1) == expected
+    assert not aerie_host.mock_data
+
+
+def test_get_activity_plan_by_id_plan_cache_not_found(tmp_path: Path):
+    persistent.CACHE_FILE_DIRECTORY = tmp_path
+    aerie_host = MockAerieHost("get_plan_revision_not_found")
+    client = AerieClient(aerie_host, plan_cache=PersistentCache("plans"))
+
+    with pytest.raises(RuntimeError, match="Plan with ID 404 not found"):
+        client.get_activity_plan_by_id(404)
+
+
 @pytest.mark.parametrize(["case_name"], [("create_activity_plan_1",), ("create_activity_plan_2",)])
 def test_create_activity_plan(case_name: str):
     aerie_host = MockAerieHost(case_name)
@@ -248,6 +739,90 @@ def test_get_resource_types():
     res = client.get_resource_types(1)
     assert res == expected
 
+def test_get_resource_types_cached(tmp_path: Path):
+    persistent.CACHE_FILE_DIRECTORY = tmp_path
+    cache = PersistentCache("metadata")
+
+    aerie_host = MockAerieHost("get_resource_types")
+    client = AerieClient(aerie_host, metadata_cache=cache)
+    expected = client.get_resource_types(1)
+
+    # The mock host has no more responses, so these must come from the cache
+    assert client.get_resource_types(1) == expected
+    assert AerieClient(MockAerieHost("get_resource_types"), metadata_cache=cache).get_resource_types(1) == expected
+
+    # A different role doesn't share cached results
+    aerie_host.active_role = "viewer"
+    with pytest.raises(IndexError):
+        client.get_resource_types(1)
+
+    # Neither does a different user, or a session with a Hasura admin secret
+    aerie_host = MockAerieHost("get_resource_types")
+    aerie_host.aerie_jwt = make_jwt(["aerie_admin"])
+    assert AerieClient(aerie_host, metadata_cache=cache).get_resource_types(1) == expected
+    assert not aerie_host.mock_data
+    aerie_host = MockAerieHost("get_resource_types")
+    aerie_host.session.headers["x-hasura-admin-secret"] = "secret"
+    assert AerieClient(aerie_host, metadata_cache=cache).get_resource_types(1) == expected
+    assert not aerie_host.mock_data
+
+    # Deleting the model invalidates the cache
+    aerie_host = MockAerieHost("get_resource_types")
+    client = AerieClient(aerie_host, metadata_cache=cache)
+    client._invalidate_cached_metadata_query("get_resource_types", missionModelId=1)
+    assert client.get_resource_types(1) == expected
+    assert len(aerie_host.mock_data) == 0
+
+
+def test_get_resource_types_empty_not_cached(tmp_path: Path):
+    persistent.CACHE_FILE_DIRECTORY = tmp_path
+    aerie_host = MockAerieHost("get_resource_types_empty")
+    client = AerieClient(aerie_host, metadata_cache=PersistentCache("metadata"))
+
+    # Types of a new model may not have been extracted yet, so an empty result is requested again next time
+    assert client.get_resource_types(1) == []
+    expected = client.get_resource_types(1)
+    assert expected
+    assert not aerie_host.mock_data
+    assert client.get_resource_types(1) == expected
+
+
+def test_invalidate_cached_metadata_query_all_roles(tmp_path: Path):
+    persistent.CACHE_FILE_DIRECTORY = tmp_path
+    cache = PersistentCache("metadata")
+    aerie_host = MockAerieHost("get_resource_types")
+    aerie_host.aerie_jwt = make_jwt(["aerie_admin", "viewer"])
+    client = AerieClient(aerie_host, metadata_cache=cache)
+
+    keys = [client._metadata_cache_key("get_resource_types", {"missionModelId": 1}, role) for role in ["aerie_admin", "viewer"]]
+    for key in keys:
+        cache.set(key, [{"name": "a", "schema": {"type": "real"}}])
+
+    client._invalidate_cached_metadata_query("get_resource_types", missionModelId=1)
+    assert all(cache.get(key) is None for key in keys)
+
+
+def test_upload_mission_model_invalidates_cache(tmp_path: Path):
+    persistent.CACHE_FILE_DIRECTORY = tmp_path
+    cache = PersistentCache("metadata")
+    aerie_host = MockAerieHost("upload_mission_model")
+    aerie_host.post_to_gateway_files = lambda name, fid: {"id": 9}
+    client = AerieClient(aerie_host, metadata_cache=cache)
+
+    keys = [
+        client._metadata_cache_key("get_mission_models", {}),
+        client._metadata_cache_key("get_all_activity_types", {"model_id": 1}),
+        client._metadata_cache_key("get_resource_types", {"missionModelId": 1}),
+    ]
+    for key in keys:
+        cache.set(key, [{"id": 1}])
+
+    jar = tmp_path.joinpath("banananation.jar")
+    jar.write_bytes(b"")
+    assert client.upload_mission_model(str(jar), "banananation", "bananas", "1.0.0") == 1
+    assert all(cache.get(key) is None for key in keys)
+
+
 def test_get_sequence_json():
     aerie_host = MockAerieHost("get_sequence_json")
     client = AerieClient(aerie_host)
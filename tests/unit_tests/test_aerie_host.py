@@ -0,0 +1,182 @@
+import json
+import pickle
+from typing import List
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from aerie_cli.aerie_host import AerieHost
+from aerie_cli.aerie_host import RequestRecord
+from aerie_cli.aerie_host import get_graphql_operation_name
+from aerie_cli.utils.profiling import RequestProfiler
+
+
+class MockAdapter(BaseAdapter):
+    """
+    Transport adapter which responds to every request with a fixed status and JSON body.
+    """
+
+    def __init__(self, status_code: int, body: dict) -> None:
+        super().__init__()
+        self.status_code = status_code
+        self.body = body
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.status_code = self.status_code
+        resp._content = json.dumps(self.body).encode("utf-8")
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+def get_mock_host(status_code: int, body: dict) -> AerieHost:
+    session = requests.Session()
+    session.mount("http://", MockAdapter(status_code, body))
+    return AerieHost("http://localhost:8080/v1/graphql", "http://localhost:9000", session)
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("query get_plans ($plan_id: Int!) { plan_by_pk(id: $plan_id) { id } }", "get_plans"),
+        ("\n    mutation CreatePlan($plan: plan_insert_input!) { createPlan: insert_plan_one(object: $plan) { id } }", "CreatePlan"),
+        ("query ($model_id: Int!) { activity_presets { id } }", "activity_presets"),
+        ("query { alias: plan { id } }", "plan"),
+    ],
+)
+def test_get_graphql_operation_name(query: str, expected: str):
+    assert get_graphql_operation_name(query) == expected
+
+
+def test_request_observer():
+    host = get_mock_host(200, {"data": {"plan_by_pk": {"id": 1}}})
+    records: List[RequestRecord] = []
+    host.add_request_observer(records.append)
+
+    assert host.post_to_graphql("query get_plans ($plan_id: Int!) { plan_by_pk(id: $plan_id) { id } }", plan_id=1) == {"id": 1}
+
+    assert len(records) == 1
+    record = records[0]
+    assert record.api == "graphql"
+    assert record.operation == "get_plans"
+    assert record.variables_bytes == len('{"plan_id": 1}')
+    assert record.request_bytes > record.variables_bytes
+    assert record.response_bytes == len('{"data": {"plan_by_pk": {"id": 1}}}')
+    assert 0 <= record.server_time <= record.wall_time
+    assert record.status == 200
+
+    # Observers are called for gateway requests and failed requests, and can be removed
+    host.add_request_observer(records.append)
+    host.is_auth_enabled()
+    assert records[-1].api == "gateway"
+    assert records[-1].operation == "/auth/session"
+    assert len(records) == 2
+
+    host.remove_request_observer(records.append)
+    host.is_auth_enabled()
+    assert len(records) == 2
+
+
+def test_request_observers_not_pickled():
+    host = get_mock_host(200, {})
+    host.add_request_observer(lambda r: None)
+
+    unpickled: AerieHost = pickle.loads(pickle.dumps(host))
+    assert unpickled._request_observers == []
+    assert unpickled.graphql_url == host.graphql_url
+
+
+def test_reserve_connections():
+    host = AerieHost("http://localhost:8080/v1/graphql", "http://localhost:9000")
+    adapter = host.session.get_adapter("http://localhost:8080")
+
+    # Pools grow to the number of concurrent requests, but never shrink
+    host.reserve_connections(32)
+    assert host.session.get_adapter("http://localhost:8080") is adapter
+    assert adapter._pool_maxsize == 32
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 32
+
+    host.reserve_connections(4)
+    assert adapter._pool_maxsize == 32
+
+    # Other adapters are left alone
+    host = get_mock_host(200, {})
+    host.reserve_connections(32)
+    assert isinstance(host.session.get_adapter("http://localhost:8080"), MockAdapter)
+
+
+def test_request_profiler():
+    host = get_mock_host(500, {})
+    profiler = RequestProfiler()
+    host.add_request_observer(profiler.record)
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            host.post_to_graphql("query ListPlans { plan { id } }")
+
+    summary = profiler.summarize()
+    assert len(summary) == 1
+    assert summary[0]["operation"] == "ListPlans"
+    assert summary[0]["count"] == 3
+    assert summary[0]["errors"] == 3
+
+
+def test_subscribe_to_graphql(graphql_ws_server):
+    pytest.importorskip("websocket")
+    server = graphql_ws_server([{"data": {"plan_by_pk": {"revision": 1}}}, {"data": {"plan_by_pk": {"revision": 2}}}])
+    session = requests.Session()
+    session.headers["x-hasura-admin-secret"] = "secret"
+    session.cookies.set("ssosession", "token")
+    host = AerieHost(server.url, "http://localhost:9000", session)
+    records: List[RequestRecord] = []
+    host.add_request_observer(records.append)
+
+    updates = list(host.subscribe_to_graphql("subscription PlanRevision($id: Int!) { plan_by_pk(id: $id) { revision } }", id=1))
+
+    assert updates == [{"revision": 1}, {"revision": 2}]
+    assert server.received[0] == {"type": "connection_init", "payload": {"headers": {"x-hasura-admin-secret": "secret"}}}
+    assert server.received[1]["payload"]["variables"] == {"id": 1}
+    assert server.handshake_headers["sec-websocket-protocol"] == "graphql-transport-ws"
+    assert server.handshake_headers["cookie"] == "ssosession=token"
+    assert len(records) == 1
+    assert records[0].api == "graphql-ws"
+    assert records[0].operation == "PlanRevision"
+    assert records[0].status == 101
+
+
+def test_request_profiler_subscriptions(graphql_ws_server):
+    pytest.importorskip("websocket")
+    server = graphql_ws_server([{"data": {"plan_by_pk": {"revision": 1}}}])
+    host = AerieHost(server.url, "http://localhost:9000")
+    profiler = RequestProfiler()
+    host.add_request_observer(profiler.record)
+
+    # Subscriptions which complete or are closed early aren't errors
+    list(host.subscribe_to_graphql("subscription PlanRevision { plan_by_pk(id: 1) { revision } }"))
+    updates = host.subscribe_to_graphql("subscription PlanRevision { plan_by_pk(id: 1) { revision } }")
+    next(updates)
+    updates.close()
+
+    server.updates = [{"errors": [{"message": "field not found"}]}]
+    with pytest.raises(RuntimeError):
+        list(host.subscribe_to_graphql("subscription PlanRevision { plan_by_pk(id: 1) { revision } }"))
+
+    summary = profiler.summarize()
+    assert len(summary) == 1
+    assert summary[0]["api"] == "graphql-ws"
+    assert summary[0]["count"] == 3
+    assert summary[0]["errors"] == 1
+
+
+def test_subscribe_to_graphql_error(graphql_ws_server):
+    pytest.importorskip("websocket")
+    server = graphql_ws_server([{"errors": [{"message": "field not found"}]}])
+    host = AerieHost(server.url, "http://localhost:9000")
+
+    with pytest.raises(RuntimeError, match="field not found"):
+        list(host.subscribe_to_graphql("subscription { plan { id } }"))
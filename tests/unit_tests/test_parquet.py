@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from aerie_cli.utils.parquet import write_activities_parquet
+from aerie_cli.utils.parquet import write_resources_parquet
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_write_resources_parquet(tmp_path: Path):
+    filename = tmp_path.joinpath("resources.parquet")
+    resources = [
+        ("a", (np.arange(10, dtype=np.int64), np.arange(10, dtype=np.float64))),
+        ("b", (np.array([0, 5], dtype=np.int64), np.array(["ON", {"x": 1}], dtype=object))),
+    ]
+
+    n_rows = write_resources_parquet(str(filename), iter(resources), "2025-01-01T00:00:00+00:00", row_group_size=4)
+
+    parquet_file = pq.ParquetFile(filename)
+    assert n_rows == 12
+    assert [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)] == [4, 4, 4]
+    assert parquet_file.schema_arrow.metadata[b"plan_start_time"] == b"2025-01-01T00:00:00+00:00"
+
+    table = parquet_file.read()
+    assert str(table.schema.field("time").type) == "int64"
+    assert table.to_pylist()[-3:] == [
+        {"resource": "a", "time": 9, "value": 9.0, "value_json": None},
+        {"resource": "b", "time": 0, "value": None, "value_json": '"ON"'},
+        {"resource": "b", "time": 5, "value": None, "value_json": '{"x": 1}'},
+    ]
+
+
+def test_write_activities_parquet(tmp_path: Path):
+    filename = tmp_path.joinpath("activities.parquet")
+    activities = [
+        {
+            "activity_type_name": "BiteBanana",
+            "attributes": {"arguments": {"biteSize": i}},
+            "directive_id": i,
+            "duration": "00:00:01.5",
+            "end_time": "2025-01-01T01:00:01.5+00:00",
+            "id": i,
+            "start_offset": "01:00:00",
+            "start_time": "2025-01-01T01:00:00+00:00",
+            "simulation_dataset_id": 1,
+            "parent_id": None,
+        }
+        for i in range(5)
+    ]
+
+    n_rows = write_activities_parquet(str(filename), iter(activities), row_group_size=2)
+
+    parquet_file = pq.ParquetFile(filename)
+    assert n_rows == 5
+    assert parquet_file.num_row_groups == 3
+
+    row = parquet_file.read().to_pylist()[1]
+    assert row["id"] == 1
+    assert row["parent_id"] is None
+    assert row["start_offset"] == 3600 * 10**6
+    assert row["duration"] == 1500000
+    assert row["end_offset"] == 3600 * 10**6 + 1500000
+    assert row["attributes"] == '{"arguments": {"biteSize": 1}}'
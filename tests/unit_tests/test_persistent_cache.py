@@ -0,0 +1,79 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from aerie_cli import persistent
+from aerie_cli.persistent import PersistentCache
+
+
+@pytest.fixture(autouse=True)
+def persistent_path(tmp_path: Path):
+    """
+    Fixture sets a new temporary path for the cache directory
+    """
+    persistent.CACHE_FILE_DIRECTORY = tmp_path.joinpath("cache")
+    return persistent.CACHE_FILE_DIRECTORY
+
+
+def test_get_missing():
+    cache = PersistentCache("test")
+    assert cache.get(cache.make_key("missing")) is None
+    assert cache.stats() == {"entries": 0, "bytes": 0}
+
+
+def test_set_get():
+    cache = PersistentCache("test")
+    key = cache.make_key("http://localhost:8080/v1/graphql", 1, "ActivityType", "abcd")
+    cache.set(key, {"a": 1, "b": [1, 2]})
+
+    assert cache.get(key) == {"a": 1, "b": [1, 2]}
+    assert cache.get_many([key, cache.make_key("missing")]) == {key: {"a": 1, "b": [1, 2]}}
+    assert cache.stats()["entries"] == 1
+
+
+def test_get_expired():
+    cache = PersistentCache("test")
+    cache.set("a", [1, 2])
+
+    assert cache.get("a", max_age=60) == [1, 2]
+    assert cache.get("a", max_age=-1) is None
+
+    cache.delete("a")
+    cache.delete("a")
+    assert cache.get("a") is None
+
+
+def test_make_key():
+    assert PersistentCache.make_key("a", 1) == PersistentCache.make_key("a", 1)
+    assert PersistentCache.make_key("a", 1) != PersistentCache.make_key("a", 2)
+
+
+def test_evict_least_recently_used():
+    cache = PersistentCache("test")
+    cache.set_many({k: "x" * 100 for k in ["a", "b", "c"]})
+    total_bytes = cache.stats()["bytes"]
+
+    # Mark "a" as the most recently used entry
+    now = time.time()
+    for i, key in enumerate(["b", "c", "a"]):
+        os.utime(cache.directory.joinpath(f"{key}.json"), (now + i, now + i))
+
+    cache.max_bytes = total_bytes - 1
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.get("a") is not None
+
+
+def test_clear(persistent_path: Path):
+    cache_1 = PersistentCache("test_1")
+    cache_2 = PersistentCache("test_2")
+    cache_1.set_many({"a": 1, "b": 2})
+    cache_2.set("a", 1)
+
+    assert PersistentCache.list_namespaces() == ["test_1", "test_2"]
+    assert cache_1.clear() == 2
+    assert cache_1.stats() == {"entries": 0, "bytes": 0}
+    assert cache_2.get("a") == 1
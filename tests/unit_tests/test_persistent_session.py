@@ -1,11 +1,15 @@
 import pytest
 import pickle
 import datetime
+import base64
+import json
+import time
 from pathlib import Path
 
 from aerie_cli import persistent
 
 from aerie_cli.aerie_host import AerieHost
+from aerie_cli.aerie_host import AerieJWT
 from aerie_cli.persistent import PersistentSessionManager
 
 
@@ -14,15 +18,29 @@ class MockAerieHost(AerieHost):
     Mock Aerie Host Session for testing session persistence.
     """
 
-    def __init__(self, ping_success: bool = True, name: str = "Test") -> None:
+    def __init__(self, ping_success: bool = True, name: str = "Test", jwt: AerieJWT = None) -> None:
         self.ping_success = ping_success
         self.configuration_name = name
         self.graphql_url = "Test"
         self.gateway_url = "Test"
+        self.aerie_jwt = jwt
+        self.n_pings = 0
 
     def check_auth(self) -> bool:
+        self.n_pings += 1
         return self.ping_success
 
+
+def make_jwt(exp: float = None) -> AerieJWT:
+    payload = {
+        "https://hasura.io/jwt/claims": {"x-hasura-allowed-roles": ["viewer"], "x-hasura-default-role": "viewer"},
+        "username": "test",
+    }
+    if exp is not None:
+        payload["exp"] = exp
+    encoded_payload = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+    return AerieJWT(f"header.{encoded_payload}.signature")
+
 @pytest.fixture
 def persistent_path(tmp_path: Path):
 
@@ -31,6 +49,7 @@ def persistent_path(tmp_path: Path):
 
     # Set session manager to initial state
     PersistentSessionManager._active_session = None
+    PersistentSessionManager.force_revalidation = False
 
     return tmp_path
 
@@ -199,3 +218,57 @@ def test_unset_session_active(persistent_path: Path):
     PersistentSessionManager.set_active_session(old_session)
 
     assert PersistentSessionManager.unset_active_session() == "Old Session"
+
+
+def _save_session(persistent_path: Path, session: MockAerieHost) -> Path:
+    fn = persistent_path.joinpath(
+        datetime.datetime.utcnow().strftime(persistent.SESSION_TIMESTAMP_FSTRING) + '.aerie_cli.session')
+    with open(fn, 'wb') as fid:
+        pickle.dump(session, fid)
+    return fn
+
+
+def test_jwt_expiry():
+    assert make_jwt(time.time() + 3600).is_valid_for(datetime.timedelta(minutes=59))
+    assert not make_jwt(time.time() + 3600).is_valid_for(datetime.timedelta(minutes=61))
+    assert not make_jwt().is_valid_for(datetime.timedelta(0))
+
+
+def test_get_session_fresh_jwt(persistent_path: Path):
+    """
+    Test loading a session whose JWT is well within its validity window, which isn't re-validated
+    """
+
+    # The ping would fail, but isn't made
+    old_fn = _save_session(persistent_path, MockAerieHost(False, jwt=make_jwt(time.time() + 3600)))
+    time.sleep(0.001)
+
+    s = PersistentSessionManager.get_active_session()
+    assert s.n_pings == 0
+
+    # The session file is renamed to mark it as used
+    session_files = list(persistent_path.iterdir())
+    assert len(session_files) == 1
+    assert session_files[0].name > old_fn.name
+
+
+@pytest.mark.parametrize("exp", [None, time.time() + 60])
+def test_get_session_expiring_jwt(persistent_path: Path, exp):
+    """
+    Test loading a session whose JWT is missing an expiry time or close to expiring, which is re-validated
+    """
+    _save_session(persistent_path, MockAerieHost(False, jwt=make_jwt(exp)))
+
+    with pytest.raises(persistent.NoActiveSessionError):
+        PersistentSessionManager.get_active_session()
+
+
+def test_get_session_force_revalidation(persistent_path: Path):
+    """
+    Test loading a session with a fresh JWT when re-validation is forced
+    """
+    _save_session(persistent_path, MockAerieHost(False, jwt=make_jwt(time.time() + 3600)))
+    PersistentSessionManager.force_revalidation = True
+
+    with pytest.raises(persistent.NoActiveSessionError):
+        PersistentSessionManager.get_active_session()
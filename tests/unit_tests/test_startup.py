@@ -0,0 +1,46 @@
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+from aerie_cli.__version__ import __version__
+
+# Modules which must not be imported just to start the CLI
+DEFERRED_MODULES = [
+    "aerie_cli.aerie_client",
+    "aerie_cli.commands.plans",
+    "numpy",
+    "pandas",
+    "pyarrow",
+    "requests",
+]
+
+
+def import_times(*args: str) -> Dict[str, int]:
+    """Run the CLI with `-X importtime` and return the cumulative import time of each module, in microseconds"""
+    resp = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "aerie_cli", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    assert resp.stdout.strip() == __version__
+
+    times = {}
+    for line in resp.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime requires 3.7+")
+def test_version_imports():
+    times = import_times("--version")
+    assert "aerie_cli.app" in times
+
+    imported = [name for name in DEFERRED_MODULES if name in times]
+    assert not imported, f"Imported at startup: {', '.join(imported)}"
@@ -1,12 +1,24 @@
 from attrs import define, field
 from datetime import timedelta
+import io
+import json
 
+import numpy as np
 import pytest
 
+from aerie_cli.utils.serialization import parse_intervals_to_microseconds
 from aerie_cli.utils.serialization import postgres_interval_to_microseconds
 from aerie_cli.utils.serialization import postgres_interval_to_timedelta
 from aerie_cli.utils.serialization import timedelta_to_postgres_interval
 from aerie_cli.utils.serialization import parse_timedelta_str
+from aerie_cli.utils.serialization import hash_arguments
+from aerie_cli.utils.serialization import write_json_dict
+from aerie_cli.utils.serialization import write_json_list
+from aerie_cli.utils import json_backend
+from aerie_cli.utils.profiles import decimate_samples
+from aerie_cli.utils.profiles import profile_segments_to_arrays
+from aerie_cli.utils.profiles import profile_segments_to_samples
+from aerie_cli.utils.profiles import write_resources_csv
 
 
 @define
@@ -83,6 +95,33 @@ def test_postgres_interval_to_microseconds(example_duration: ExampleDuration):
     )
 
 
+def test_postgres_interval_to_microseconds_exact():
+    # Previously computed via float seconds, which truncated some values by 1us
+    assert postgres_interval_to_microseconds("00:00:00.000029") == 29
+    assert postgres_interval_to_microseconds("1 day -00:00:00.000001") == 86400 * 10**6 - 1
+
+    with pytest.raises(ValueError):
+        postgres_interval_to_microseconds("00:00")
+
+
+def test_parse_intervals_to_microseconds():
+    intervals = [d.as_postgres_output for d in TEST_CASES] + ["123:45:06.7", "00:00:00.000029", "", "1 day"]
+
+    res = parse_intervals_to_microseconds(intervals)
+
+    assert res.dtype == "int64"
+    assert res.tolist() == [d.as_microseconds for d in TEST_CASES] + [
+        (123 * 3600 + 45 * 60 + 6) * 10**6 + 700000,
+        29,
+        0,
+        86400 * 10**6,
+    ]
+    assert parse_intervals_to_microseconds([]).tolist() == []
+
+    with pytest.raises(ValueError):
+        parse_intervals_to_microseconds(["00:00:00", "00:00:00."])
+
+
 @pytest.mark.parametrize("example_duration", TEST_CASES)
 def test_postgres_interval_to_timedelta(example_duration: ExampleDuration):
     assert (
@@ -105,3 +144,176 @@ def test_parse_timedelta_str(example_duration: ExampleDuration):
         parse_timedelta_str(str(example_duration.as_timedelta))
         == example_duration.as_timedelta
     )
+
+
+def test_hash_arguments():
+    assert hash_arguments({"a": 1, "b": {"c": [1, 2]}}) == hash_arguments({"b": {"c": [1, 2]}, "a": 1})
+    assert hash_arguments({"a": 1}) != hash_arguments({"a": 2})
+
+
+def test_json_backend_loads():
+    document = '{"data": {"a": [1, 2.5, "three", null, true], "b": {"c": -1e-06}}}'
+    assert json_backend.loads(document.encode("utf-8")) == json_backend.stdlib_loads(document)
+
+
+@pytest.mark.parametrize("items", [[], [1], [{"a": [1, 2], "b": {"c": "x\ny"}}, None, "z"]])
+def test_write_json_list(items):
+    fid = io.StringIO()
+
+    n_items = write_json_list(fid, iter(items))
+
+    assert n_items == len(items)
+    assert fid.getvalue() == json.dumps(items, indent=2)
+
+
+@pytest.mark.parametrize("items", [{}, {"a": []}, {"a": [{"x": 0, "y": "ON"}], "b": {}, "c": 1.5}])
+def test_write_json_dict(items):
+    fid = io.StringIO()
+    fid.write('{\n  "nested": ')
+
+    write_json_dict(fid, iter(items.items()), level=1)
+    fid.write("\n}")
+
+    assert fid.getvalue() == json.dumps({"nested": items}, indent=2)
+
+
+def _profile(profile_type, segments):
+    return {
+        "name": "resource",
+        "type": {"type": profile_type},
+        "profile_segments": [{"start_offset": offset, "dynamics": dynamics} for offset, dynamics in segments],
+    }
+
+
+def test_profile_segments_to_samples_real():
+    profile = _profile(
+        "real",
+        [
+            ("00:00:00", {"initial": 0, "rate": 1}),
+            ("00:00:10", {"initial": 10.0, "rate": 0}),
+            ("00:00:20", {"initial": 5.5, "rate": -0.5}),
+        ],
+    )
+
+    samples = profile_segments_to_samples(profile, 30 * 10**6)
+
+    # The start of the second segment is dropped because the first segment ends at the same value. Integer values are
+    # kept as integers.
+    expected = [
+        {"x": 0, "y": 0},
+        {"x": 10 * 10**6, "y": 10.0},
+        {"x": 20 * 10**6, "y": 10.0},
+        {"x": 20 * 10**6, "y": 5.5},
+        {"x": 30 * 10**6, "y": 0.5},
+    ]
+    assert json.dumps(samples) == json.dumps(expected)
+
+
+def test_profile_segments_to_samples_discrete():
+    profile = _profile(
+        "discrete",
+        [
+            ("00:00:00", [1, 2]),
+            ("00:00:01", [1, 2]),
+            ("00:00:02", [3, 4]),
+            ("00:00:02", [3, 4]),
+            ("00:00:03", [1, 2]),
+        ],
+    )
+
+    samples = profile_segments_to_samples(profile, 4 * 10**6)
+
+    expected = [
+        {"x": 0, "y": [1, 2]},
+        {"x": 2 * 10**6, "y": [1, 2]},
+        {"x": 2 * 10**6, "y": [3, 4]},
+        {"x": 3 * 10**6, "y": [3, 4]},
+        {"x": 3 * 10**6, "y": [1, 2]},
+        {"x": 4 * 10**6, "y": [1, 2]},
+    ]
+    assert samples == expected
+
+
+def test_profile_segments_to_arrays():
+    profile = _profile("real", [("00:00:00", {"initial": 1.0, "rate": 0.0})])
+
+    times, values = profile_segments_to_arrays(profile, 10)
+
+    assert times.dtype == "int64" and times.tolist() == [0, 10]
+    assert values.dtype == "float64" and values.tolist() == [1.0, 1.0]
+
+    times, values = profile_segments_to_arrays(_profile("discrete", []), 10)
+    assert len(times) == len(values) == 0
+
+    with pytest.raises(ValueError):
+        profile_segments_to_arrays(_profile("unknown", [("00:00:00", 1)]), 10)
+
+
+def test_write_resources_csv():
+    resources = [
+        ("a", (np.array([0, 10, 10, 30]), np.array([1.0, 2.0, 3.0, 4.5]))),
+        ("b, c", (np.array([10, 20]), np.array(['say "hi"', None], dtype=object))),
+    ]
+    fid = io.StringIO()
+
+    n_rows = write_resources_csv(fid, resources, "Time (s)", lambda t: t / 10)
+
+    # Later samples at the same time win, values carry forward, and cells before the first sample are empty
+    assert n_rows == 4
+    assert fid.getvalue() == (
+        'Time (s),a,"b, c"\n'
+        "0.0,1.0,\n"
+        '1.0,3.0,"say ""hi"""\n'
+        "2.0,3.0,\n"
+        "3.0,4.5,\n"
+    )
+
+
+def test_write_resources_csv_numbers():
+    resources = [
+        ("gap", (np.array([10, 20]), np.array([5, 6], dtype=object))),
+        ("complete", (np.array([0, 10, 20]), np.array([1, 2, 3], dtype=object))),
+        ("mixed", (np.array([0, 20]), np.array([1, 2.5], dtype=object))),
+        ("text", (np.array([0, 20]), np.array(["x", 3], dtype=object))),
+    ]
+    fid = io.StringIO()
+
+    write_resources_csv(fid, resources, "Time (s)", lambda t: t / 10)
+
+    # Integers are written as floats, as pandas did, unless the column only has integers and no gaps
+    assert fid.getvalue() == (
+        "Time (s),gap,complete,mixed,text\n"
+        "0.0,,1,1.0,x\n"
+        "1.0,5.0,2,1.0,x\n"
+        "2.0,6.0,3,2.5,3\n"
+    )
+
+
+def test_decimate_samples_real():
+    times = np.arange(1000, dtype=np.int64)
+    values = np.where(times == 500, 100.0, np.sin(times / 50))
+
+    decimated_times, decimated_values = decimate_samples(times, values, "real", 50)
+
+    # Endpoints and the spike survive, and every point is an original sample
+    assert len(decimated_times) == 50
+    assert decimated_times[0] == 0 and decimated_times[-1] == 999
+    assert 500 in decimated_times
+    assert np.array_equal(values[decimated_times], decimated_values)
+
+
+def test_decimate_samples_discrete():
+    profile = _profile("discrete", [(f"00:00:{i:02d}", ["OFF", "ON", "IDLE"][i % 3]) for i in range(30)])
+    times, values = profile_segments_to_arrays(profile, 30 * 10**6)
+
+    # With room for every change, only redundant run ends are dropped
+    decimated_times, decimated_values = decimate_samples(times, values, "discrete", 40)
+    assert decimated_times.tolist() == [i * 10**6 for i in range(31)]
+    assert decimated_values.tolist() == [["OFF", "ON", "IDLE"][i % 3] for i in range(30)] + ["IDLE"]
+
+    decimated_times, decimated_values = decimate_samples(times, values, "discrete", 10)
+    assert len(decimated_times) == 10
+    assert decimated_times[-1] == 30 * 10**6
+
+    # Short timelines are unchanged
+    assert decimate_samples(times, values, "discrete", 100)[0] is times